@@ -0,0 +1,1029 @@
+import argparse
+import datetime
+import json
+import os
+import random
+import re
+import sqlite3
+import subprocess
+import sys
+import threading
+import tempfile
+import time
+import tracemalloc
+from array import array
+
+import database
+import db
+import export
+import insights
+import queries
+import scheduler
+import slot_engine
+import slots
+import task_list
+import time_slot
+import writes
+
+# Micro-benchmarks. Run from the app/ directory:
+#   python bench.py            # every benchmark
+#   python bench.py slots      # just one
+#   python bench.py startup    # login page import time (budget: LOGIN_IMPORT_BUDGET)
+#   python bench.py suite --compare bench_baseline.json   # data/parsing hot paths vs. the saved baseline
+# --save PATH writes the results as a JSON baseline; --compare exits 1 on a regression.
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(fn):
+        BENCHMARKS[name] = fn
+        return fn
+    return register
+
+
+def best_of(fn, repeat=5):
+    """Fastest wall-clock time of `repeat` calls, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _add_users(conn, count):
+    """Insert `count` bench users and return their ids."""
+    start = conn.execute("SELECT COALESCE(MAX(id), 0) FROM users").fetchone()[0] + 1
+    ids = list(range(start, start + count))
+    conn.executemany("INSERT INTO users (id, username, password) VALUES (?, ?, '')",
+                     [(user_id, f"bench{user_id}") for user_id in ids])
+    return ids
+
+
+@benchmark("slots")
+def bench_slots(busy_count=2000, candidate_count=2000):
+    """String-based time_slot functions vs. the integer-interval slot engine."""
+    rng = random.Random(42)
+    day = 24 * 60
+    # Non-overlapping busy slots spread over a 24h day, as both representations
+    starts = sorted(rng.sample(range(0, day - 1), min(busy_count, day - 1)))
+    busy = [(s, min(s + 1, day)) for s in starts]
+    busy_strings = [slot_engine.format_slot(s, e) for s, e in busy]
+    busy_set = slot_engine.IntervalSet.from_sorted(
+        array("i", (s for s, _ in busy)), array("i", (e for _, e in busy)))
+    candidates = []
+    for _ in range(candidate_count):
+        s = rng.randrange(0, day - 30)
+        candidates.append((s, s + rng.choice((15, 30))))
+    candidate_strings = [slot_engine.format_slot(s, e) for s, e in candidates]
+
+    expected = [not time_slot.is_slot_available(busy_strings, c) for c in candidate_strings[:50]]
+    assert busy_set.conflicts_many(candidates[:50]) == expected
+
+    return {
+        "create_time_slots (strings, 5 min)": best_of(lambda: time_slot.create_time_slots("00:00", "23:55", 5)),
+        "create_slots (arrays, 5 min)": best_of(lambda: slot_engine.create_slots(0, 23 * 60 + 55, 5)),
+        f"is_slot_available x{candidate_count // 20}": best_of(
+            lambda: [time_slot.is_slot_available(busy_strings, c) for c in candidate_strings[:candidate_count // 20]],
+            repeat=1),
+        f"IntervalSet.conflicts x{candidate_count}": best_of(
+            lambda: [busy_set.conflicts(s, e) for s, e in candidates]),
+        f"IntervalSet.conflicts_many x{candidate_count}": best_of(lambda: busy_set.conflicts_many(candidates)),
+    }
+
+
+@benchmark("scheduler")
+def bench_scheduler(task_count=300, days=30):
+    """Local slot assignment: hundreds of tasks over a month of free time."""
+    rng = random.Random(7)
+    start = datetime.date(2025, 1, 1)
+    dates = [(start + datetime.timedelta(days=d)).isoformat() for d in range(days)]
+    # 6-10 free blocks per day between 08:00 and 22:00
+    free = {}
+    for day in dates:
+        blocks = sorted(rng.sample(range(8 * 60, 22 * 60, 30), rng.randint(6, 10)))
+        free[day] = slot_engine.IntervalSet((b, b + rng.choice((60, 90, 120))) for b in blocks)
+    tasks = [
+        (task_id, rng.randint(1, 3), rng.choice(dates[5:]),
+         [(f"subtopic {n}", rng.choice((15, 30, 45, 60, 90))) for n in range(rng.randint(2, 4))])
+        for task_id in range(task_count)
+    ]
+    placements, unplaced = scheduler.schedule_tasks(tasks, free)
+    free_minutes = sum(s.total_minutes() for s in free.values())
+    print(f"  {len(placements)} placements, {len(unplaced)} unplaced subtopics, "
+          f"{sum(p.end - p.start for p in placements)}/{free_minutes} free minutes used")
+    return {
+        f"schedule_tasks {task_count} tasks / {days} days": best_of(lambda: scheduler.schedule_tasks(tasks, free)),
+        f"schedule_tasks {task_count} tasks / {days} days, no split": best_of(
+            lambda: scheduler.schedule_tasks(tasks, free, allow_split=False)),
+    }
+
+
+@benchmark("todays_tasks")
+def bench_todays_tasks(sizes=(50, 5000, 50000)):
+    """Today's Tasks summary + first/last keyset page as the pending list grows."""
+    rng = random.Random(3)
+    results = {}
+    for size in sizes:
+        conn = db.init_db(":memory:")
+        [user_id] = _add_users(conn, 1)
+        conn.executemany(
+            "INSERT INTO tasks (user_id, topic, due_date, status, priority, progress, category) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(user_id, f"task {n}", "2025-06-01", "Pending", rng.choice(("High", "Medium", "Low")),
+              rng.choice((0, 25, 50, 100)), rng.choice(("Work", "Study", "Personal")))
+             for n in range(size)])
+        conn.commit()
+        last = task_list.FIRST_PAGE
+        while True:
+            _, cursor = task_list.page(conn, user_id, last)
+            if cursor is None:
+                break
+            last = cursor
+        results[f"summary, {size} pending"] = best_of(lambda: task_list.summary(conn, user_id))
+        results[f"first page, {size} pending"] = best_of(lambda: task_list.page(conn, user_id))
+        results[f"last page, {size} pending"] = best_of(lambda: task_list.page(conn, user_id, last))
+        conn.close()
+    return results
+
+
+@benchmark("export")
+def bench_export(sizes=(10000, 100000)):
+    """Chunked export per format; peak Python memory should not grow with the row count."""
+    rng = random.Random(5)
+    results = {}
+    for size in sizes:
+        conn = db.init_db(":memory:")
+        [user_id] = _add_users(conn, 1)
+        conn.executemany(
+            "INSERT INTO tasks (user_id, topic, subtopics, due_date, status, priority, progress, category) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(user_id, f"task {n}", "intro, practice, review", f"2025-{rng.randint(1, 12):02d}-15",
+              rng.choice(("Pending", "Completed")), rng.choice(("High", "Medium", "Low")),
+              rng.choice((0, 50, 100)), rng.choice(("Work", "Study"))) for n in range(size)])
+        conn.commit()
+        for fmt in export.FORMATS:
+            with open(os.devnull, "wb") as out:
+                seconds = best_of(lambda: export.write_export(conn, out, "tasks", user_id, fmt), repeat=3)
+                # Separate traced run; tracemalloc slows everything down
+                tracemalloc.start()
+                export.write_export(conn, out, "tasks", user_id, fmt)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            print(f"  {fmt:<8} {size:>7} rows: {size / seconds:>10,.0f} rows/s, peak {peak / 2 ** 20:.1f} MiB")
+            results[f"{fmt}, {size} rows"] = seconds
+        conn.close()
+    return results
+
+
+@benchmark("writes")
+def bench_writes(row_count=500):
+    """Schedule rows saved with a commit per row vs. one executemany transaction (on disk)."""
+    placements = [scheduler.Placement(1, f"subtopic {n}", "2025-01-01", n % 1400, n % 1400 + 30)
+                  for n in range(row_count)]
+    rows = [(1, p.date, slot_engine.format_slot(p.start, p.end), 1, p.subtopic, p.start, p.end) for p in placements]
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = db.init_db(os.path.join(tmp, "bench.db"))
+        _add_users(conn, 1)
+        conn.execute("INSERT INTO tasks (id, user_id, topic, status) VALUES (1, 1, 'bench', 'Pending')")
+        conn.commit()
+
+        def one_per_commit():
+            for row in rows:
+                conn.execute(writes._SQL["schedule"], row)
+                conn.commit()
+
+        single = best_of(one_per_commit, repeat=1)
+        def batched_save():
+            with conn:
+                writes.save_schedule(conn, 1, 1, placements)
+
+        batched = best_of(batched_save, repeat=3)
+        conn.close()
+    print(f"  single-row commits: {row_count / single:>10,.0f} rows/s")
+    print(f"  batched:            {row_count / batched:>10,.0f} rows/s")
+    return {
+        f"{row_count} rows, commit per row": single,
+        f"{row_count} rows, executemany + one commit": batched,
+    }
+
+
+def _fill_user(conn, user_id, rng, task_count=100, days=30):
+    """Tasks, time logs, slots and saved schedule rows for one user."""
+    start = datetime.date(2025, 1, 1)
+    dates = [(start + datetime.timedelta(days=d)).isoformat() for d in range(days)]
+    first_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM tasks").fetchone()[0] + 1
+    task_ids = range(first_id, first_id + task_count)
+    conn.executemany(
+        "INSERT INTO tasks (id, user_id, topic, due_date, status, priority, progress, category) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [(task_id, user_id, f"task {task_id}", rng.choice(dates), rng.choice(("Pending", "Completed")),
+          rng.choice(("High", "Medium", "Low")), rng.choice((0, 50, 100)), rng.choice(("Work", "Study")))
+         for task_id in task_ids])
+    epoch = 1735700000
+    conn.executemany(
+        "INSERT INTO time_logs (user_id, task_id, start_time, end_time, time_spent) VALUES (?, ?, ?, ?, ?)",
+        [(user_id, task_id, epoch + n * 3600, epoch + n * 3600 + 1500, 1500)
+         for n, task_id in enumerate(task_id for task_id in task_ids for _ in range(3))])
+    conn.executemany("INSERT INTO slot (user_id, date, start_minute, end_minute) VALUES (?, ?, ?, ?)",
+                     [(user_id, day, m, m + 90) for day in dates for m in (9 * 60, 14 * 60)])
+    conn.executemany(
+        "INSERT INTO schedule (user_id, date, slot, task_id, subtopics, start_minute, end_minute) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(user_id, rng.choice(dates), "09:00 - 09:30", task_id, "intro", 540, 570) for task_id in task_ids])
+
+
+@benchmark("tenancy")
+def bench_tenancy(other_user_counts=(0, 50, 500)):
+    """One user's panel queries while other users' data grows; times should stay flat."""
+    rng = random.Random(11)
+    conn = db.init_db(":memory:")
+    [user_id] = _add_users(conn, 1)
+    _fill_user(conn, user_id, rng)
+    panels = {
+        "today's tasks (summary + page)": lambda: (task_list.summary(conn, user_id), task_list.page(conn, user_id)),
+        "free/busy, 30 days": lambda: slots.free_busy(conn, user_id, "2025-01-01", "2025-01-30"),
+        "saved schedules": lambda: conn.execute(queries.SAVED_SCHEDULES, (user_id,)).fetchall(),
+        "task time data": lambda: conn.execute(queries.TASK_TIME_DATA, (user_id,)).fetchall(),
+        "insights prompt": lambda: insights.build_insights_prompt(conn, user_id),
+    }
+    results, added = {}, 0
+    for others in other_user_counts:
+        for other in _add_users(conn, others - added):
+            _fill_user(conn, other, rng)
+        added = others
+        conn.commit()
+        total = conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+        for label, panel in panels.items():
+            results[f"{label} @{total} tasks"] = best_of(panel)
+    conn.close()
+    return results
+
+
+def _stress(read, write, readers, writers, seconds, think=0.001):
+    """Run `read()` / `write(n)` from many threads; returns (ops, failed ops, errors) per kind.
+
+    Each thread pauses `think` seconds between operations like a session
+    rendering a page would; without it, Python-bound reader loops starve the
+    other threads of the GIL and the numbers measure that instead.
+    """
+    counts = {"reads": 0, "writes": 0}
+    failed = {"reads": 0, "writes": 0}
+    errors = set()
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def loop(kind, op):
+        n = 0
+        while time.perf_counter() < deadline:
+            try:
+                op(n) if kind == "writes" else op()
+            except sqlite3.Error as e:
+                with lock:
+                    failed[kind] += 1
+                    errors.add(str(e))
+            n += 1
+            time.sleep(think)
+        with lock:
+            counts[kind] += n
+
+    threads = ([threading.Thread(target=loop, args=("reads", read)) for _ in range(readers)]
+               + [threading.Thread(target=loop, args=("writes", write)) for _ in range(writers)])
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return counts, failed, errors
+
+
+def _report(label, counts, failed, errors, seconds):
+    print(f"  {label:<7} {(counts['reads'] - failed['reads']) / seconds:>7,.0f} reads/s"
+          f" {(counts['writes'] - failed['writes']) / seconds:>7,.0f} writes/s committed,"
+          f" {failed['reads']} reads / {failed['writes']} writes failed {sorted(errors)}")
+
+
+@benchmark("stress")
+def bench_stress(readers=8, writers=8, seconds=3):
+    """Concurrent panel reads + timer writes: old shared-connection setup vs. database.Database."""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        # Before: one connection per thread, rollback journal, no busy timeout,
+        # a commit per write (what concurrent sessions did with their own handles)
+        path = os.path.join(tmp, "before.db")
+        db.init_db(path).execute("PRAGMA journal_mode = DELETE").close()
+        setup = sqlite3.connect(path)
+        setup.execute("INSERT INTO users (id, username, password) VALUES (1, 'bench', '')")
+        setup.execute("INSERT INTO tasks (id, user_id, topic, status) VALUES (1, 1, 'bench', 'Pending')")
+        setup.commit()
+        setup.close()
+        local = threading.local()
+
+        def plain_conn():
+            if not hasattr(local, "conn"):
+                local.conn = sqlite3.connect(path, timeout=0)
+            return local.conn
+
+        def plain_read():
+            plain_conn().execute(queries.TASK_TIME_DATA, (1,)).fetchall()
+
+        def plain_write(n):
+            conn = plain_conn()
+            try:
+                conn.execute(writes._SQL["time_logs"], (1, 1, n, n + 60, 60))
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+
+        counts, failed, errors = _stress(plain_read, plain_write, readers, writers, seconds)
+        _report("before", counts, failed, errors, seconds)
+        results["before: time per committed write"] = seconds / max(counts["writes"] - failed["writes"], 1)
+
+        # After: WAL + pragmas, pooled read connections, one batching writer
+        shared = database.Database(os.path.join(tmp, "after.db"))
+        shared.write(lambda conn: conn.execute("INSERT INTO users (id, username, password) VALUES (1, 'bench', '')"))
+        shared.write(lambda conn: conn.execute(
+            "INSERT INTO tasks (id, user_id, topic, status) VALUES (1, 1, 'bench', 'Pending')"))
+
+        def pooled_read():
+            shared.reader().execute(queries.TASK_TIME_DATA, (1,)).fetchall()
+
+        def queued_write(n):
+            shared.write(writes.log_time, 1, [(1, n, n + 60)])
+
+        counts, failed, errors = _stress(pooled_read, queued_write, readers, writers, seconds)
+        logged = shared.reader().execute("SELECT COUNT(*) FROM time_logs").fetchone()[0]
+        total = shared.reader().execute("SELECT total_seconds FROM task_time_totals WHERE task_id = 1").fetchone()[0]
+        shared.close()
+        _report("after", counts, failed, errors, seconds)
+        assert not errors, errors
+        assert logged == counts["writes"] and total == 60 * logged, "lost or double-counted writes"
+        results["after: time per committed write"] = seconds / max(counts["writes"], 1)
+    return results
+
+
+@benchmark("read_cache")
+def bench_read_cache(task_count=5000):
+    """An idle Today's Tasks rerun (summary, first page, both figures) built vs. served from read_cache."""
+    import panel_today  # Loads pandas and plotly
+    import read_cache
+
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        shared = database.Database(os.path.join(tmp, "bench.db"))
+        [user_id] = shared.write(_add_users, 1)
+        shared.write(writes.insert_many, "tasks", [
+            (user_id, f"task {n}", "", "2025-06-01", "Pending", rng.choice(("High", "Medium", "Low")),
+             0, rng.choice(("Work", "Study", "Personal")), "None") for n in range(task_count)])
+        cache = read_cache.ReadCache(shared)
+        conn = shared.reader()
+        statements = []
+        conn.set_trace_callback(statements.append)
+
+        def rerun(cache):
+            summary, figures = cache.get(("todays_summary", user_id), ("task_counts",),
+                                         lambda: panel_today.summary_and_figures(conn, user_id))
+            rows = cache.get(("todays_tasks_page", user_id, task_list.FIRST_PAGE), ("tasks",),
+                             lambda: task_list.page(conn, user_id))
+            return summary, figures, rows
+
+        uncached = read_cache.ReadCache(shared, max_entries=0)
+        results = {"rerun, no cache": best_of(lambda: rerun(uncached)), "rerun, cached": best_of(lambda: rerun(cache))}
+        statements.clear()
+        rerun(cache)
+        assert not statements, f"idle rerun ran SQL: {statements}"
+
+        # Writes to other tables keep the entries; a task write rebuilds them
+        shared.write(lambda conn: conn.execute("INSERT INTO schedule (user_id, date, slot) VALUES (?, '2025-06-01', '')",
+                                               (user_id,)))
+        hits = cache.hits
+        rerun(cache)
+        assert cache.hits == hits + 2, "unrelated write invalidated the cache"
+        shared.write(writes.add_task, user_id, "new", "2025-06-01", "Pending", "High", "Work", "None")
+        summary, _, _ = rerun(cache)
+        assert summary["total"] == task_count + 1, "task write did not invalidate the cache"
+        print(f"  idle rerun: {results['rerun, no cache'] / results['rerun, cached']:,.0f}x faster, no SQL;"
+              f" hit rate {cache.stats()['hit_rate']:.0%}")
+        conn.set_trace_callback(None)
+        shared.close()
+    return results
+
+
+@benchmark("semantic")
+def bench_semantic(task_count=20000, new_count=10):
+    """FAISS index over task topics: full build, incremental refresh, search, embedding cache."""
+    import embeddings
+    import semantic_index
+
+    rng = random.Random(11)
+    words = ["python", "java", "loops", "recursion", "algebra", "calculus", "streams", "testing",
+             "sql", "indexes", "graphs", "sorting", "essay", "grammar", "physics", "history"]
+
+    class CountingEmbedder(embeddings.HashingEmbedder):
+        """Stands in for a remote model: counts calls and texts sent."""
+        calls = texts = 0
+
+        def embed(self, texts):
+            CountingEmbedder.calls += 1
+            CountingEmbedder.texts += len(texts)
+            return super().embed(texts)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        shared = database.Database(os.path.join(tmp, "bench.db"))
+        [user_id] = shared.write(_add_users, 1)
+        topics = [" ".join(rng.sample(words, 3)) + f" {n}" for n in range(task_count)]
+        shared.write(writes.insert_many, "tasks", [
+            (user_id, topic, "", "2025-06-01", "Pending", "Medium", 0, "Study", "None") for topic in topics])
+
+        def build(directory):
+            index = semantic_index.SemanticIndex(shared, embeddings.CachedEmbedder(CountingEmbedder(), shared),
+                                                 os.path.join(tmp, directory))
+            start = time.perf_counter()
+            index.refresh("task")
+            return index, time.perf_counter() - start
+
+        index, results[f"build, {task_count} topics"] = build("first")
+        first_calls, first_texts = CountingEmbedder.calls, CountingEmbedder.texts
+        shared.write(lambda conn: None)  # Wait for the cached vectors to be stored
+        _, results[f"rebuild from embedding cache"] = build("second")
+        print(f"  first build: {first_calls} embedding calls for {first_texts} texts;"
+              f" rebuild: {CountingEmbedder.calls - first_calls} calls")
+        assert CountingEmbedder.calls == first_calls, "rebuild re-embedded cached texts"
+
+        for n in range(new_count):
+            shared.write(writes.add_task, user_id, f"python loops {n}", "2025-06-01", "Pending", "High", "Study", "None")
+        start = time.perf_counter()
+        added = index.refresh("task")
+        results[f"incremental refresh, {new_count} new tasks"] = time.perf_counter() - start
+        assert added == new_count, added
+        assert semantic_index.SemanticIndex(shared, index.embedder, os.path.join(tmp, "first")).refresh("task") == 0, \
+            "index file on disk is behind"
+        results["search, k=5"] = best_of(lambda: index.search("task", ["python loops"], k=5, user_id=user_id))
+        shared.close()
+    return results
+
+
+
+@benchmark("recurrence")
+def bench_recurrence(anchor_years=(1, 5, 20), task_count=2000):
+    """Recurring tasks: expanding a window from old anchors, advancing the horizon, querying it by date."""
+    import recurrence
+
+    def naive(anchor, rule, start, end):
+        # Walk every occurrence from the anchor, as a plain loop would
+        step = datetime.timedelta(days=1 if rule == "Daily" else 7)
+        day, found = anchor, []
+        while day <= end:
+            if day >= start:
+                found.append(day)
+            day += step
+        return found
+
+    results = {}
+    today = datetime.date.today()
+    end = today + datetime.timedelta(days=recurrence.HORIZON_DAYS)
+    for years in anchor_years:
+        anchor = today - datetime.timedelta(days=365 * years)
+        windowed = list(recurrence.occurrences(anchor, "Daily", today, end))
+        assert windowed == naive(anchor, "Daily", today, end)
+        results[f"daily window, anchor {years}y back"] = best_of(
+            lambda: list(recurrence.occurrences(anchor, "Daily", today, end)))
+        results[f"  naive walk from anchor, {years}y back"] = best_of(lambda: naive(anchor, "Daily", today, end))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        shared = database.Database(os.path.join(tmp, "bench.db"))
+        [user_id] = shared.write(_add_users, 1)
+        rng = random.Random(5)
+        shared.write(writes.insert_many, "tasks", [
+            (user_id, f"Habit {n}", "", str(today - datetime.timedelta(days=rng.randrange(3650))), "Pending",
+             "Medium", 0, "Study", rng.choice(recurrence.RULES)) for n in range(task_count)])
+        horizon = recurrence.Horizon(shared)
+        start = time.perf_counter()
+        horizon.ensure()
+        results[f"first expansion, {task_count} tasks"] = time.perf_counter() - start
+        start = time.perf_counter()
+        horizon.ensure(through=end + datetime.timedelta(days=30))
+        results["advance horizon by 30 days"] = time.perf_counter() - start
+        results["ensure, nothing changed"] = best_of(horizon.ensure)
+        conn = shared.reader()
+        week = (user_id, str(today), str(today + datetime.timedelta(days=6)))
+        print(f"  {len(conn.execute(queries.OCCURRENCES_BETWEEN, week).fetchall())} occurrences this week, "
+              f"{conn.execute('SELECT COUNT(*) FROM task_occurrences').fetchone()[0]} materialized")
+        results["occurrences this week"] = best_of(lambda: conn.execute(queries.OCCURRENCES_BETWEEN, week).fetchall())
+        shared.close()
+    return results
+
+
+
+def _sleep_job(params, progress):
+    """Stands in for an LLM completion (a jobs.KINDS function)."""
+    for step in range(params["steps"]):
+        time.sleep(params["seconds"] / params["steps"])
+        progress({"step": step})
+    return {"done": params["n"]}
+
+
+@benchmark("jobs")
+def bench_jobs(job_count=16, workers=4, seconds=0.2):
+    """LLM jobs: what a click costs the script thread, pool throughput, attaching, restart recovery."""
+    import jobs
+
+    jobs.KINDS["bench_sleep"] = (__name__, "_sleep_job")
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        shared = database.Database(os.path.join(tmp, "bench.db"))
+        [user_id] = shared.write(_add_users, 1)
+        runner = jobs.JobRunner(shared, max_workers=workers)
+        runner.start()
+
+        def params(n):
+            return {"n": n, "seconds": seconds, "steps": 4}
+
+        start = time.perf_counter()
+        ids = [runner.submit(user_id, "bench_sleep", params(n)) for n in range(job_count)]
+        results["submit (script thread), per job"] = (time.perf_counter() - start) / job_count
+        assert runner.submit(user_id, "bench_sleep", params(0)) == ids[0], "an identical pending job was not reused"
+        conn = shared.reader()
+        while any(jobs.get(conn, job_id).status in jobs.PENDING for job_id in ids):
+            time.sleep(0.01)
+        results[f"{job_count} x {seconds * 1000:.0f} ms jobs, {workers} workers"] = time.perf_counter() - start
+        assert [jobs.get(conn, job_id).result for job_id in ids] == [{"done": n} for n in range(job_count)]
+        results["latest job lookup"] = best_of(lambda: jobs.latest(conn, user_id, "bench_sleep"))
+
+        # A job left running by a restart is run again by the next runner
+        runner.stop()
+        shared.write(lambda conn: conn.execute("UPDATE jobs SET status = 'running' WHERE id = ?", (ids[0],)))
+        runner = jobs.JobRunner(shared, max_workers=workers)
+        runner.start()
+        runner.stop()
+        assert jobs.get(conn, ids[0]).status == "done", "interrupted job was not resumed"
+        shared.close()
+    del jobs.KINDS["bench_sleep"]
+    return results
+
+
+
+@benchmark("llm")
+def bench_llm(calls=60, threads=16, server_rate=20, latency=0.05):
+    """LLM governor against fake_llm.py: a burst with and without it, coalescing, per-user limits."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from langchain_openai import ChatOpenAI
+
+    import fake_llm
+    import llm_governor
+
+    results = {}
+    fake = fake_llm.FakeLLMServer(latency=latency, rate=server_rate, burst=server_rate / 4).start()
+    client = ChatOpenAI(model="gpt-4", base_url=fake.url, api_key="fake", max_retries=0)
+
+    def burst(call, prompts):
+        errors = []
+
+        def one(args):
+            try:
+                call(*args)
+            except Exception as e:
+                errors.append(e)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(one, prompts))
+        return time.perf_counter() - start, errors
+
+    prompts = [(f"Summarize task {n}", n % 4 + 1) for n in range(calls)]
+    elapsed, errors = burst(lambda prompt, user_id: client.invoke(prompt), prompts)
+    print(f"  direct:   {len(errors)}/{calls} calls failed with 429s")
+    results[f"{calls} calls, direct"] = elapsed
+
+    with tempfile.TemporaryDirectory() as tmp:
+        shared = database.Database(os.path.join(tmp, "bench.db"))
+        for label, rpm in (("limited to the server's rate", server_rate * 60), ("3x over, retrying", server_rate * 180)):
+            governor = llm_governor.Governor(shared, lambda model_name: client, rpm=rpm, base_delay=0.1)
+            elapsed, errors = burst(lambda prompt, user_id: governor.complete("gpt-4", prompt, user_id),
+                                    [(f"{label} {prompt}", user_id) for prompt, user_id in prompts])
+            print(f"  governed, {label}: {len(errors)}/{calls} failed, {governor.stats['retries']} retries")
+            assert not errors, errors[:1]
+            results[f"{calls} calls, governed ({label})"] = elapsed
+
+        before = fake.requests
+        governor = llm_governor.Governor(shared, lambda model_name: client)
+        elapsed, errors = burst(lambda prompt, user_id: governor.complete("gpt-4", prompt, user_id),
+                                [("The same prompt", 1)] * threads)
+        print(f"  {threads} identical prompts in flight: {fake.requests - before} API request(s)")
+        assert not errors and fake.requests - before == 1
+        results[f"{threads} identical prompts, coalesced"] = elapsed
+
+        # One user's burst waits on that user's bucket; another user is not held up by it
+        governor = llm_governor.Governor(shared, lambda model_name: client, tpm=10 ** 6, user_tpm=24000)
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            heavy = [pool.submit(governor.complete, "gpt-4", f"Heavy user prompt {n}", 1) for n in range(6)]
+            time.sleep(0.05)
+            start = time.perf_counter()
+            governor.complete("gpt-4", "Light user prompt", 2)
+            results["light user's call during a heavy user's burst"] = time.perf_counter() - start
+            for future in heavy:
+                future.result()
+        results["heavy user's burst of 6 (per-user limit)"] = time.perf_counter() - start
+
+        shared.write(lambda conn: None)  # Wait for the usage rows
+        requests, retries, tokens, usd = shared.reader().execute(
+            "SELECT SUM(requests), SUM(retries), SUM(prompt_tokens + completion_tokens), SUM(cost) FROM llm_usage"
+        ).fetchone()
+        print(f"  llm_usage: {requests} requests, {retries} retries, {tokens} tokens, ${usd:.2f}")
+        shared.close()
+    fake.stop()
+    return results
+
+
+# The login page must not pull these in; they load with the panels that use them
+HEAVY_MODULES = ("pandas", "plotly.express", "langchain", "langchain_core", "pyarrow", "faiss")
+# Import time the app may add on top of streamlit's own before the login page is up
+LOGIN_IMPORT_BUDGET = 0.15
+
+_LOGIN_SCRIPT = f"""
+import runpy, sys
+runpy.run_path("main.py")
+print("loaded:" + ",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))
+"""
+
+
+def _login_imports():
+    """Render the login page in a fresh interpreter under -X importtime.
+
+    Returns (streamlit's import seconds, everything else's, heavy modules loaded).
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, TRACKER_DB=os.path.join(tmp, "bench.db"), QUIZ_PREGEN_WORKERS="0")
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", _LOGIN_SCRIPT],
+                              capture_output=True, text=True, env=env, check=True)
+    total = streamlit = 0
+    for line in proc.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package", nesting shown by indentation
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$", line)
+        if match:
+            total += int(match[1])
+            if match[4] == "streamlit" and not match[3]:
+                streamlit = int(match[2])
+    loaded = proc.stdout.strip().rpartition("loaded:")[2]
+    return streamlit / 1e6, (total - streamlit) / 1e6, [name for name in loaded.split(",") if name]
+
+
+@benchmark("perf")
+def bench_perf(task_count=5000, calls=2000):
+    """Per-statement cost of perf instrumentation, and summarizing a full ring buffer."""
+    import perf
+
+    rng = random.Random(3)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        shared = database.Database(path)
+        [user_id] = shared.write(_add_users, 1)
+        shared.write(writes.insert_many, "tasks", [
+            (user_id, f"task {n}", "", "2025-06-01", "Pending", rng.choice(("High", "Medium", "Low")),
+             0, rng.choice(("Work", "Study", "Personal")), "None") for n in range(task_count)])
+        shared.close()
+        recorder = perf.Recorder()
+        plain = db.connect(path)
+        timed = db.connect(path, perf.TimedConnection)
+        timed.recorder = recorder
+
+        def per_call(fn):
+            return best_of(lambda: [fn() for _ in range(calls)]) / calls
+
+        results = {}
+        for label, conn in (("plain", plain), ("instrumented", timed)):
+            results[f"point query, {label}"] = per_call(
+                lambda: conn.execute(queries.SCHEDULE_TASK_DETAILS, (1, user_id)).fetchone())
+            results[f"1000-row fetchall, {label}"] = best_of(
+                lambda: conn.execute("SELECT id, topic FROM tasks LIMIT 1000").fetchall())
+            results[f"1000-row iteration, {label}"] = best_of(
+                lambda: [row for row in conn.execute("SELECT id, topic FROM tasks LIMIT 1000")])
+        results["record(), per event"] = per_call(lambda: recorder.record("sql", "bench", 0.001, rows=1))
+        for _ in range(recorder.capacity):
+            recorder.record("sql", f"statement {rng.randrange(50)}", rng.expovariate(1000), rows=1)
+        results[f"summary() over {recorder.capacity} events"] = best_of(recorder.summary)
+        print(f"  instrumentation adds {(results['point query, instrumented'] - results['point query, plain']) * 1e6:.1f} us"
+              " per point query")
+        plain.close()
+        timed.close()
+    return results
+
+
+# Row counts for the "suite" database (see datagen.py); BENCH_SCALE scales all but the users
+SUITE_ROWS = {"users": 20, "tasks": 100000, "time_logs": 1000000, "slots": 50000, "schedules": 50000,
+              "jobs": 20000, "llm_usage": 20000}
+
+
+def _suite_db(tmp):
+    """The generated suite database: BENCH_DB if set (generated there once, then reused), else one in `tmp`."""
+    import datagen
+
+    path = os.getenv("BENCH_DB") or os.path.join(tmp, "suite.db")
+    if not os.path.exists(path):
+        scale = float(os.getenv("BENCH_SCALE", 1))
+        counts = {table: count if table == "users" else int(count * scale) for table, count in SUITE_ROWS.items()}
+        start = time.perf_counter()
+        datagen.generate(path, **counts)
+        print(f"  generated {path} in {time.perf_counter() - start:.1f} s:",
+              ", ".join(f"{count:,} {table}" for table, count in counts.items()))
+    return path
+
+
+class _MockMessage:
+    def __init__(self, content):
+        self.content = content
+        self.usage_metadata = None
+
+
+class _MockChat:
+    """Stands in for the chat client: answers repair prompts by fixing each listed item."""
+
+    def invoke(self, prompt):
+        fixed = []
+        for line in prompt.splitlines():
+            line = line.strip()
+            if line.startswith('{"index"'):
+                entry = json.loads(line)
+                item = dict(entry["item"], index=entry["index"])
+                if "answer" in entry["errors"]:
+                    item["answer"] = "A" if item.get("options") else "A fixed answer"
+                if "duration_minutes" in entry["errors"]:
+                    item["duration_minutes"] = 30
+                fixed.append(json.dumps(item))
+        return _MockMessage("\n".join(fixed))
+
+    def stream(self, prompt):
+        yield self.invoke(prompt)
+
+
+@benchmark("suite")
+def bench_suite(quiz_questions=5000, breakdown_rows=20000):
+    """Data and parsing hot paths on a generated database (SUITE_ROWS); LLM calls are mocked.
+
+    Save a baseline with `python bench.py suite --save bench_baseline.json` and
+    check for regressions with `--compare bench_baseline.json`.
+    """
+    import datagen
+    import quiz  # Loads streamlit and the LLM client
+    import resources
+    import structured
+    import test3
+
+    user_id = 1  # datagen gives the first user the most rows
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = _suite_db(tmp)
+        conn = db.connect(path)
+        for name, (sql, params, _) in queries.PANEL_QUERIES.items():
+            results[f"query {name}"] = best_of(lambda: conn.execute(sql, params).fetchall())
+
+        # The panels' data helpers, through the app's shared resources
+        import llm_governor
+
+        resources._database = database.Database(path)
+        resources._llms["gpt-4"] = _MockChat()
+        # No rate limits for the mock; a big repair prompt would otherwise wait on the token buckets
+        resources._governor = llm_governor.Governor(resources._database, resources.get_llm,
+                                                    rpm=10 ** 9, tpm=10 ** 12, user_tpm=10 ** 12)
+        try:
+            cache = resources.get_read_cache()
+            frame = test3.fetch_task_data(user_id)
+            results[f"fetch_task_data, {len(frame)} rows, cold cache"] = best_of(
+                lambda: (cache.clear(), test3.fetch_task_data(user_id)))
+
+            content = datagen.quiz_lines(quiz_questions)
+            results[f"parse_quiz, {quiz_questions} questions"] = best_of(
+                lambda: quiz.parse_quiz(content, repair=False))
+            start = time.perf_counter()
+            questions = quiz.parse_quiz(content, user_id=user_id)
+            results[f"parse_quiz, {quiz_questions} questions, mocked repair"] = time.perf_counter() - start
+            assert len(questions) == quiz_questions, "mocked repair left invalid questions"
+        finally:
+            resources.shutdown()
+
+        breakdown = datagen.breakdown_lines(breakdown_rows)
+        chunks = [breakdown[i:i + 64] for i in range(0, len(breakdown), 64)]
+
+        def parse_streamed():
+            parser = structured.JsonLinesParser(scheduler.BREAKDOWN_SCHEMA)
+            for chunk in chunks:
+                parser.feed(chunk)
+            parser.close()
+            return parser
+
+        results[f"breakdown parse, {breakdown_rows} rows"] = best_of(
+            lambda: structured.JsonLinesParser(scheduler.BREAKDOWN_SCHEMA).parse(breakdown))
+        results[f"breakdown parse, {breakdown_rows} rows, streamed in 64-char chunks"] = best_of(parse_streamed)
+        assert len(parse_streamed().items) == breakdown_rows - len(parse_streamed().invalid)
+
+        busy = [slot_engine.format_slot(start, end) for start, end in conn.execute(
+            "SELECT start_minute, end_minute FROM slot WHERE user_id = ?", (user_id,))]
+        results["create_time_slots, 5 min"] = best_of(lambda: time_slot.create_time_slots("00:00", "23:55", 5))
+        results["create_time_slots, 5 min, 7 recurring days"] = best_of(
+            lambda: time_slot.create_time_slots("00:00", "23:55", 5, [f"day {n}" for n in range(7)]))
+        # Slots end by 23:00, so the whole list is checked
+        assert time_slot.is_slot_available(busy, "23:00 - 23:30")
+        results[f"is_slot_available vs {len(busy)} slots, no conflict"] = best_of(
+            lambda: time_slot.is_slot_available(busy, "23:00 - 23:30"))
+        conn.close()
+    return results
+
+
+@benchmark("startup")
+def bench_startup(runs=3):
+    """Cold-start imports for the login page, checked against LOGIN_IMPORT_BUDGET."""
+    samples = [_login_imports() for _ in range(runs)]
+    streamlit, app, loaded = min(samples, key=lambda sample: sample[1])
+    print(f"  streamlit {streamlit * 1000:.0f} ms, app {app * 1000:.0f} ms"
+          f" (budget {LOGIN_IMPORT_BUDGET * 1000:.0f} ms), heavy modules loaded: {loaded or 'none'}")
+    assert not loaded, f"login page imports {', '.join(loaded)}"
+    assert app <= LOGIN_IMPORT_BUDGET, "login page imports are over budget"
+    return {"streamlit imports": streamlit, "app imports (login page)": app}
+
+
+
+class _AppClient:
+    """Drives a running `streamlit run main.py` over its websocket, as a browser tab would.
+
+    Keeps the widgets' values between reruns and sends a button click as a
+    rerun of the fragment the button is in (a full rerun if it is in none).
+    """
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.widgets = {}  # label -> (widget id, fragment id)
+        self.values = {}  # widget id -> WidgetState
+
+    async def rerun(self, click=None, fragment_id=""):
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        msg = BackMsg()
+        msg.rerun_script.fragment_id = fragment_id
+        msg.rerun_script.widget_states.widgets.extend(self.values.values())
+        if click:
+            msg.rerun_script.widget_states.widgets.add(id=click, trigger_value=True)
+        await self.ws.send(msg.SerializeToString())
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(await self.ws.recv())
+            kind = forward.WhichOneof("type")
+            if kind == "script_finished":
+                if forward.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    return forward.script_finished
+                continue
+            if kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                element = forward.delta.new_element
+                widget = getattr(element, element.WhichOneof("type"))
+                if getattr(widget, "id", "") and getattr(widget, "label", ""):
+                    self.widgets[widget.label] = (widget.id, forward.delta.fragment_id)
+
+    async def set(self, label, value):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        widget_id = self.widgets[label][0]
+        self.values[widget_id] = WidgetState(id=widget_id, string_value=value)
+        return await self.rerun()
+
+    async def click(self, label):
+        widget_id, fragment_id = self.widgets[label]
+        return await self.rerun(click=widget_id, fragment_id=fragment_id)
+
+
+def _cpu_seconds(pid):
+    """User + system CPU time of a process so far (Linux)."""
+    with open(f"/proc/{pid}/stat") as stat:
+        fields = stat.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+@benchmark("interaction")
+def bench_interaction(clicks=40, task_count=60, idle=3):
+    """Server CPU and round trip per click on a live app: the timer and the task list pager."""
+    import asyncio
+    import hashlib
+    import socket
+
+    import websockets
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        shared = database.Database(path)
+        shared.write(writes.add_user, "bench", ":" + hashlib.sha256(b"bench").hexdigest())  # Empty salt
+        [user_id] = shared.write(lambda conn: [conn.execute("SELECT id FROM users").fetchone()[0]])
+        today = str(datetime.date.today())
+        shared.write(writes.insert_many, "tasks", [
+            (user_id, f"Task {n}", "", today, "Pending", "Medium", 0, "Study", "None") for n in range(task_count)])
+        shared.write(writes.log_time, user_id, [(1, time.time() - 60, time.time())])
+        shared.close()
+
+        env = dict(os.environ, TRACKER_DB=path, QUIZ_PREGEN_WORKERS="0")
+        server = subprocess.Popen(
+            [sys.executable, "-m", "streamlit", "run", "main.py", "--server.headless", "true",
+             "--server.port", str(port), "--server.enableXsrfProtection", "false",
+             "--server.fileWatcherType", "none", "--browser.gatherUsageStats", "false"],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        async def session():
+            for _ in range(300):
+                try:
+                    ws = await websockets.connect(f"ws://127.0.0.1:{port}/_stcore/stream",
+                                                  subprotocols=["streamlit"], max_size=None)
+                    break
+                except OSError:
+                    await asyncio.sleep(0.1)
+            async with ws:
+                app = _AppClient(ws)
+                await app.rerun()
+                await app.set("Username", "bench")
+                await app.set("Password", "bench")
+                await app.click("Login")
+
+                async def measure(label, *buttons):
+                    cpu, start = _cpu_seconds(server.pid), time.perf_counter()
+                    for n in range(clicks):
+                        await app.click(buttons[n % len(buttons)])
+                    results[f"{label}, server CPU"] = (_cpu_seconds(server.pid) - cpu) / clicks
+                    results[f"{label}, round trip"] = (time.perf_counter() - start) / clicks
+
+                await measure("task list next/previous page", "Next ➡️", "⬅️ Previous")
+                await app.set("Select Option", "AI Insights")
+                await measure("start/stop timer", "Start Timer", "Stop Timer")
+                # The elapsed time ticks in the browser, so a running timer costs the server nothing
+                await app.click("Start Timer")
+                cpu = _cpu_seconds(server.pid)
+                await asyncio.sleep(idle)
+                results["timer running, server CPU per second"] = (_cpu_seconds(server.pid) - cpu) / idle
+
+        try:
+            asyncio.run(session())
+        finally:
+            server.terminate()
+            server.wait()
+    return results
+
+
+def load_baseline(path):
+    """{benchmark: {label: seconds}} from a file written by --save, or {} if there is none."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+def save_baseline(path, results):
+    """Write `results` to `path`, keeping the saved benchmarks that were not run this time.
+
+    Labels are sorted and times rounded to the microsecond, so a new baseline
+    shows up as a readable diff.
+    """
+    merged = dict(load_baseline(path), **results)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "machine": {"python": sys.version.split()[0], "sqlite": sqlite3.sqlite_version,
+                        "platform": sys.platform, "cpus": os.cpu_count()},
+            "results": {name: {label: round(seconds, 6) for label, seconds in labels.items()}
+                        for name, labels in merged.items()},
+        }, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run micro-benchmarks")
+    parser.add_argument("names", nargs="*", help=f"benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument("--save", metavar="PATH", help="write the results to a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare the results with a JSON baseline")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="slowdown vs. the baseline that counts as a regression (default: 1.25x)")
+    args = parser.parse_args()
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(sorted(unknown))}")
+    baseline = load_baseline(args.compare) if args.compare else {}
+    results, regressions = {}, []
+    for name in args.names or BENCHMARKS:
+        print(f"== {name}")
+        results[name] = BENCHMARKS[name]()
+        for label, seconds in results[name].items():
+            line = f"  {label:<45} {seconds * 1000:10.3f} ms"
+            before = baseline.get(name, {}).get(label)
+            if before:
+                ratio = seconds / before
+                line += f"  (baseline {before * 1000:.3f} ms, {ratio:.2f}x)"
+                # Microsecond timings jitter by more than the threshold; those need a real slowdown too
+                if ratio > args.threshold and seconds - before > 50e-6:
+                    line += "  REGRESSION"
+                    regressions.append(f"{name}: {label}")
+            print(line)
+    if args.save:
+        save_baseline(args.save, results)
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {args.threshold}x:", *regressions, sep="\n  ")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
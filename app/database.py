@@ -0,0 +1,217 @@
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+
+import db
+import perf
+
+# Concurrent access to the app database. WAL lets readers run alongside the
+# writer, so every thread reads through its own connection (leased from a
+# pool), while all writes are funneled through one writer thread that runs
+# whatever jobs are queued together in a single transaction. One writer means
+# no "database is locked" errors between the app's own writers, and one commit
+# (one fsync) covers a whole burst of writes.
+#
+# Because every write goes through that thread, it also knows which tables
+# each commit changed (triggers included) and keeps a write generation per
+# table. Read caches compare generations instead of querying (see read_cache.py).
+#
+# Given a perf.Recorder, every statement on these connections is timed.
+
+# Authorizer actions that change a table's rows
+_WRITE_ACTIONS = (sqlite3.SQLITE_INSERT, sqlite3.SQLITE_UPDATE, sqlite3.SQLITE_DELETE)
+
+
+class _WriterConnection:
+    """The writer's connection as write jobs see it; notes the tables each statement changes.
+
+    SQLite reports a statement's tables (and those of the triggers it fires)
+    to the authorizer while preparing it. Prepared statements are cached and
+    reused, so the tables are remembered per SQL text.
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._tables = {}  # SQL -> tables it changes
+        self._preparing = set()
+        self.written = set()  # Tables changed since the last reset
+        conn.set_authorizer(self._authorize)
+
+    def _authorize(self, action, table, *_):
+        if action in _WRITE_ACTIONS:
+            self._preparing.add(table)
+        return sqlite3.SQLITE_OK
+
+    def _track(self, method, sql, parameters):
+        self._preparing = set()
+        try:
+            return method(sql, parameters)
+        finally:
+            # A failed statement may still have been prepared (and cached)
+            tables = self._tables.get(sql)
+            if tables is None:
+                tables = self._tables[sql] = frozenset(self._preparing)
+            self.written |= tables
+
+    def execute(self, sql, parameters=()):
+        return self._track(self._conn.execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._track(self._conn.executemany, sql, seq_of_parameters)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class _Lease:
+    """Holds a thread's read connection; returns it to the pool when the thread ends."""
+
+    def __init__(self, database, conn):
+        self.database = database
+        self.conn = conn
+
+    def __del__(self):
+        self.database._release(self.conn)
+
+
+class Database:
+    def __init__(self, path=db.DB_PATH, max_idle_readers=8, batch_size=100, recorder=None):
+        self.path = path
+        self.recorder = recorder
+        self.max_idle_readers = max_idle_readers
+        self.batch_size = batch_size
+        # Schema setup runs once. The writer gets a fresh connection, so every
+        # statement it runs is prepared (and seen by the authorizer) under it.
+        db.init_db(path).close()
+        conn = self._connect()
+        # Transactions are managed explicitly by the writer loop
+        conn.isolation_level = None
+        self._writer_conn = _WriterConnection(conn)
+        self._generations = {}
+        self._idle = []
+        self._idle_lock = threading.Lock()
+        self._local = threading.local()
+        self._jobs = queue.Queue()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="db-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        if self.recorder is None:
+            return db.connect(self.path)
+        conn = db.connect(self.path, perf.TimedConnection)
+        conn.recorder = self.recorder
+        return conn
+
+    # Reads
+
+    def reader(self):
+        """The calling thread's read-only connection."""
+        lease = getattr(self._local, "lease", None)
+        if lease is None:
+            with self._idle_lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                conn = self._connect()
+                conn.execute("PRAGMA query_only = ON")
+            lease = self._local.lease = _Lease(self, conn)
+        return lease.conn
+
+    def _release(self, conn):
+        with self._idle_lock:
+            if not self._closed and len(self._idle) < self.max_idle_readers:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def versions(self, tables):
+        """Write generation of each of `tables`, as a tuple.
+
+        A table's generation goes up after every commit that changed its rows,
+        so equal tuples mean the tables are unchanged. Only writes made through
+        this Database are counted.
+        """
+        return tuple(self._generations.get(table, 0) for table in tables)
+
+    # Writes
+
+    def submit(self, fn, *args):
+        """Queue `fn(conn, *args)` for the writer thread; returns a Future.
+
+        The job runs inside the writer's transaction and must not commit.
+        The Future resolves after the batch containing it has committed.
+        """
+        if self._closed:
+            raise RuntimeError("Database is closed")
+        future = Future()
+        self._jobs.put((future, fn, args))
+        return future
+
+    def write(self, fn, *args, timeout=30):
+        """Run `fn(conn, *args)` on the writer and wait for its commit; returns fn's result."""
+        return self.submit(fn, *args).result(timeout)
+
+    def _write_loop(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            batch = [job]
+            stop = False
+            # Everything already queued shares the transaction
+            while len(batch) < self.batch_size:
+                try:
+                    job = self._jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    stop = True
+                    break
+                batch.append(job)
+            self._run_batch(batch)
+            if stop:
+                return
+
+    def _run_batch(self, batch):
+        conn = self._writer_conn
+        outcomes = []
+        conn.written = set()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for future, fn, args in batch:
+                # A failing job only undoes its own changes
+                conn.execute("SAVEPOINT job")
+                try:
+                    outcomes.append((future, fn(conn, *args), None))
+                    conn.execute("RELEASE job")
+                except Exception as e:
+                    conn.execute("ROLLBACK TO job")
+                    conn.execute("RELEASE job")
+                    outcomes.append((future, None, e))
+            conn.execute("COMMIT")
+            # Before the futures resolve, so a caller of write() sees its change
+            for table in conn.written:
+                self._generations[table] = self._generations.get(table, 0) + 1
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            outcomes = [(future, None, e) for future, _, _ in batch]
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def close(self):
+        """Finish queued writes, stop the writer and close the idle connections."""
+        if self._closed:
+            return
+        self._closed = True
+        self._jobs.put(None)
+        self._writer.join()
+        self._writer_conn.close()
+        with self._idle_lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
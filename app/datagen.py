@@ -0,0 +1,201 @@
+import argparse
+import datetime
+import json
+import random
+import time
+
+import db
+import recurrence
+
+# Synthetic data at scale, for benchmarks (see bench.py "suite") and for
+# trying the dashboard against a big database:
+#   python datagen.py big.db --tasks 100000 --time-logs 1000000 --slots 50000
+# Rows are spread over the users by a Zipf-like skew, so user 1 has the most
+# data, and dates fall in 2025 (the sample dates in queries.PANEL_QUERIES).
+# The same seed always gives the same rows. Inserts go through the schema's
+# triggers, so the rollup tables come out consistent. Recurring tasks are
+# expanded into task_occurrences for all of 2025 by recurrence.advance, and
+# past LLM work fills jobs and llm_usage.
+
+START = datetime.date(2025, 1, 1)
+DAYS = 365
+EPOCH = 1735689600  # 2025-01-01 00:00 UTC
+MODELS = ("gpt-4", "gpt-4o", "gpt-4o-mini")
+CATEGORIES = ("Work", "Study", "Personal", "Health", "Finance", "Hobby")
+PRIORITIES = ("High", "Medium", "Low")
+RECURRENCES = ("Daily", "Weekly", "Monthly")
+WORDS = ("python", "sql", "index", "cache", "thread", "queue", "review", "practice", "intro", "project",
+         "algebra", "history", "essay", "budget", "workout", "reading", "notes", "design", "testing", "deploy")
+
+
+def _date(day):
+    return (START + datetime.timedelta(days=day)).isoformat()
+
+
+def _phrase(rng, words=3):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _user_weights(users):
+    return [1 / rank for rank in range(1, users + 1)]
+
+
+def _tasks(rng, user_ids, weights, count):
+    for user_id in rng.choices(user_ids, weights, k=count):
+        priority = rng.choice(PRIORITIES)
+        status = "Completed" if rng.random() < 0.4 else "Pending"
+        recurrence = rng.choice(RECURRENCES) if rng.random() < 0.02 else "None"
+        # Recurring tasks start in January, so their occurrences cover the year
+        day = rng.randrange(31) if recurrence != "None" else rng.randrange(DAYS)
+        yield (user_id, _phrase(rng).title(), ", ".join(_phrase(rng, 2) for _ in range(rng.randint(1, 5))),
+               _date(day), status, priority,
+               100 if status == "Completed" else rng.choice((0, 10, 25, 50, 75)), rng.choice(CATEGORIES), recurrence)
+
+
+def _time_logs(rng, task_owners, count):
+    for _ in range(count):
+        task_id, user_id = rng.choice(task_owners)
+        start = EPOCH + rng.randrange(DAYS * 86400)
+        spent = rng.randint(5, 180) * 60
+        yield user_id, task_id, start, start + spent, spent
+
+
+def _slots(rng, user_ids, weights, count):
+    for user_id in rng.choices(user_ids, weights, k=count):
+        start = rng.randrange(8 * 60, 20 * 60, 15)
+        yield user_id, _date(rng.randrange(DAYS)), start, start + rng.choice((30, 60, 90, 120, 180))
+
+
+def _schedules(rng, task_owners, count):
+    for _ in range(count):
+        task_id, user_id = rng.choice(task_owners)
+        start = rng.randrange(8 * 60, 20 * 60, 15)
+        end = start + rng.choice((15, 30, 45, 60))
+        yield (user_id, _date(rng.randrange(DAYS)), f"{start // 60:02d}:{start % 60:02d} - {end // 60:02d}:{end % 60:02d}",
+               task_id, _phrase(rng, 2), start, end)
+
+
+def _jobs(rng, user_ids, weights, task_owners, count):
+    for user_id in rng.choices(user_ids, weights, k=count):
+        created = EPOCH + rng.randrange(DAYS * 86400)
+        status = "failed" if rng.random() < 0.05 else "done"
+        if rng.random() < 0.5:
+            kind, ref = "insights", None
+            params = {"user_id": user_id, "use_cache": True}
+            result = {"text": _phrase(rng, 40), "prompt_tokens": rng.randint(200, 2000), "detail_rows": rng.randint(0, 50)}
+        else:
+            kind, ref = "schedule_breakdown", rng.choice(task_owners)[0]
+            params = {"user_id": user_id, "task": _phrase(rng).title(), "category": rng.choice(CATEGORIES),
+                      "use_cache": True}
+            rows = [(_phrase(rng).title(), rng.choice((15, 30, 45, 60, 90))) for _ in range(rng.randint(3, 8))]
+            result = {"rows": rows, "past_minutes": [rng.choice((None, 30, 60)) for _ in rows], "invalid": 0}
+        yield (user_id, kind, ref, json.dumps(params, sort_keys=True), status,
+               None if status == "failed" else json.dumps(result), "RateLimitError" if status == "failed" else None,
+               int(rng.random() < 0.3), created, created + rng.uniform(2, 60))
+
+
+def _llm_usage(rng, user_ids, weights, count):
+    for user_id in rng.choices(user_ids, weights, k=count):
+        prompt_tokens, completion_tokens = rng.randint(200, 4000), rng.randint(50, 1500)
+        yield (user_id, _date(rng.randrange(DAYS)), rng.choice(MODELS), int(rng.random() < 0.05),
+               prompt_tokens, completion_tokens, (prompt_tokens * 0.01 + completion_tokens * 0.03) / 1000)
+
+
+def generate(path, users=20, tasks=100000, time_logs=1000000, slots=50000, schedules=50000, jobs=20000,
+             llm_usage=20000, seed=0):
+    """Fill a database at `path` (created or upgraded by db.init_db) and return the row counts added."""
+    rng = random.Random(seed)
+    conn = db.init_db(path)
+    start = conn.execute("SELECT COALESCE(MAX(id), 0) FROM users").fetchone()[0] + 1
+    user_ids = list(range(start, start + users))
+    weights = _user_weights(users)
+    with conn:
+        conn.executemany("INSERT INTO users (id, username, password) VALUES (?, ?, '')",
+                         [(user_id, f"synthetic{user_id}") for user_id in user_ids])
+        first_task = conn.execute("SELECT COALESCE(MAX(id), 0) FROM tasks").fetchone()[0] + 1
+        conn.executemany("""
+            INSERT INTO tasks (user_id, topic, subtopics, due_date, status, priority, progress, category, recurrence)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, _tasks(rng, user_ids, weights, tasks))
+        task_owners = conn.execute("SELECT id, user_id FROM tasks WHERE id >= ?", (first_task,)).fetchall()
+        if task_owners:
+            conn.executemany("""
+                INSERT INTO time_logs (user_id, task_id, start_time, end_time, time_spent) VALUES (?, ?, ?, ?, ?)
+            """, _time_logs(rng, task_owners, time_logs))
+            conn.executemany("""
+                INSERT INTO schedule (user_id, date, slot, task_id, subtopics, start_minute, end_minute)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, _schedules(rng, task_owners, schedules))
+            conn.executemany("""
+                INSERT INTO jobs (user_id, kind, ref, params, status, result, error, dismissed, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, _jobs(rng, user_ids, weights, task_owners, jobs))
+        occurrences = recurrence.advance(conn, _date(DAYS - 1), _date(0))
+        # Requests add up per (user, day, model), as llm_governor records them
+        conn.executemany("""
+            INSERT INTO llm_usage (user_id, day, model, requests, retries, prompt_tokens, completion_tokens, cost)
+            VALUES (?, ?, ?, 1, ?, ?, ?, ?)
+            ON CONFLICT(user_id, day, model) DO UPDATE SET
+                requests = requests + 1,
+                retries = retries + excluded.retries,
+                prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+                completion_tokens = completion_tokens + excluded.completion_tokens,
+                cost = cost + excluded.cost
+        """, _llm_usage(rng, user_ids, weights, llm_usage))
+        conn.executemany("INSERT INTO slot (user_id, date, start_minute, end_minute) VALUES (?, ?, ?, ?)",
+                         _slots(rng, user_ids, weights, slots))
+    conn.execute("ANALYZE")
+    conn.close()
+    return {"users": users, "tasks": tasks, "time_logs": time_logs if tasks else 0,
+            "slots": slots, "schedules": schedules if tasks else 0, "jobs": jobs if tasks else 0,
+            "task_occurrences": occurrences, "llm_usage requests": llm_usage}
+
+
+# LLM-shaped text, for the parsers (quiz.parse_quiz, the schedule breakdown)
+
+def quiz_lines(count, seed=0, invalid=0.02):
+    """A JSON Lines quiz of `count` questions; about `invalid` of them fail validation."""
+    rng = random.Random(seed)
+    lines = []
+    for n in range(count):
+        if rng.random() < 0.5:
+            options = [_phrase(rng) for _ in range(rng.randint(2, 5))]
+            item = {"question": f"Q{n}: what is {_phrase(rng)}?", "type": "multiple-choice",
+                    "options": options, "answer": "ABCDE"[rng.randrange(len(options))],
+                    "explanation": _phrase(rng, 8)}
+        else:
+            item = {"question": f"Q{n}: explain {_phrase(rng)}.", "type": "open-ended", "options": [],
+                    "answer": _phrase(rng, 12), "explanation": _phrase(rng, 8)}
+        if rng.random() < invalid:
+            item["answer"] = "Z" if item["type"] == "multiple-choice" else ""
+        lines.append(json.dumps(item))
+    return "\n".join(lines)
+
+
+def breakdown_lines(count, seed=0, invalid=0.02):
+    """A JSON Lines task breakdown of `count` subtopics; about `invalid` of them fail validation."""
+    rng = random.Random(seed)
+    lines = []
+    for n in range(count):
+        minutes = 0 if rng.random() < invalid else rng.choice((15, 30, 45, 60, 90, 120))
+        lines.append(json.dumps({"subtopic": f"{n}. {_phrase(rng).title()}", "duration_minutes": minutes}))
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill a tracker database with synthetic data")
+    parser.add_argument("path", help="database file (created if missing; rows are added to an existing one)")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--tasks", type=int, default=100000)
+    parser.add_argument("--time-logs", type=int, default=1000000)
+    parser.add_argument("--slots", type=int, default=50000)
+    parser.add_argument("--schedules", type=int, default=50000)
+    parser.add_argument("--jobs", type=int, default=20000)
+    parser.add_argument("--llm-usage", type=int, default=20000, help="LLM requests, summed per user, day and model")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    started = time.perf_counter()
+    counts = generate(args.path, args.users, args.tasks, args.time_logs, args.slots, args.schedules, args.jobs,
+                      args.llm_usage, args.seed)
+    print(", ".join(f"{count:,} {table}" for table, count in counts.items()),
+          f"in {time.perf_counter() - started:.1f} s")
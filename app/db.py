@@ -1,51 +1,76 @@
+import os
 import sqlite3
+import sys
+
+import migrations
+
+DB_PATH = os.getenv("TRACKER_DB", "2.db")
+
+# Priority labels stored as a sortable integer (tasks.priority_rank)
+PRIORITY_RANKS = {"High": 3, "Medium": 2, "Low": 1}
+
+# Tables whose rows belong to one user (tasks.user_id etc.)
+USER_TABLES = ("tasks", "slot", "schedule", "time_logs")
+
+# Applied to every connection. WAL lets readers and the writer work at the same
+# time; NORMAL sync is durable in WAL mode except across power loss; the busy
+# timeout makes any writer outside the app wait instead of failing at once.
+PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("busy_timeout", 5000),
+    ("cache_size", -16000),  # KiB, i.e. 16 MB of page cache per connection
+    ("mmap_size", 128 * 1024 * 1024),
+    ("foreign_keys", "ON"),
+)
+
+
+def connect(path=DB_PATH, factory=sqlite3.Connection):
+    conn = sqlite3.connect(path, check_same_thread=False, factory=factory)
+    for name, value in PRAGMAS:
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
 
 # Initialize DB
-def init_db():
-    conn = sqlite3.connect('2.db', check_same_thread=False)
-    c = conn.cursor()
-    # Create tables if they don't exist
-    c.execute('''CREATE TABLE IF NOT EXISTS users (
-                    id INTEGER PRIMARY KEY,
-                    username TEXT UNIQUE,
-                    password TEXT
-                )''')
-    c.execute('''CREATE TABLE IF NOT EXISTS tasks (
-                    id INTEGER PRIMARY KEY,
-                    topic TEXT,
-                    subtopics TEXT,
-                    due_date TEXT,
-                    status TEXT,
-                    priority TEXT,
-                    progress INTEGER,
-                    category TEXT,
-                    recurrence TEXT
-                )''')
-    c.execute('''CREATE TABLE IF NOT EXISTS slot (
-                    id INTEGER ,
-                    date TEXT PRIMARY KEY,
-                    slot TEXT 
-                )''')
-    
-    c.execute('''CREATE TABLE IF NOT EXISTS schedule (
-                    id INTEGER PRIMARY KEY,
-                    date TEXT,
-                    slot TEXT,
-                    task_id INTEGER,
-                    subtopics TEXT,  -- Add this column
-                    FOREIGN KEY(task_id) REFERENCES tasks(id)
-                )''')
-    c.execute('''CREATE TABLE IF NOT EXISTS time_logs (
-                    id INTEGER PRIMARY KEY,
-                    task_id INTEGER,
-                    start_time TEXT,
-                    end_time TEXT,
-                    time_spent INTEGER,  -- Time spent in seconds
-                    FOREIGN KEY(task_id) REFERENCES tasks(id)
-                )''')
-    conn.commit()
-
-
-    
+def init_db(path=DB_PATH):
+    conn = connect(path)
+    # Table rebuilds in migrations need foreign keys off
+    conn.execute("PRAGMA foreign_keys = OFF")
+    # Create or upgrade tables and indexes (see migrations.py)
+    migrations.migrate(conn)
+    conn.execute("PRAGMA foreign_keys = ON")
     return conn
 
+
+def claim_unowned_rows(conn, user_id):
+    """Give rows that predate per-user data (user_id NULL) to `user_id`.
+
+    Only matters for a database migrated before anyone registered, whose old
+    rows no account can see until an admin runs `python db.py claim <user_id>`.
+    Runs in the caller's transaction and returns the number of rows claimed.
+    """
+    import rollups
+
+    if not any(conn.execute(f"SELECT 1 FROM {table} WHERE user_id IS NULL LIMIT 1").fetchone()
+               for table in USER_TABLES):
+        return 0
+    claimed = 0
+    for table in USER_TABLES:
+        claimed += conn.execute(f"UPDATE {table} SET user_id = ? WHERE user_id IS NULL", (user_id,)).rowcount
+    # The time_logs rollups are keyed by user_id but only maintained on insert/delete
+    rollups.recompute(conn)
+    return claimed
+
+
+if __name__ == "__main__":
+    # Usage: python db.py claim <user_id> [db_path]
+    if len(sys.argv) < 3 or sys.argv[1] != "claim":
+        sys.exit("usage: python db.py claim <user_id> [db_path]")
+    user_id = int(sys.argv[2])
+    conn = init_db(sys.argv[3] if len(sys.argv) > 3 else DB_PATH)
+    if conn.execute("SELECT 1 FROM users WHERE id = ?", (user_id,)).fetchone() is None:
+        sys.exit(f"No user with id {user_id}")
+    with conn:
+        claimed = claim_unowned_rows(conn, user_id)
+    print(f"{claimed} rows claimed by user {user_id}")
@@ -0,0 +1,114 @@
+import hashlib
+import re
+import zlib
+
+import numpy as np
+
+# Text embeddings for the semantic index. Every embedder has a `name` (index
+# files and cached vectors are kept per name) and `embed(texts)`, which returns
+# one L2-normalized float32 row per text, so inner product is cosine similarity.
+
+_TOKEN = re.compile(r"\w+")
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class HashingEmbedder:
+    """Local stand-in that needs no network or model download.
+
+    Words (with a plural "s" dropped), word pairs and character trigrams are
+    hashed into `dim` signed buckets. It finds near-identical texts (reworded
+    questions, "Python loops" vs "python loop") well; it knows nothing about
+    meaning beyond shared words.
+    """
+
+    def __init__(self, dim=512):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text):
+        words = [word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+                 for word in _TOKEN.findall(text.lower())]
+        yield from words
+        yield from (f"{a} {b}" for a, b in zip(words, words[1:]))
+        for word in words:
+            padded = f"<{word}>"
+            yield from (padded[i:i + 3] for i in range(len(padded) - 2))
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                bucket = zlib.crc32(feature.encode("utf-8"))
+                # One hash bit picks the sign so collisions tend to cancel out
+                vectors[row, bucket % self.dim] += 1.0 if bucket & 0x80000000 else -1.0
+        return _normalize(vectors)
+
+
+class OpenAIEmbedder:
+    def __init__(self, model="text-embedding-3-small", api_key=None):
+        from langchain_openai import OpenAIEmbeddings
+
+        self.name = f"openai-{model}"
+        self._client = OpenAIEmbeddings(model=model, api_key=api_key)
+
+    def embed(self, texts):
+        return _normalize(self._client.embed_documents(list(texts)))
+
+
+class CachedEmbedder:
+    """Wraps an embedder with batching and the persistent `embedding_cache` table.
+
+    Each distinct text is embedded once per model: repeated texts in a call
+    are sent once, cached vectors are read back instead of re-embedded, and
+    the rest go out in batches of `batch_size`. New vectors are stored through
+    the database's writer without waiting.
+    """
+
+    def __init__(self, embedder, database, batch_size=100):
+        self.embedder = embedder
+        self.name = embedder.name
+        self.database = database
+        self.batch_size = batch_size
+        self.calls = 0  # Batches sent to the wrapped embedder
+
+    def embed(self, texts):
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        keys = [hashlib.sha256(text.encode("utf-8")).hexdigest() for text in texts]
+        found = self._lookup(sorted(set(keys)))
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+        missing_keys = list(missing)
+        for start in range(0, len(missing_keys), self.batch_size):
+            batch = missing_keys[start:start + self.batch_size]
+            vectors = self.embedder.embed([missing[key] for key in batch])
+            self.calls += 1
+            rows = [(self.name, key, vector.tobytes()) for key, vector in zip(batch, vectors)]
+            self.database.submit(_store, rows)
+            found.update(zip(batch, vectors))
+        return np.vstack([found[key] for key in keys])
+
+    def _lookup(self, keys, chunk=500):
+        found = {}
+        conn = self.database.reader()
+        for start in range(0, len(keys), chunk):
+            part = keys[start:start + chunk]
+            rows = conn.execute(
+                f"SELECT key, vector FROM embedding_cache WHERE model = ? AND key IN ({', '.join('?' * len(part))})",
+                (self.name, *part))
+            found.update((key, np.frombuffer(vector, dtype=np.float32)) for key, vector in rows)
+        return found
+
+
+# Write job (runs on the database's writer thread)
+
+def _store(conn, rows):
+    conn.executemany("INSERT OR REPLACE INTO embedding_cache (model, key, vector) VALUES (?, ?, ?)", rows)
@@ -0,0 +1,186 @@
+import argparse
+import csv
+import datetime
+import io
+import json
+import sys
+import tempfile
+
+import db
+import rollups
+
+# Chunked data export. Rows are read from the cursor `chunk_size` at a time
+# and written straight to a file, so writing to disk (the command line below)
+# holds one chunk in memory whatever the table size. A browser download is
+# held in memory once it is built: Streamlit sends the whole file as bytes.
+# Parquet needs pyarrow; CSV and JSONL only use the standard library.
+
+CHUNK_SIZE = 5000
+FORMATS = ("csv", "jsonl", "parquet")
+MIME_TYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson", "parquet": "application/vnd.apache.parquet"}
+
+# name -> (columns, FROM clause, date expression, status column, category column)
+# Rows are always limited to one user (<name>.user_id); time_logs and schedule
+# rows are filtered on the status/category of their task.
+TABLES = {
+    "tasks": (
+        ("id", "topic", "subtopics", "due_date", "status", "priority", "progress", "category", "recurrence"),
+        "tasks",
+        "due_date", "status", "category",
+    ),
+    "time_logs": (
+        ("id", "task_id", "topic", "category", "start_time", "end_time", "time_spent"),
+        "time_logs LEFT JOIN tasks ON tasks.id = time_logs.task_id",
+        rollups.DAY_SQL.format(col="time_logs.start_time"), "tasks.status", "tasks.category",
+    ),
+    "schedule": (
+        ("id", "date", "slot", "task_id", "topic", "subtopics", "start_minute", "end_minute"),
+        "schedule LEFT JOIN tasks ON tasks.id = schedule.task_id",
+        "schedule.date", "tasks.status", "tasks.category",
+    ),
+}
+
+# Integer columns in every table; everything else is exported as text
+INTEGER_COLUMNS = {"id", "task_id", "progress", "time_spent", "start_minute", "end_minute"}
+
+# Column -> SQL expression where the bare name would be ambiguous or needs converting
+_COLUMN_SQL = {
+    "time_logs": {
+        "id": "time_logs.id",
+        "start_time": "datetime(CAST(time_logs.start_time AS REAL), 'unixepoch', 'localtime')",
+        "end_time": "datetime(CAST(time_logs.end_time AS REAL), 'unixepoch', 'localtime')",
+    },
+    "schedule": {"id": "schedule.id", "subtopics": "schedule.subtopics"},
+}
+
+
+def build_query(table, user_id, start_date=None, end_date=None, statuses=None, categories=None):
+    """(sql, params) selecting one user's rows of `table` with the optional filters applied."""
+    columns, source, date_sql, status_sql, category_sql = TABLES[table]
+    overrides = _COLUMN_SQL.get(table, {})
+    select = ", ".join(overrides.get(column, column) for column in columns)
+    where, params = [f"{table}.user_id = ?"], [user_id]
+    if start_date:
+        where.append(f"{date_sql} >= ?")
+        params.append(str(start_date))
+    if end_date:
+        where.append(f"{date_sql} <= ?")
+        params.append(str(end_date))
+    for column_sql, values in ((status_sql, statuses), (category_sql, categories)):
+        if values:
+            where.append(f"{column_sql} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+    return f"SELECT {select} FROM {source} WHERE " + " AND ".join(where), params
+
+
+def iter_chunks(conn, table, user_id, chunk_size=CHUNK_SIZE, **filters):
+    """Yield lists of at most `chunk_size` rows."""
+    sql, params = build_query(table, user_id, **filters)
+    cursor = conn.execute(sql, params)
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cursor.close()
+
+
+def _write_csv(out, columns, chunks):
+    text = io.TextIOWrapper(out, encoding="utf-8", newline="")
+    writer = csv.writer(text)
+    writer.writerow(columns)
+    count = 0
+    for rows in chunks:
+        writer.writerows(rows)
+        count += len(rows)
+    text.flush()
+    text.detach()
+    return count
+
+
+def _write_jsonl(out, columns, chunks):
+    count = 0
+    for rows in chunks:
+        out.write("".join(json.dumps(dict(zip(columns, row))) + "\n" for row in rows).encode("utf-8"))
+        count += len(rows)
+    return count
+
+
+def _write_parquet(out, columns, chunks):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+    schema = pa.schema([(column, pa.int64() if column in INTEGER_COLUMNS else pa.string())
+                        for column in columns])
+    count = 0
+    with pq.ParquetWriter(out, schema) as writer:
+        for rows in chunks:
+            # One row group per chunk
+            arrays = [pa.array([_parquet_value(value, field.type) for value in values], field.type)
+                      for field, values in zip(schema, zip(*rows))]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            count += len(rows)
+    return count
+
+
+def _parquet_value(value, type_):
+    import pyarrow as pa
+    if value is None:
+        return None
+    if pa.types.is_integer(type_):
+        # Legacy rows can hold text in integer columns (e.g. a topic as task_id)
+        return value if isinstance(value, int) else None
+    return value if isinstance(value, str) else str(value)
+
+
+_WRITERS = {"csv": _write_csv, "jsonl": _write_jsonl, "parquet": _write_parquet}
+
+
+def write_export(conn, out, table, user_id, fmt="csv", chunk_size=CHUNK_SIZE, **filters):
+    """Stream `table` into the binary file `out`; returns the number of rows written."""
+    if fmt not in _WRITERS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    columns = TABLES[table][0]
+    return _WRITERS[fmt](out, columns, iter_chunks(conn, table, user_id, chunk_size, **filters))
+
+
+def export_bytes(conn, table, user_id, fmt="csv", chunk_size=CHUNK_SIZE, **filters):
+    """The whole export as bytes, for st.download_button.
+
+    Built in a temporary file (closed and deleted before returning), so only
+    the finished bytes are held, not the rows as well.
+    """
+    with tempfile.TemporaryFile() as out:
+        write_export(conn, out, table, user_id, fmt, chunk_size, **filters)
+        out.seek(0)
+        return out.read()
+
+
+def file_name(table, fmt):
+    return f"{table}_{datetime.date.today().isoformat()}.{fmt}"
+
+
+if __name__ == "__main__":
+    # Usage: python export.py tasks --user-id 1 --format parquet --out tasks.parquet [--status Pending ...]
+    parser = argparse.ArgumentParser(description="Export a table in chunks")
+    parser.add_argument("table", choices=sorted(TABLES))
+    parser.add_argument("--user-id", type=int, required=True)
+    parser.add_argument("--format", default="csv", choices=FORMATS)
+    parser.add_argument("--out", help="output file (default: <table>_<date>.<format>)")
+    parser.add_argument("--start-date")
+    parser.add_argument("--end-date")
+    parser.add_argument("--status", action="append", dest="statuses")
+    parser.add_argument("--category", action="append", dest="categories")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--db", default=db.DB_PATH)
+    args = parser.parse_args()
+    path = args.out or file_name(args.table, args.format)
+    with open(path, "wb") as out:
+        count = write_export(db.init_db(args.db), out, args.table, args.user_id, args.format, args.chunk_size,
+                             start_date=args.start_date, end_date=args.end_date,
+                             statuses=args.statuses, categories=args.categories)
+    print(f"Wrote {count} rows to {path}", file=sys.stderr)
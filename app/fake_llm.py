@@ -0,0 +1,131 @@
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# A local stand-in for the OpenAI chat completions endpoint, for exercising
+# llm_governor without an API key or a bill. It answers after `latency`
+# seconds (streamed or not) and, like the real API, turns away requests over
+# `rate` per second with a 429 and a Retry-After header. Point the app at it
+# with OPENAI_BASE_URL=http://127.0.0.1:<port>/v1.
+
+
+def default_reply(prompt):
+    return f"This is a canned answer to a prompt of {len(prompt)} characters. " * 4
+
+
+class FakeLLMServer:
+    def __init__(self, port=0, latency=0.05, rate=None, burst=None, reply=default_reply):
+        self.latency = latency
+        self.rate = rate  # Requests per second; None for no limit
+        self.burst = burst or rate
+        self.reply = reply
+        self.requests = 0
+        self.rate_limited = 0
+        self._allowance = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def serve(self):
+        self._server.serve_forever()
+
+    def start(self):
+        """Serve on a background thread."""
+        self._thread = threading.Thread(target=self.serve, name="fake-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _admit(self):
+        with self._lock:
+            self.requests += 1
+            if self.rate is None:
+                return True
+            now = time.monotonic()
+            self._allowance = min(self.burst, self._allowance + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._allowance < 1:
+                self.rate_limited += 1
+                return False
+            self._allowance -= 1
+            return True
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status, body, headers=()):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": f"No route {self.path}"}})
+                    return
+                if not server._admit():
+                    wait = 1 / server.rate
+                    self._send_json(429, {"error": {"message": "Rate limit reached for requests",
+                                                    "type": "requests", "code": "rate_limit_exceeded"}},
+                                    [("Retry-After", f"{wait:.3f}"), ("Retry-After-Ms", str(int(wait * 1000)))])
+                    return
+                prompt = "\n".join(str(m.get("content", "")) for m in request.get("messages", []))
+                text = server.reply(prompt)
+                usage = {"prompt_tokens": (len(prompt) + 3) // 4, "completion_tokens": (len(text) + 3) // 4}
+                usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+                base = {"id": f"fake-{server.requests}", "created": int(time.time()),
+                        "model": request.get("model", "fake")}
+                time.sleep(server.latency)
+                if not request.get("stream"):
+                    self._send_json(200, dict(base, object="chat.completion", usage=usage, choices=[
+                        {"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}]))
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                words = text.split(" ")
+                for i, word in enumerate(words):
+                    delta = {"content": word + (" " if i < len(words) - 1 else "")}
+                    chunk = dict(base, object="chat.completion.chunk",
+                                 choices=[{"index": 0, "delta": delta, "finish_reason": None}])
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                done = dict(base, object="chat.completion.chunk",
+                            choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}])
+                self.wfile.write(f"data: {json.dumps(done)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+                self.close_connection = True
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a fake OpenAI chat completions API")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds before each answer")
+    parser.add_argument("--rate", type=float, default=None, help="requests per second before 429s")
+    args = parser.parse_args()
+    fake = FakeLLMServer(args.port, args.latency, args.rate)
+    print(f"Fake LLM API at {fake.url} (set OPENAI_BASE_URL to this)")
+    fake.serve()
@@ -0,0 +1,102 @@
+import datetime
+import os
+
+import rollups
+
+# Prompt builder for the "AI Insights" panel. Aggregates are computed in SQL and
+# always included; individual task rows are then added, most relevant first,
+# until the token budget is used up.
+
+DEFAULT_TOKEN_BUDGET = int(os.getenv("INSIGHTS_TOKEN_BUDGET", 1500))
+
+INSTRUCTIONS = """
+Provide insights on:
+1. Peak productivity hours.
+2. Frequently missed deadlines.
+3. Suggestions for improving task completion.
+"""
+
+# Overdue pending tasks first (oldest due date first), then pending work by
+# priority and due date, then completed tasks with the most tracked time
+_DETAIL_ROWS = """
+    SELECT t.topic, t.due_date, t.status, t.priority, t.progress, COALESCE(r.total_seconds, 0)
+    FROM tasks t
+    LEFT JOIN task_time_totals r ON r.task_id = t.id
+    WHERE t.user_id = :user_id
+    ORDER BY
+        CASE WHEN t.status != 'Completed' AND t.due_date < :today THEN 0
+             WHEN t.status != 'Completed' THEN 1
+             ELSE 2 END,
+        CASE WHEN t.status != 'Completed' THEN t.priority_rank ELSE 0 END DESC,
+        CASE WHEN t.status != 'Completed' THEN t.due_date END,
+        COALESCE(r.total_seconds, 0) DESC
+"""
+
+
+def estimate_tokens(text):
+    """Rough GPT token count (~4 characters per token), good enough for budgeting."""
+    return (len(text) + 3) // 4
+
+
+def _summary_sections(conn, user_id, today):
+    status_counts = conn.execute(
+        "SELECT status, SUM(tasks) FROM task_counts WHERE user_id = ? GROUP BY status", (user_id,)
+    ).fetchall()
+    overdue = conn.execute("""
+        SELECT category, COUNT(*) FROM tasks
+        WHERE user_id = ? AND status != 'Completed' AND due_date < ?
+        GROUP BY category ORDER BY COUNT(*) DESC
+    """, (user_id, today)).fetchall()
+    categories = rollups.category_totals(conn, user_id)
+    hours = rollups.hourly_totals(conn, user_id)
+
+    lines = ["Task counts by status: " + ", ".join(f"{status}: {count}" for status, count in status_counts)]
+    lines.append("Overdue (missed deadline) tasks by category: "
+                 + (", ".join(f"{category}: {count}" for category, count in overdue) or "none"))
+    lines.append("Time spent per category (seconds): "
+                 + (", ".join(f"{category or 'Uncategorized'}: {total}" for category, total in categories) or "none"))
+    lines.append("Time spent by hour of day started (hour: seconds over sessions): "
+                 + (", ".join(f"{hour:02}h: {total}s/{count}" for hour, total, count in hours) or "none"))
+    return "\n".join(lines)
+
+
+def build_insights_prompt(conn, user_id, token_budget=DEFAULT_TOKEN_BUDGET, today=None):
+    """Build the insights prompt for one user's data within `token_budget`.
+
+    Returns (prompt, tokens_used, detail_rows_included).
+    """
+    today = today or datetime.date.today().isoformat()
+    header = "Analyze the following task and time tracking data to provide insights:\n\n"
+    summary = "Summary:\n" + _summary_sections(conn, user_id, today) + "\n\n"
+    used = estimate_tokens(header + summary + INSTRUCTIONS) + estimate_tokens("Most relevant tasks:\n")
+
+    details = []
+    for topic, due_date, status, priority, progress, seconds in conn.execute(_DETAIL_ROWS, {"today": today, "user_id": user_id}):
+        line = (f"Task: {topic}, Due: {due_date}, Status: {status}, Priority: {priority}, "
+                f"Progress: {progress}%, Time Spent: {seconds} seconds\n")
+        cost = estimate_tokens(line)
+        if used + cost > token_budget:
+            break
+        details.append(line)
+        used += cost
+
+    prompt = header + summary
+    if details:
+        prompt += "Most relevant tasks:\n" + "".join(details)
+    prompt += INSTRUCTIONS
+    return prompt, estimate_tokens(prompt), len(details)
+
+
+def generate_insights(params, progress):
+    """Job (see jobs.py): the insights text for a user, with the prompt's size."""
+    import llm_client  # The LLM stack loads only when a job runs
+    import resources
+
+    prompt, prompt_tokens, detail_rows = build_insights_prompt(resources.get_db().reader(), params["user_id"])
+    parts = []
+    for chunk in llm_client.stream(prompt, use_cache=params["use_cache"], user_id=params["user_id"]):
+        parts.append(chunk)
+        progress({"text": "".join(parts), "prompt_tokens": prompt_tokens, "detail_rows": detail_rows})
+    if not "".join(parts).strip():
+        raise ValueError("Invalid response from OpenAI. Please try again.")
+    return {"text": "".join(parts), "prompt_tokens": prompt_tokens, "detail_rows": detail_rows}
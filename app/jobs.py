@@ -0,0 +1,144 @@
+import importlib
+import json
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import queries
+
+# LLM work that outlives a script run. A job is a row in `jobs` (see
+# migrations.py): the panel submits it and gets its id back at once, a thread
+# pool runs it, and the partial and final results are stored in the row. A
+# rerun, a reconnect or a restart finds the job again by user, kind and ref
+# instead of paying for another completion.
+
+# kind -> (module, function). The function is called with (params, progress)
+# on a pool thread and returns the result; progress(partial) stores a partial
+# result for the UI to show. Results must be JSON-serializable.
+KINDS = {
+    "schedule_breakdown": ("scheduler", "generate_breakdown"),
+    "insights": ("insights", "generate_insights"),
+}
+
+PENDING = ("queued", "running")
+
+Job = namedtuple("Job", "id status result error updated_at")
+
+
+def _job(row):
+    if row is None:
+        return None
+    job_id, status, result, error, updated_at = row
+    return Job(job_id, status, json.loads(result) if result else None, error, updated_at)
+
+
+def get(conn, job_id):
+    """The Job with `job_id`, or None."""
+    return _job(conn.execute(queries.JOB, (job_id,)).fetchone())
+
+
+def latest(conn, user_id, kind, ref=None):
+    """The user's newest job of `kind` for `ref` that has not been dismissed, or None."""
+    return _job(conn.execute(queries.LATEST_JOB, (user_id, kind, ref)).fetchone())
+
+
+class JobRunner:
+    def __init__(self, database, max_workers=4, progress_interval=0.5):
+        self.database = database  # database.Database; job rows are only written through its writer
+        self.progress_interval = progress_interval  # Seconds between stored partial results
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-job")
+
+    def start(self):
+        # Jobs cut off by a restart run again; finished completions come back from the LLM cache
+        for job_id in self.database.write(_requeue_interrupted):
+            self._executor.submit(self._run, job_id)
+
+    def stop(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def submit(self, user_id, kind, params, ref=None):
+        """Queue a job and return its id without waiting for it.
+
+        A queued or running job with the same user, kind, ref and params is
+        returned instead of starting a second one.
+        """
+        if kind not in KINDS:
+            raise ValueError(f"unknown job kind: {kind}")
+        job_id, created = self.database.write(
+            _insert_job, user_id, kind, ref, json.dumps(params, sort_keys=True))
+        if created:
+            self._executor.submit(self._run, job_id)
+        return job_id
+
+    def _run(self, job_id):
+        claimed = self.database.write(_claim, job_id)
+        if claimed is None:
+            return  # Already run (resubmitted after a restart) or removed
+        kind, params = claimed
+        module_name, function_name = KINDS[kind]
+        last_progress = [0.0]
+
+        def progress(partial):
+            now = time.monotonic()
+            if now - last_progress[0] >= self.progress_interval:
+                last_progress[0] = now
+                self.database.submit(_store_progress, job_id, json.dumps(partial))
+
+        try:
+            result = getattr(importlib.import_module(module_name), function_name)(json.loads(params), progress)
+            self.database.write(_finish, job_id, json.dumps(result))
+        except Exception as e:
+            self.database.write(_fail, job_id, str(e))
+
+
+# Write jobs (run on the database's writer thread)
+
+def _insert_job(conn, user_id, kind, ref, params):
+    """Return (job id, whether a new job was created)."""
+    row = conn.execute(f"""
+        SELECT id FROM jobs
+        WHERE user_id = ? AND kind = ? AND ref IS ? AND dismissed = 0
+          AND params = ? AND status IN {PENDING!r}
+    """, (user_id, kind, ref, params)).fetchone()
+    if row is not None:
+        return row[0], False
+    now = time.time()
+    cur = conn.execute("""
+        INSERT INTO jobs (user_id, kind, ref, params, status, created_at, updated_at)
+        VALUES (?, ?, ?, ?, 'queued', ?, ?)
+    """, (user_id, kind, ref, params, now, now))
+    return cur.lastrowid, True
+
+
+def _requeue_interrupted(conn):
+    conn.execute("UPDATE jobs SET status = 'queued', result = NULL WHERE status = 'running'")
+    return [job_id for job_id, in conn.execute(
+        f"SELECT id FROM jobs WHERE status IN {PENDING!r} ORDER BY id")]
+
+
+def _claim(conn, job_id):
+    """Mark a queued job running and return its (kind, params), or None."""
+    row = conn.execute("SELECT kind, params FROM jobs WHERE id = ? AND status = 'queued'", (job_id,)).fetchone()
+    if row is not None:
+        conn.execute("UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ?", (time.time(), job_id))
+    return row
+
+
+def _store_progress(conn, job_id, partial):
+    conn.execute("UPDATE jobs SET result = ?, updated_at = ? WHERE id = ? AND status = 'running'",
+                 (partial, time.time(), job_id))
+
+
+def _finish(conn, job_id, result):
+    conn.execute("UPDATE jobs SET status = 'done', result = ?, error = NULL, updated_at = ? WHERE id = ?",
+                 (result, time.time(), job_id))
+
+
+def _fail(conn, job_id, error):
+    conn.execute("UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+                 (error, time.time(), job_id))
+
+
+def dismiss(conn, job_id):
+    """Hide a finished job from latest() (e.g. once its result is saved)."""
+    conn.execute("UPDATE jobs SET dismissed = 1, updated_at = ? WHERE id = ?", (time.time(), job_id))
@@ -0,0 +1,98 @@
+import hashlib
+import re
+import threading
+import time
+
+# Persistent LLM response cache stored in the app database (table `llm_cache`,
+# created by migrations.py). Entries expire after `ttl` seconds and the least
+# recently used ones are evicted once the cache holds more than `max_entries`.
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt):
+    """Collapse whitespace so re-indented copies of a prompt share one entry."""
+    return _WHITESPACE.sub(" ", prompt).strip()
+
+
+def cache_key(model_name, prompt):
+    raw = f"{model_name}\0{normalize_prompt(prompt)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Cache backed by a database.Database.
+
+    Lookups use the calling thread's read connection. Writes (new entries,
+    hit bookkeeping, expiry) are queued on the writer without waiting, so a
+    cache hit never blocks on a commit.
+    """
+
+    def __init__(self, database, ttl=7 * 24 * 3600, max_entries=1000):
+        self.database = database
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()  # Guards the hit/miss counters
+
+    def get(self, model_name, prompt):
+        """Return the cached response, or None on a miss or expired entry."""
+        key = cache_key(model_name, prompt)
+        now = time.time()
+        row = self.database.reader().execute(
+            "SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or now - row[1] > self.ttl:
+            if row is not None:
+                self.database.submit(_delete, key)
+            with self._lock:
+                self.misses += 1
+            return None
+        self.database.submit(_touch, key, now)
+        with self._lock:
+            self.hits += 1
+        return row[0]
+
+    def put(self, model_name, prompt, response):
+        self.database.submit(_store, cache_key(model_name, prompt), model_name, response,
+                             time.time(), self.max_entries)
+
+    def clear(self):
+        self.database.write(lambda conn: conn.execute("DELETE FROM llm_cache"))
+
+    def stats(self):
+        entries = self.database.reader().execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+            "entries": entries,
+        }
+
+
+# Write jobs (run on the database's writer thread)
+
+def _delete(conn, key):
+    conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+
+
+def _touch(conn, key, now):
+    conn.execute("UPDATE llm_cache SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, key))
+
+
+def _store(conn, key, model_name, response, now, max_entries):
+    conn.execute("""
+        INSERT OR REPLACE INTO llm_cache (key, model, response, created_at, last_used, hits)
+        VALUES (?, ?, ?, ?, ?, 0)
+    """, (key, model_name, response, now, now))
+    excess = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] - max_entries
+    if excess > 0:
+        conn.execute("""
+            DELETE FROM llm_cache WHERE key IN (
+                SELECT key FROM llm_cache ORDER BY last_used LIMIT ?
+            )
+        """, (excess,))
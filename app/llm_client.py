@@ -0,0 +1,55 @@
+import time
+
+import resources
+
+# Single entry point for LLM completions so every panel shares the response
+# cache and the governor's rate limits, retries and usage accounting
+# (llm_governor.py). `user_id` is who the call is billed to; None is
+# background work that no user asked for. Cache hits are recorded to the
+# perf recorder here; the governor records the calls that reach the API.
+
+
+def _record_hit(model_name, start, user_id):
+    recorder = resources.get_recorder()
+    if recorder is not None:
+        recorder.record("llm", model_name, time.perf_counter() - start, cache="hit", user_id=user_id)
+
+
+def complete(prompt, model_name="gpt-4", use_cache=True, user_id=None):
+    """Return the completion text for `prompt`.
+
+    Identical prompts (after whitespace normalization) are answered from the
+    response cache. Pass use_cache=False to force a fresh completion; the new
+    answer replaces the cached one.
+    """
+    cache = resources.get_llm_cache()
+    if use_cache:
+        start = time.perf_counter()
+        cached = cache.get(model_name, prompt)
+        if cached is not None:
+            _record_hit(model_name, start, user_id)
+            return cached
+    text = resources.get_governor().complete(model_name, prompt, user_id)
+    cache.put(model_name, prompt, text)
+    return text
+
+
+def stream(prompt, model_name="gpt-4", use_cache=True, user_id=None):
+    """Yield the completion for `prompt` as text chunks while tokens arrive.
+
+    A cache hit is yielded as a single chunk. A streamed answer is cached only
+    once it has been received in full.
+    """
+    cache = resources.get_llm_cache()
+    if use_cache:
+        start = time.perf_counter()
+        cached = cache.get(model_name, prompt)
+        if cached is not None:
+            _record_hit(model_name, start, user_id)
+            yield cached
+            return
+    parts = []
+    for chunk in resources.get_governor().stream(model_name, prompt, user_id):
+        parts.append(chunk)
+        yield chunk
+    cache.put(model_name, prompt, "".join(parts))
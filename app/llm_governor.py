@@ -0,0 +1,321 @@
+import datetime
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+import llm_cache
+
+# Every LLM request goes through one Governor (see llm_client.py), which
+#  - limits requests and tokens per minute for the whole app, and tokens per
+#    minute per user, with token buckets: a caller waits for its turn instead
+#    of turning a burst into a storm of 429s;
+#  - caps how many requests are in flight at once;
+#  - retries rate limits, timeouts and server errors with jittered
+#    exponential backoff, honouring Retry-After;
+#  - runs identical prompts that are already in flight only once;
+#  - adds each request's tokens and cost to the `llm_usage` table;
+#  - records each call's latency and tokens to a perf.Recorder, if given.
+
+# USD per 1K (prompt, completion) tokens; models not listed are counted at 0
+PRICES = {
+    "gpt-4": (0.03, 0.06),
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+}
+
+COMPLETION_ESTIMATE = 400  # Tokens reserved for an answer until its real size is known
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+RETRY_ERRORS = ("RateLimitError", "APITimeoutError", "APIConnectionError", "InternalServerError",
+                "ServiceUnavailableError", "Timeout", "TryAgain")
+
+
+class RateLimited(Exception):
+    """The caller would have to wait longer than the governor's max_wait."""
+
+
+def estimate_tokens(text):
+    """Rough GPT token count (~4 characters per token), as in insights.estimate_tokens."""
+    return (len(text) + 3) // 4
+
+
+class TokenBucket:
+    """`rate` units per second, holding at most `capacity`.
+
+    reserve() always takes the units, letting the level go negative, and
+    returns how long the caller must wait; callers are served in the order
+    they reserve and nobody polls.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._level = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount):
+        with self._lock:
+            self._refill()
+            self._level -= amount
+            return max(0.0, -self._level / self.rate)
+
+    def wait_time(self, amount):
+        """How long reserve(amount) would make the caller wait, without reserving."""
+        with self._lock:
+            self._refill()
+            return max(0.0, (amount - self._level) / self.rate)
+
+    def pause(self, seconds):
+        """Make the next reservation wait at least `seconds`."""
+        with self._lock:
+            self._refill()
+            self._level = min(self._level, -seconds * self.rate)
+
+    def adjust(self, amount):
+        """Take `amount` more (or give back, if negative) once the real cost is known."""
+        with self._lock:
+            self._refill()
+            self._level = min(self.capacity, self._level - amount)
+
+
+def _status(error):
+    for source in (error, getattr(error, "response", None)):
+        for name in ("status_code", "http_status", "status"):
+            status = getattr(source, name, None)
+            if isinstance(status, int):
+                return status
+    return None
+
+
+def _retry_after(error):
+    """Seconds the API asked us to wait (Retry-After), or None."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or getattr(error, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+def retryable(error):
+    status = _status(error)
+    if status is not None:
+        return status in RETRY_STATUSES
+    return isinstance(error, (TimeoutError, ConnectionError)) or type(error).__name__ in RETRY_ERRORS
+
+
+def _usage(message, prompt, text):
+    """(prompt tokens, completion tokens) reported for a response, else estimated."""
+    usage = getattr(message, "usage_metadata", None) or {}
+    if usage.get("input_tokens") is not None:
+        return usage["input_tokens"], usage.get("output_tokens") or 0
+    usage = (getattr(message, "response_metadata", None) or {}).get("token_usage") or {}
+    if usage.get("prompt_tokens") is not None:
+        return usage["prompt_tokens"], usage.get("completion_tokens") or 0
+    return estimate_tokens(prompt), estimate_tokens(text)
+
+
+def cost(model_name, prompt_tokens, completion_tokens):
+    prompt_price, completion_price = PRICES.get(model_name, (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
+
+
+class Governor:
+    def __init__(self, database, get_llm, rpm=500, tpm=150000, user_tpm=40000, max_concurrency=8,
+                 max_retries=5, base_delay=0.5, max_delay=20.0, max_wait=120.0, recorder=None):
+        self.database = database  # Usage rows are written through its writer
+        self.get_llm = get_llm  # model name -> chat client with invoke() and stream()
+        self.recorder = recorder
+        self.user_tpm = user_tpm
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_wait = max_wait
+        # Bursts of up to one second's worth, so a busy minute is spread out
+        # rather than spent in its first second; no bucket smaller than one request
+        self._requests = TokenBucket(rpm / 60, max(1.0, rpm / 60))
+        self._tokens = TokenBucket(tpm / 60, max(COMPLETION_ESTIMATE * 2, tpm / 60))
+        self._user_tokens = {}  # user id -> TokenBucket
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._in_flight = {}  # cache key -> Future of the response text
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "coalesced": 0, "retries": 0, "rate_limited": 0, "failed": 0}
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.stats[name] += amount
+
+    def _user_bucket(self, user_id):
+        with self._lock:
+            bucket = self._user_tokens.get(user_id)
+            if bucket is None:
+                bucket = self._user_tokens[user_id] = TokenBucket(
+                    self.user_tpm / 60, max(COMPLETION_ESTIMATE * 2, self.user_tpm / 60))
+            return bucket
+
+    def _admit(self, user_id, tokens):
+        """Wait until the user's and the app's buckets allow `tokens` more."""
+        buckets = [self._tokens] if user_id is None else [self._user_bucket(user_id), self._tokens]
+        if any(bucket.wait_time(tokens) > self.max_wait for bucket in buckets):
+            self._count("rate_limited")
+            raise RateLimited("Too many AI requests right now; please try again in a minute.")
+        time.sleep(max(bucket.reserve(tokens) for bucket in buckets))
+        return buckets
+
+    def _join(self, key):
+        """(future, True) for the first caller of `key`, (the leader's future, False) for the rest."""
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.stats["coalesced"] += 1
+                return future, False
+            future = self._in_flight[key] = Future()
+            return future, True
+
+    def _leave(self, key, future, error=None, text=None):
+        with self._lock:
+            self._in_flight.pop(key, None)
+        if error is not None:
+            future.set_exception(error if isinstance(error, Exception) else RuntimeError("LLM call abandoned"))
+        else:
+            future.set_result(text)
+
+    def _attempts(self):
+        """Yield attempt numbers, each once the request bucket lets it through."""
+        for attempt in range(self.max_retries + 1):
+            time.sleep(self._requests.reserve(1))
+            yield attempt
+
+    def _backoff(self, attempt, error):
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        if _status(error) == 429:
+            # Everyone else holds off too, rather than piling more 429s onto the API
+            self._requests.pause(min(retry_after or self.base_delay, self.max_delay))
+        self._count("retries")
+        time.sleep(delay)
+
+    def _observe(self, model_name, start, **fields):
+        if self.recorder is not None:
+            self.recorder.record("llm", model_name, time.perf_counter() - start, **fields)
+
+    def complete(self, model_name, prompt, user_id=None):
+        """The completion text for `prompt`, billed to `user_id` (None for background work)."""
+        start = time.perf_counter()
+        key = llm_cache.cache_key(model_name, prompt)
+        future, leader = self._join(key)
+        if not leader:
+            text = future.result()
+            self._observe(model_name, start, cache="coalesced", user_id=user_id)
+            return text
+        try:
+            text, usage = self._complete(model_name, prompt, user_id)
+        except BaseException as e:
+            self._leave(key, future, error=e)
+            self._observe(model_name, start, cache="miss", user_id=user_id, error=type(e).__name__)
+            raise
+        self._leave(key, future, text=text)
+        self._observe(model_name, start, cache="miss", user_id=user_id, **usage)
+        return text
+
+    def _complete(self, model_name, prompt, user_id):
+        reserved = estimate_tokens(prompt) + COMPLETION_ESTIMATE
+        buckets = self._admit(user_id, reserved)
+        for attempt in self._attempts():
+            try:
+                with self._slots:
+                    self._count("requests")
+                    message = self.get_llm(model_name).invoke(prompt)
+                break
+            except Exception as e:
+                if attempt == self.max_retries or not retryable(e):
+                    self._count("failed")
+                    self._record(user_id, model_name, attempt + 1, 0, 0)
+                    raise
+                self._backoff(attempt, e)
+        prompt_tokens, completion_tokens = _usage(message, prompt, message.content)
+        for bucket in buckets:
+            bucket.adjust(prompt_tokens + completion_tokens - reserved)
+        self._record(user_id, model_name, attempt + 1, prompt_tokens, completion_tokens)
+        return message.content, {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                                 "retries": attempt}
+
+    def stream(self, model_name, prompt, user_id=None):
+        """Yield the completion as text chunks. A call that joins an identical
+        in-flight prompt gets the whole answer as one chunk when it is done.
+
+        Failures are retried only until the first chunk has been yielded.
+        """
+        start = time.perf_counter()
+        key = llm_cache.cache_key(model_name, prompt)
+        future, leader = self._join(key)
+        if not leader:
+            yield future.result()
+            self._observe(model_name, start, cache="coalesced", user_id=user_id)
+            return
+        parts = []
+        first_chunk_ms = None
+        try:
+            reserved = estimate_tokens(prompt) + COMPLETION_ESTIMATE
+            buckets = self._admit(user_id, reserved)
+            for attempt in self._attempts():
+                try:
+                    with self._slots:
+                        self._count("requests")
+                        for chunk in self.get_llm(model_name).stream(prompt):
+                            if first_chunk_ms is None:
+                                first_chunk_ms = (time.perf_counter() - start) * 1000
+                            parts.append(chunk.content)
+                            yield chunk.content
+                    break
+                except Exception as e:
+                    if parts or attempt == self.max_retries or not retryable(e):
+                        self._count("failed")
+                        self._record(user_id, model_name, attempt + 1, 0, 0)
+                        raise
+                    self._backoff(attempt, e)
+        except BaseException as e:
+            self._leave(key, future, error=e)
+            self._observe(model_name, start, cache="miss", user_id=user_id, error=type(e).__name__)
+            raise
+        text = "".join(parts)
+        prompt_tokens, completion_tokens = estimate_tokens(prompt), estimate_tokens(text)
+        for bucket in buckets:
+            bucket.adjust(prompt_tokens + completion_tokens - reserved)
+        self._record(user_id, model_name, attempt + 1, prompt_tokens, completion_tokens)
+        self._leave(key, future, text=text)
+        self._observe(model_name, start, cache="miss", user_id=user_id, prompt_tokens=prompt_tokens,
+                      completion_tokens=completion_tokens, retries=attempt, first_chunk_ms=first_chunk_ms)
+
+    def _record(self, user_id, model_name, attempts, prompt_tokens, completion_tokens):
+        self.database.submit(_record_usage, user_id or 0, datetime.date.today().isoformat(), model_name,
+                             attempts, prompt_tokens, completion_tokens,
+                             cost(model_name, prompt_tokens, completion_tokens))
+
+
+# Write job (runs on the database's writer thread)
+
+def _record_usage(conn, user_id, day, model_name, attempts, prompt_tokens, completion_tokens, usd):
+    conn.execute("""
+        INSERT INTO llm_usage (user_id, day, model, requests, retries, prompt_tokens, completion_tokens, cost)
+        VALUES (?, ?, ?, 1, ?, ?, ?, ?)
+        ON CONFLICT(user_id, day, model) DO UPDATE SET
+            requests = requests + 1,
+            retries = retries + excluded.retries,
+            prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+            completion_tokens = completion_tokens + excluded.completion_tokens,
+            cost = cost + excluded.cost
+    """, (user_id, day, model_name, attempts - 1, prompt_tokens, completion_tokens, usd))
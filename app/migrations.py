@@ -0,0 +1,680 @@
+import re
+import sys
+
+import db
+import queries
+
+# Ordered schema migrations. Each step runs once, inside its own transaction,
+# and is recorded in `schema_version` so reruns only apply what is missing.
+
+
+def _create_base_tables(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY,
+                    username TEXT UNIQUE,
+                    password TEXT
+                )''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS tasks (
+                    id INTEGER PRIMARY KEY,
+                    topic TEXT,
+                    subtopics TEXT,
+                    due_date TEXT,
+                    status TEXT,
+                    priority TEXT,
+                    progress INTEGER,
+                    category TEXT,
+                    recurrence TEXT
+                )''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS slot (
+                    id INTEGER ,
+                    date TEXT PRIMARY KEY,
+                    slot TEXT
+                )''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS schedule (
+                    id INTEGER PRIMARY KEY,
+                    date TEXT,
+                    slot TEXT,
+                    task_id INTEGER,
+                    subtopics TEXT,
+                    FOREIGN KEY(task_id) REFERENCES tasks(id)
+                )''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS time_logs (
+                    id INTEGER PRIMARY KEY,
+                    task_id INTEGER,
+                    start_time TEXT,
+                    end_time TEXT,
+                    time_spent INTEGER,  -- Time spent in seconds
+                    FOREIGN KEY(task_id) REFERENCES tasks(id)
+                )''')
+
+
+def _add_priority_rank_and_indexes(conn):
+    # Sortable priority: High=3, Medium=2, Low=1, anything else 0 (db.PRIORITY_RANKS)
+    rank = "CASE {col} WHEN 'High' THEN 3 WHEN 'Medium' THEN 2 WHEN 'Low' THEN 1 ELSE 0 END"
+    conn.execute("ALTER TABLE tasks ADD COLUMN priority_rank INTEGER NOT NULL DEFAULT 0")
+    conn.execute(f"UPDATE tasks SET priority_rank = {rank.format(col='priority')}")
+    # Keep the rank in sync for every writer, not just the app's insert path
+    for event in ("INSERT", "UPDATE OF priority"):
+        name = "tasks_priority_rank_" + event.split()[0].lower()
+        conn.execute(f"""
+            CREATE TRIGGER {name} AFTER {event} ON tasks
+            BEGIN
+                UPDATE tasks SET priority_rank = {rank.format(col='NEW.priority')}
+                WHERE id = NEW.id;
+            END
+        """)
+
+    # "Today's Tasks" / "Generate Schedule": status filter + priority order, covering
+    conn.execute("""CREATE INDEX idx_tasks_status_priority
+                    ON tasks(status, priority_rank, topic, progress, priority, category, due_date)""")
+    # fetch_task_data and the insights time totals join on task_id
+    conn.execute("CREATE INDEX idx_time_logs_task ON time_logs(task_id, time_spent)")
+    # Saved schedules join schedule.task_id <-> tasks.id
+    conn.execute("CREATE INDEX idx_schedule_task ON schedule(task_id)")
+    # slot.date is the table's PRIMARY KEY, so the slot lookup already has an index
+
+
+def _create_llm_cache(conn):
+    conn.execute('''CREATE TABLE llm_cache (
+                    key TEXT PRIMARY KEY,  -- sha256 of model + normalized prompt
+                    model TEXT,
+                    response TEXT,
+                    created_at REAL,
+                    last_used REAL,
+                    hits INTEGER DEFAULT 0
+                )''')
+    # LRU eviction deletes the oldest last_used first
+    conn.execute("CREATE INDEX idx_llm_cache_last_used ON llm_cache(last_used)")
+
+
+def _create_quiz_queue(conn):
+    conn.execute('''CREATE TABLE quiz_queue (
+                    task_id INTEGER PRIMARY KEY,
+                    topic TEXT,
+                    subtopics TEXT,
+                    num_questions INTEGER,
+                    status TEXT,  -- queued | running | ready | failed
+                    quiz TEXT,  -- parsed questions as JSON
+                    error TEXT,
+                    attempts INTEGER DEFAULT 0,
+                    not_before REAL NOT NULL DEFAULT 0,  -- a failed job waits until then to retry
+                    updated_at REAL,
+                    FOREIGN KEY(task_id) REFERENCES tasks(id)
+                )''')
+    conn.execute("CREATE INDEX idx_quiz_queue_status ON quiz_queue(status, updated_at)")
+    conn.execute("CREATE INDEX idx_quiz_queue_topic ON quiz_queue(topic, status)")
+
+    # When a task's status last changed to Completed (NULL for tasks completed
+    # before this, or saved as Completed), so only real completions are queued
+    now = "(julianday('now') - 2440587.5) * 86400.0"  # Unix time, as time.time()
+    conn.execute("ALTER TABLE tasks ADD COLUMN completed_at REAL")
+    conn.execute("CREATE INDEX idx_tasks_completed_at ON tasks(completed_at) WHERE completed_at IS NOT NULL")
+    conn.execute(f"""CREATE TRIGGER tasks_completed_update AFTER UPDATE OF status ON tasks
+                     WHEN NEW.status IS NOT OLD.status BEGIN
+                         UPDATE tasks SET completed_at = CASE WHEN NEW.status = 'Completed' THEN {now} END
+                         WHERE id = NEW.id;
+                     END""")
+    # Set once, when the pre-generator first starts (see quiz_worker.py)
+    conn.execute('''CREATE TABLE quiz_pregen_state (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    started_at REAL NOT NULL
+                )''')
+
+
+def _create_time_rollups(conn):
+    # Older builds logged the task topic instead of its id; point those rows at the task
+    conn.execute("""
+        UPDATE time_logs
+        SET task_id = (SELECT id FROM tasks WHERE tasks.topic = time_logs.task_id ORDER BY id LIMIT 1)
+        WHERE typeof(task_id) = 'text'
+          AND EXISTS (SELECT 1 FROM tasks WHERE tasks.topic = time_logs.task_id)
+    """)
+    conn.execute('''CREATE TABLE task_time_totals (
+                    task_id INTEGER PRIMARY KEY,
+                    total_seconds INTEGER NOT NULL,
+                    log_count INTEGER NOT NULL
+                )''')
+    conn.execute('''CREATE TABLE category_time_totals (
+                    category TEXT PRIMARY KEY,
+                    total_seconds INTEGER NOT NULL,
+                    log_count INTEGER NOT NULL
+                )''')
+    conn.execute('''CREATE TABLE daily_time_totals (
+                    day TEXT PRIMARY KEY,
+                    total_seconds INTEGER NOT NULL,
+                    log_count INTEGER NOT NULL
+                )''')
+    # One delta per rollup; the insert trigger adds it, the delete trigger subtracts
+    # it and drops a bucket once its last log is gone, as task_counts does
+    day = "date(CAST({col} AS REAL), 'unixepoch', 'localtime')"  # As rollups.DAY_SQL
+    keys = {
+        "task_time_totals": ("task_id", "{row}.task_id"),
+        "category_time_totals": ("category", "COALESCE((SELECT category FROM tasks WHERE id = {row}.task_id), '')"),
+        "daily_time_totals": ("day", day.format(col="{row}.start_time")),
+    }
+    inserts = "".join(f"""
+                INSERT INTO {table} ({column}, total_seconds, log_count)
+                VALUES ({expr.format(row='NEW')}, NEW.time_spent, 1)
+                ON CONFLICT({column}) DO UPDATE SET
+                    total_seconds = total_seconds + excluded.total_seconds,
+                    log_count = log_count + 1;""" for table, (column, expr) in keys.items())
+    deletes = "".join(f"""
+                UPDATE {table} SET total_seconds = total_seconds - OLD.time_spent, log_count = log_count - 1
+                WHERE {column} = {expr.format(row='OLD')};
+                DELETE FROM {table} WHERE {column} = {expr.format(row='OLD')} AND log_count = 0;"""
+                      for table, (column, expr) in keys.items())
+    conn.execute(f"CREATE TRIGGER time_logs_rollup_insert AFTER INSERT ON time_logs BEGIN {inserts} END")
+    conn.execute(f"CREATE TRIGGER time_logs_rollup_delete AFTER DELETE ON time_logs BEGIN {deletes} END")
+    # A task's logged time moves with it to its new category
+    logged = "FROM time_logs WHERE task_id = NEW.id"
+    conn.execute(f"""CREATE TRIGGER tasks_category_time_move AFTER UPDATE OF category ON tasks
+                     WHEN COALESCE(OLD.category, '') IS NOT COALESCE(NEW.category, '') BEGIN
+                         UPDATE category_time_totals SET
+                             total_seconds = total_seconds - (SELECT COALESCE(SUM(time_spent), 0) {logged}),
+                             log_count = log_count - (SELECT COUNT(*) {logged})
+                         WHERE category = COALESCE(OLD.category, '');
+                         DELETE FROM category_time_totals WHERE category = COALESCE(OLD.category, '') AND log_count = 0;
+                         INSERT INTO category_time_totals (category, total_seconds, log_count)
+                         SELECT COALESCE(NEW.category, ''), SUM(time_spent), COUNT(*) {logged} GROUP BY task_id
+                         ON CONFLICT(category) DO UPDATE SET
+                             total_seconds = total_seconds + excluded.total_seconds,
+                             log_count = log_count + excluded.log_count;
+                     END""")
+
+    # Backfill from the logs collected so far
+    conn.execute("""
+        INSERT INTO task_time_totals (task_id, total_seconds, log_count)
+        SELECT task_id, SUM(time_spent), COUNT(*) FROM time_logs GROUP BY task_id
+    """)
+    conn.execute("""
+        INSERT INTO category_time_totals (category, total_seconds, log_count)
+        SELECT COALESCE(t.category, ''), SUM(l.time_spent), COUNT(*)
+        FROM time_logs l LEFT JOIN tasks t ON t.id = l.task_id
+        GROUP BY COALESCE(t.category, '')
+    """)
+    conn.execute(f"""
+        INSERT INTO daily_time_totals (day, total_seconds, log_count)
+        SELECT {day.format(col='start_time')} AS day, SUM(time_spent), COUNT(*)
+        FROM time_logs GROUP BY day
+    """)
+
+
+def _create_hourly_rollup(conn):
+    conn.execute('''CREATE TABLE hourly_time_totals (
+                    hour INTEGER PRIMARY KEY,  -- 0-23, local time the session started
+                    total_seconds INTEGER NOT NULL,
+                    log_count INTEGER NOT NULL
+                )''')
+    hour = "CAST(strftime('%H', CAST({col} AS REAL), 'unixepoch', 'localtime') AS INTEGER)"  # As rollups.HOUR_SQL
+    conn.execute(f"""
+        CREATE TRIGGER time_logs_hourly_insert AFTER INSERT ON time_logs
+        BEGIN
+            INSERT INTO hourly_time_totals (hour, total_seconds, log_count)
+            VALUES ({hour.format(col='NEW.start_time')}, NEW.time_spent, 1)
+            ON CONFLICT(hour) DO UPDATE SET
+                total_seconds = total_seconds + excluded.total_seconds,
+                log_count = log_count + 1;
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER time_logs_hourly_delete AFTER DELETE ON time_logs
+        BEGIN
+            UPDATE hourly_time_totals SET total_seconds = total_seconds - OLD.time_spent, log_count = log_count - 1
+            WHERE hour = {hour.format(col='OLD.start_time')};
+            DELETE FROM hourly_time_totals WHERE hour = {hour.format(col='OLD.start_time')} AND log_count = 0;
+        END
+    """)
+    conn.execute(f"""
+        INSERT INTO hourly_time_totals (hour, total_seconds, log_count)
+        SELECT {hour.format(col='start_time')} AS hour, SUM(time_spent), COUNT(*)
+        FROM time_logs GROUP BY hour
+    """)
+
+
+# Migration 7's own copy of slot_engine.parse_slot, so later changes to the
+# parser cannot change how it converts old rows
+_SLOT_TIME = re.compile(r"^\s*(\d{1,2}):(\d{2})\s*([AaPp][Mm])?\s*$")
+
+
+def _slot_time(text, end=False):
+    match = _SLOT_TIME.match(text)
+    if not match:
+        raise ValueError(f"Invalid time: {text!r}")
+    hours, minutes, meridiem = int(match.group(1)), int(match.group(2)), match.group(3)
+    if meridiem:
+        if not 1 <= hours <= 12:
+            raise ValueError(f"Invalid time: {text!r}")
+        hours = hours % 12 + (12 if meridiem.upper() == "PM" else 0)
+    elif end and (hours, minutes) == (24, 0):
+        return 24 * 60
+    if hours > 23 or minutes > 59:
+        raise ValueError(f"Invalid time: {text!r}")
+    return hours * 60 + minutes
+
+
+def _slot_minutes(text):
+    start, sep, end = text.partition("-")
+    if not sep:
+        raise ValueError(f"Invalid slot: {text!r}")
+    return _slot_time(start), _slot_time(end, end=True)
+
+
+def _structure_slots(conn):
+    # slot: one free-text row per date -> many (date, start_minute, end_minute) rows
+    conn.execute('''CREATE TABLE slot_new (
+                    id INTEGER PRIMARY KEY,
+                    date TEXT NOT NULL,
+                    start_minute INTEGER NOT NULL,  -- minutes since midnight
+                    end_minute INTEGER NOT NULL,
+                    CHECK (end_minute > start_minute)
+                )''')
+    unparsed = []
+    for day, text in conn.execute("SELECT date, slot FROM slot").fetchall():
+        try:
+            start, end = _slot_minutes(text)
+        except (ValueError, AttributeError):
+            unparsed.append((day, text))
+            continue
+        if end > start:
+            conn.execute("INSERT INTO slot_new (date, start_minute, end_minute) VALUES (?, ?, ?)",
+                         (day, start, end))
+        else:
+            unparsed.append((day, text))
+    if unparsed:
+        # Keep rows we could not read instead of silently dropping them
+        conn.execute("CREATE TABLE slot_unparsed (date TEXT, slot TEXT)")
+        conn.executemany("INSERT INTO slot_unparsed (date, slot) VALUES (?, ?)", unparsed)
+    conn.execute("DROP TABLE slot")
+    conn.execute("ALTER TABLE slot_new RENAME TO slot")
+    conn.execute("CREATE INDEX idx_slot_date ON slot(date, start_minute, end_minute)")
+
+    # schedule: keep the display text, add the booked minutes for free/busy queries
+    conn.execute("ALTER TABLE schedule ADD COLUMN start_minute INTEGER")
+    conn.execute("ALTER TABLE schedule ADD COLUMN end_minute INTEGER")
+    for row_id, text in conn.execute("SELECT id, slot FROM schedule").fetchall():
+        try:
+            start, end = _slot_minutes(text)
+        except (ValueError, AttributeError):
+            continue
+        conn.execute("UPDATE schedule SET start_minute = ?, end_minute = ? WHERE id = ?", (start, end, row_id))
+    conn.execute("CREATE INDEX idx_schedule_date ON schedule(date, start_minute, end_minute)")
+
+
+def _create_parse_stats(conn):
+    conn.execute('''CREATE TABLE parse_stats (
+                    kind TEXT PRIMARY KEY,  -- quiz | schedule
+                    responses INTEGER NOT NULL,
+                    items INTEGER NOT NULL,
+                    invalid_items INTEGER NOT NULL,  -- failed validation at least once
+                    repaired_items INTEGER NOT NULL,
+                    failed_responses INTEGER NOT NULL  -- still invalid after repair, or empty
+                )''')
+
+
+def _add_task_list_index_and_counts(conn):
+    # Keyset pages of pending tasks ordered by (priority_rank, id); covering,
+    # so a page reads `limit` index entries and never touches the table
+    conn.execute("""CREATE INDEX idx_tasks_pending_page
+                    ON tasks(status, priority_rank, id, topic, progress, priority, category)""")
+    # Task counts per (status, priority, category) for the "Today's Tasks" summary
+    conn.execute('''CREATE TABLE task_counts (
+                    status TEXT NOT NULL,
+                    priority TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    tasks INTEGER NOT NULL,
+                    completed INTEGER NOT NULL,  -- progress = 100
+                    PRIMARY KEY (status, priority, category)
+                )''')
+    key = "COALESCE({row}.status, ''), COALESCE({row}.priority, ''), COALESCE({row}.category, '')"
+    add = f"""
+                INSERT INTO task_counts (status, priority, category, tasks, completed)
+                VALUES ({key.format(row='NEW')}, 1, IFNULL(NEW.progress = 100, 0))
+                ON CONFLICT(status, priority, category) DO UPDATE SET
+                    tasks = tasks + 1,
+                    completed = completed + excluded.completed;"""
+    remove = f"""
+                UPDATE task_counts SET tasks = tasks - 1, completed = completed - IFNULL(OLD.progress = 100, 0)
+                WHERE (status, priority, category) = ({key.format(row='OLD')});
+                DELETE FROM task_counts WHERE tasks = 0;"""
+    conn.execute(f"CREATE TRIGGER tasks_counts_insert AFTER INSERT ON tasks BEGIN {add} END")
+    conn.execute(f"CREATE TRIGGER tasks_counts_delete AFTER DELETE ON tasks BEGIN {remove} END")
+    conn.execute(f"""CREATE TRIGGER tasks_counts_update AFTER UPDATE OF status, priority, category, progress ON tasks
+                     BEGIN {remove} {add} END""")
+    conn.execute("""
+        INSERT INTO task_counts (status, priority, category, tasks, completed)
+        SELECT COALESCE(status, ''), COALESCE(priority, ''), COALESCE(category, ''),
+               COUNT(*), TOTAL(progress = 100)
+        FROM tasks
+        GROUP BY 1, 2, 3
+    """)
+
+
+def _fix_schedule_task_ids(conn):
+    # "Save Schedule" used to store the task topic in schedule.task_id
+    conn.execute("""
+        UPDATE schedule
+        SET task_id = (SELECT id FROM tasks WHERE tasks.topic = schedule.task_id ORDER BY id LIMIT 1)
+        WHERE typeof(task_id) = 'text'
+          AND EXISTS (SELECT 1 FROM tasks WHERE tasks.topic = schedule.task_id)
+    """)
+
+
+def _scope_by_user(conn):
+    # Every user-owned row records its owner. Rows from before accounts were
+    # separated belong to the first registered user; with no users yet they
+    # stay unowned until an admin assigns them (python db.py claim <user_id>).
+    owner = conn.execute("SELECT MIN(id) FROM users").fetchone()[0]
+    for table in ("tasks", "slot", "schedule", "time_logs"):  # db.USER_TABLES
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN user_id INTEGER REFERENCES users(id)")
+        conn.execute(f"UPDATE {table} SET user_id = ?", (owner,))
+
+    # Hot-path indexes now lead with user_id, so a query only reads one user's entries
+    conn.execute("DROP INDEX idx_tasks_status_priority")
+    conn.execute("""CREATE INDEX idx_tasks_status_priority
+                    ON tasks(user_id, status, priority_rank, topic, progress, priority, category, due_date)""")
+    conn.execute("DROP INDEX idx_tasks_pending_page")
+    conn.execute("""CREATE INDEX idx_tasks_pending_page
+                    ON tasks(user_id, status, priority_rank, id, topic, progress, priority, category)""")
+    conn.execute("DROP INDEX idx_slot_date")
+    conn.execute("CREATE INDEX idx_slot_date ON slot(user_id, date, start_minute, end_minute)")
+    conn.execute("DROP INDEX idx_schedule_date")
+    conn.execute("CREATE INDEX idx_schedule_date ON schedule(user_id, date, start_minute, end_minute)")
+    conn.execute("CREATE INDEX idx_time_logs_user ON time_logs(user_id, start_time)")
+
+    # Rollups are kept per user; rebuild them (and their triggers) keyed by user_id
+    for trigger in ("time_logs_rollup_insert", "time_logs_rollup_delete", "time_logs_hourly_insert",
+                    "time_logs_hourly_delete", "tasks_category_time_move", "tasks_counts_insert",
+                    "tasks_counts_delete", "tasks_counts_update"):
+        conn.execute(f"DROP TRIGGER {trigger}")
+    for table in ("category_time_totals", "daily_time_totals", "hourly_time_totals", "task_counts"):
+        conn.execute(f"DROP TABLE {table}")
+    for table, key in (("category_time_totals", "category TEXT"), ("daily_time_totals", "day TEXT"),
+                       ("hourly_time_totals", "hour INTEGER")):
+        name = key.split()[0]
+        conn.execute(f'''CREATE TABLE {table} (
+                        user_id INTEGER,
+                        {key},
+                        total_seconds INTEGER NOT NULL,
+                        log_count INTEGER NOT NULL,
+                        PRIMARY KEY (user_id, {name})
+                    )''')
+    conn.execute('''CREATE TABLE task_counts (
+                    user_id INTEGER,
+                    status TEXT NOT NULL,
+                    priority TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    tasks INTEGER NOT NULL,
+                    completed INTEGER NOT NULL,  -- progress = 100
+                    PRIMARY KEY (user_id, status, priority, category)
+                )''')
+
+    # time_logs: one upsert/decrement per rollup, dropping buckets left without logs
+    day = "date(CAST({col} AS REAL), 'unixepoch', 'localtime')"  # As rollups.DAY_SQL
+    hour = "CAST(strftime('%H', CAST({col} AS REAL), 'unixepoch', 'localtime') AS INTEGER)"  # As rollups.HOUR_SQL
+    keys = {
+        "task_time_totals": ("task_id", "{row}.task_id"),
+        "category_time_totals": ("user_id, category",
+                                 "{row}.user_id, COALESCE((SELECT category FROM tasks WHERE id = {row}.task_id), '')"),
+        "daily_time_totals": ("user_id, day", "{row}.user_id, " + day.format(col="{row}.start_time")),
+        "hourly_time_totals": ("user_id, hour", "{row}.user_id, " + hour.format(col="{row}.start_time")),
+    }
+    inserts = "".join(f"""
+                INSERT INTO {table} ({columns}, total_seconds, log_count)
+                VALUES ({expr.format(row='NEW')}, NEW.time_spent, 1)
+                ON CONFLICT({columns}) DO UPDATE SET
+                    total_seconds = total_seconds + excluded.total_seconds,
+                    log_count = log_count + 1;""" for table, (columns, expr) in keys.items())
+    deletes = "".join(f"""
+                UPDATE {table} SET total_seconds = total_seconds - OLD.time_spent, log_count = log_count - 1
+                WHERE ({columns}) = ({expr.format(row='OLD')});
+                DELETE FROM {table} WHERE ({columns}) = ({expr.format(row='OLD')}) AND log_count = 0;"""
+                      for table, (columns, expr) in keys.items())
+    conn.execute(f"CREATE TRIGGER time_logs_rollup_insert AFTER INSERT ON time_logs BEGIN {inserts} END")
+    conn.execute(f"CREATE TRIGGER time_logs_rollup_delete AFTER DELETE ON time_logs BEGIN {deletes} END")
+    # A task's logged time moves with it to its new category, in each log owner's bucket
+    logged = "FROM time_logs l WHERE l.task_id = NEW.id AND l.user_id IS category_time_totals.user_id"
+    conn.execute(f"""CREATE TRIGGER tasks_category_time_move AFTER UPDATE OF category ON tasks
+                     WHEN COALESCE(OLD.category, '') IS NOT COALESCE(NEW.category, '') BEGIN
+                         UPDATE category_time_totals SET
+                             total_seconds = total_seconds - (SELECT COALESCE(SUM(l.time_spent), 0) {logged}),
+                             log_count = log_count - (SELECT COUNT(*) {logged})
+                         WHERE category = COALESCE(OLD.category, '') AND EXISTS (SELECT 1 {logged});
+                         DELETE FROM category_time_totals WHERE category = COALESCE(OLD.category, '') AND log_count = 0;
+                         INSERT INTO category_time_totals (user_id, category, total_seconds, log_count)
+                         SELECT user_id, COALESCE(NEW.category, ''), SUM(time_spent), COUNT(*)
+                         FROM time_logs WHERE task_id = NEW.id GROUP BY user_id
+                         ON CONFLICT(user_id, category) DO UPDATE SET
+                             total_seconds = total_seconds + excluded.total_seconds,
+                             log_count = log_count + excluded.log_count;
+                     END""")
+
+    # tasks: move the row between (user, status, priority, category) buckets
+    key = "{row}.user_id, COALESCE({row}.status, ''), COALESCE({row}.priority, ''), COALESCE({row}.category, '')"
+    add = f"""
+                INSERT INTO task_counts (user_id, status, priority, category, tasks, completed)
+                VALUES ({key.format(row='NEW')}, 1, IFNULL(NEW.progress = 100, 0))
+                ON CONFLICT(user_id, status, priority, category) DO UPDATE SET
+                    tasks = tasks + 1,
+                    completed = completed + excluded.completed;"""
+    remove = f"""
+                UPDATE task_counts SET tasks = tasks - 1, completed = completed - IFNULL(OLD.progress = 100, 0)
+                WHERE (user_id, status, priority, category) = ({key.format(row='OLD')});
+                DELETE FROM task_counts WHERE tasks = 0;"""
+    conn.execute(f"CREATE TRIGGER tasks_counts_insert AFTER INSERT ON tasks BEGIN {add} END")
+    conn.execute(f"CREATE TRIGGER tasks_counts_delete AFTER DELETE ON tasks BEGIN {remove} END")
+    conn.execute(f"""CREATE TRIGGER tasks_counts_update
+                     AFTER UPDATE OF user_id, status, priority, category, progress ON tasks
+                     BEGIN {remove} {add} END""")
+
+    # Backfill the rebuilt rollups per user
+    conn.execute("""
+        INSERT INTO category_time_totals (user_id, category, total_seconds, log_count)
+        SELECT l.user_id, COALESCE(t.category, ''), SUM(l.time_spent), COUNT(*)
+        FROM time_logs l LEFT JOIN tasks t ON t.id = l.task_id
+        GROUP BY l.user_id, COALESCE(t.category, '')
+    """)
+    conn.execute(f"""
+        INSERT INTO daily_time_totals (user_id, day, total_seconds, log_count)
+        SELECT user_id, {day.format(col='start_time')} AS day, SUM(time_spent), COUNT(*)
+        FROM time_logs GROUP BY user_id, day
+    """)
+    conn.execute(f"""
+        INSERT INTO hourly_time_totals (user_id, hour, total_seconds, log_count)
+        SELECT user_id, {hour.format(col='start_time')} AS hour, SUM(time_spent), COUNT(*)
+        FROM time_logs GROUP BY user_id, hour
+    """)
+    conn.execute("""
+        INSERT INTO task_counts (user_id, status, priority, category, tasks, completed)
+        SELECT user_id, COALESCE(status, ''), COALESCE(priority, ''), COALESCE(category, ''),
+               COUNT(*), TOTAL(progress = 100)
+        FROM tasks
+        GROUP BY 1, 2, 3, 4
+    """)
+
+
+def _create_semantic_items(conn):
+    # Texts for the semantic (FAISS) index: task topics, scheduled subtopics with
+    # their planned minutes, and generated quizzes/questions. The vectors live in
+    # index files keyed by these ids (see semantic_index.py).
+    conn.execute('''CREATE TABLE semantic_items (
+                    id INTEGER PRIMARY KEY,
+                    kind TEXT NOT NULL,  -- task | subtopic | quiz | question
+                    ref_id INTEGER NOT NULL DEFAULT 0,  -- tasks.id for task and subtopic items
+                    user_id INTEGER,  -- NULL for quizzes and questions, shared like quiz_queue
+                    text TEXT NOT NULL,
+                    minutes INTEGER,  -- subtopic: total minutes scheduled for it
+                    payload TEXT,  -- quiz: questions as JSON; question: the question as JSON
+                    UNIQUE (kind, ref_id, text)
+                )''')
+    # Index files catch up by reading the items after the last id they hold
+    conn.execute("CREATE INDEX idx_semantic_items_kind ON semantic_items(kind, id)")
+    conn.execute('''CREATE TABLE embedding_cache (
+                    model TEXT NOT NULL,
+                    key TEXT NOT NULL,  -- sha256 of the text
+                    vector BLOB NOT NULL,  -- float32
+                    PRIMARY KEY (model, key)
+                ) WITHOUT ROWID''')
+    # Kept in step with tasks and schedule by triggers, like the rollups
+    task_item = """
+                INSERT OR IGNORE INTO semantic_items (kind, ref_id, user_id, text)
+                VALUES ('task', NEW.id, NEW.user_id, TRIM(NEW.topic));"""
+    subtopic_item = """
+                INSERT INTO semantic_items (kind, ref_id, user_id, text, minutes)
+                VALUES ('subtopic', NEW.task_id, NEW.user_id, TRIM(NEW.subtopics), NEW.end_minute - NEW.start_minute)
+                ON CONFLICT(kind, ref_id, text) DO UPDATE SET minutes = minutes + excluded.minutes;"""
+    conn.execute(f"""CREATE TRIGGER tasks_semantic_insert AFTER INSERT ON tasks
+                     WHEN TRIM(COALESCE(NEW.topic, '')) != '' BEGIN {task_item} END""")
+    conn.execute("""CREATE TRIGGER tasks_semantic_owner AFTER UPDATE OF user_id ON tasks BEGIN
+                        UPDATE semantic_items SET user_id = NEW.user_id
+                        WHERE kind IN ('task', 'subtopic') AND ref_id = NEW.id;
+                    END""")
+    conn.execute(f"""CREATE TRIGGER schedule_semantic_insert AFTER INSERT ON schedule
+                     WHEN TRIM(COALESCE(NEW.subtopics, '')) != '' AND NEW.start_minute IS NOT NULL
+                     BEGIN {subtopic_item} END""")
+    conn.execute("""INSERT OR IGNORE INTO semantic_items (kind, ref_id, user_id, text)
+                    SELECT 'task', id, user_id, TRIM(topic) FROM tasks WHERE TRIM(COALESCE(topic, '')) != ''
+                    ORDER BY id""")
+    conn.execute("""INSERT INTO semantic_items (kind, ref_id, user_id, text, minutes)
+                    SELECT 'subtopic', task_id, MIN(user_id), TRIM(subtopics), SUM(end_minute - start_minute)
+                    FROM schedule
+                    WHERE TRIM(COALESCE(subtopics, '')) != '' AND start_minute IS NOT NULL
+                      AND task_id IN (SELECT id FROM tasks)
+                    GROUP BY task_id, TRIM(subtopics)
+                    ORDER BY MIN(id)""")
+
+
+def _create_task_occurrences(conn):
+    # Materialized dates of recurring tasks over a rolling horizon (see recurrence.py)
+    conn.execute('''CREATE TABLE task_occurrences (
+                    task_id INTEGER NOT NULL REFERENCES tasks(id) ON DELETE CASCADE,
+                    date TEXT NOT NULL,
+                    user_id INTEGER,
+                    PRIMARY KEY (task_id, date)
+                ) WITHOUT ROWID''')
+    conn.execute("CREATE INDEX idx_task_occurrences_date ON task_occurrences(user_id, date, task_id)")
+    # How far each recurring task has been expanded
+    conn.execute('''CREATE TABLE recurrence_state (
+                    task_id INTEGER PRIMARY KEY REFERENCES tasks(id) ON DELETE CASCADE,
+                    through TEXT NOT NULL
+                )''')
+    # Advancing the horizon visits recurring tasks only
+    conn.execute("""CREATE INDEX idx_tasks_recurring ON tasks(id)
+                    WHERE recurrence IN ('Daily', 'Weekly', 'Monthly')""")
+    # A changed rule or due date is expanded again from scratch
+    conn.execute("""CREATE TRIGGER tasks_recurrence_update AFTER UPDATE OF recurrence, due_date ON tasks BEGIN
+                        DELETE FROM task_occurrences WHERE task_id = NEW.id;
+                        DELETE FROM recurrence_state WHERE task_id = NEW.id;
+                    END""")
+    conn.execute("""CREATE TRIGGER tasks_occurrences_owner AFTER UPDATE OF user_id ON tasks BEGIN
+                        UPDATE task_occurrences SET user_id = NEW.user_id WHERE task_id = NEW.id;
+                    END""")
+
+
+def _create_jobs(conn):
+    # Background LLM work and its results (see jobs.py)
+    conn.execute('''CREATE TABLE jobs (
+                    id INTEGER PRIMARY KEY,
+                    user_id INTEGER REFERENCES users(id),
+                    kind TEXT NOT NULL,
+                    ref INTEGER,  -- what the job is for (a task id), if anything
+                    params TEXT NOT NULL,  -- JSON
+                    status TEXT NOT NULL,  -- queued | running | done | failed
+                    result TEXT,  -- JSON; the partial result while running
+                    error TEXT,
+                    dismissed INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL,
+                    updated_at REAL
+                )''')
+    conn.execute("CREATE INDEX idx_jobs_lookup ON jobs(user_id, kind, ref, dismissed, id)")
+    conn.execute("CREATE INDEX idx_jobs_pending ON jobs(id) WHERE status IN ('queued', 'running')")
+
+
+def _create_llm_usage(conn):
+    # Daily LLM requests, tokens and cost per user and model (see llm_governor.py)
+    conn.execute('''CREATE TABLE llm_usage (
+                    user_id INTEGER NOT NULL,  -- 0 for background work no user asked for
+                    day TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    requests INTEGER NOT NULL DEFAULT 0,
+                    retries INTEGER NOT NULL DEFAULT 0,
+                    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+                    completion_tokens INTEGER NOT NULL DEFAULT 0,
+                    cost REAL NOT NULL DEFAULT 0,  -- USD
+                    PRIMARY KEY (user_id, day, model)
+                ) WITHOUT ROWID''')
+
+
+MIGRATIONS = [
+    (1, "base tables", _create_base_tables),
+    (2, "priority rank and hot-query indexes", _add_priority_rank_and_indexes),
+    (3, "llm response cache", _create_llm_cache),
+    (4, "quiz pre-generation queue", _create_quiz_queue),
+    (5, "time tracking rollups", _create_time_rollups),
+    (6, "hour-of-day time rollup", _create_hourly_rollup),
+    (7, "structured slots and schedule minutes", _structure_slots),
+    (8, "structured output parse stats", _create_parse_stats),
+    (9, "task list keyset index and counts", _add_task_list_index_and_counts),
+    (10, "schedule rows point at task ids", _fix_schedule_task_ids),
+    (11, "per-user data and indexes", _scope_by_user),
+    (12, "semantic index items and embedding cache", _create_semantic_items),
+    (13, "recurring task occurrences", _create_task_occurrences),
+    (14, "background llm jobs", _create_jobs),
+    (15, "llm usage accounting", _create_llm_usage),
+]
+
+
+def current_version(conn):
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def migrate(conn):
+    """Apply every migration newer than the recorded schema version."""
+    conn.execute("""CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER PRIMARY KEY,
+                    description TEXT,
+                    applied_at TEXT DEFAULT CURRENT_TIMESTAMP
+                )""")
+    conn.commit()
+    version = current_version(conn)
+    for step, description, apply in MIGRATIONS:
+        if step <= version:
+            continue
+        conn.execute("BEGIN")
+        try:
+            apply(conn)
+            conn.execute("INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                         (step, description))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return current_version(conn)
+
+
+def check_query_plans(conn):
+    """Run EXPLAIN QUERY PLAN on each panel query and report missing indexes.
+
+    Returns a list of problem strings; an empty list means every query still
+    uses the index (or each of the indexes) it is expected to use.
+    """
+    problems = []
+    for name, (sql, params, expected) in queries.PANEL_QUERIES.items():
+        plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+        for index in (expected,) if isinstance(expected, str) else expected:
+            if not any(index in step for step in plan):
+                problems.append(f"{name}: expected {index}, got {plan}")
+        if any("USE TEMP B-TREE" in step for step in plan) and "ORDER BY" in sql.upper():
+            problems.append(f"{name}: sorts with a temp b-tree: {plan}")
+    return problems
+
+
+if __name__ == "__main__":
+    # Usage: python migrations.py [db_path]
+    conn = db.init_db(sys.argv[1] if len(sys.argv) > 1 else db.DB_PATH)
+    print(f"Schema version: {current_version(conn)}")
+    problems = check_query_plans(conn)
+    for problem in problems:
+        print(problem)
+    print("Query plans OK" if not problems else f"{len(problems)} query plan problem(s)")
+    sys.exit(1 if problems else 0)
@@ -0,0 +1,21 @@
+import streamlit as st
+
+import resources
+import writes
+
+
+# Add Task
+def render():
+    user_id = st.session_state['user_id']
+    st.subheader("Add a New Task")
+    topic = st.text_input("Enter Topic")
+    due_date = st.date_input("Due Date")
+    priority = st.selectbox("Priority", ["High", "Medium", "Low"])
+    category = st.text_input("Category (e.g., Math, Programming)")
+    recurrence = st.selectbox("Recurrence", ["None", "Daily", "Weekly", "Monthly"])
+    if st.button("Save Task"):
+        try:
+            resources.get_db().write(writes.add_task, user_id, topic, due_date, "Completed", priority, category, recurrence)
+            st.success("Task saved successfully!")
+        except Exception as e:
+            st.error(f"Error saving task: {str(e)}")
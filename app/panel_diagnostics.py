@@ -0,0 +1,64 @@
+import datetime
+import json
+
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+
+import resources
+
+KINDS = {"panel": "🧩 Panels", "sql": "🗄️ SQL", "llm": "🤖 LLM calls"}
+
+
+# Diagnostics (admins only): where the time goes, from the perf recorder
+def render():
+    st.subheader("🩺 Diagnostics")
+    recorder = resources.get_recorder()
+    if recorder is None:
+        st.info("Instrumentation is off (PERF=0).")
+        return
+
+    events = recorder.events()
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Events Buffered", len(events), help=f"Up to {recorder.capacity} of each kind")
+    with col2:
+        since = datetime.datetime.fromtimestamp(events[0]["ts"]).strftime("%H:%M:%S") if events else "-"
+        st.metric("Oldest Event", since)
+    with col3:
+        st.metric("Read Cache Hit Rate", f"{resources.get_read_cache().stats()['hit_rate']:.0%}")
+
+    kind = st.radio("Show", list(KINDS), format_func=KINDS.get, horizontal=True)
+    summary = recorder.summary(kind)
+    if not summary:
+        st.write("Nothing recorded yet.")
+    else:
+        # Latencies in ms; slowest in total first
+        summary_df = pd.DataFrame(summary).drop(columns="kind").round(2)
+        st.dataframe(summary_df, use_container_width=True, hide_index=True)
+
+        name = st.selectbox("Latency Histogram", [row["name"] for row in summary])
+        latencies = pd.DataFrame({"ms": [e["ms"] for e in events if e["kind"] == kind and e["name"] == name]})
+        st.plotly_chart(px.histogram(latencies, x="ms", nbins=50, title=name))
+
+        st.write("### 🐢 Slowest Recent")
+        slowest = sorted((e for e in events if e["kind"] == kind), key=lambda e: e["ms"], reverse=True)[:20]
+        slowest_df = pd.DataFrame(slowest).drop(columns="kind").round(2)
+        slowest_df["ts"] = pd.to_datetime(slowest_df["ts"], unit="s")
+        st.dataframe(slowest_df, use_container_width=True, hide_index=True)
+
+    if kind == "llm":
+        st.write("### 🚦 LLM Governor")
+        st.json(resources.get_governor().stats)
+        st.json(resources.get_llm_cache().stats())
+
+    # The whole buffer as JSON lines, for offline analysis (PERF_LOG keeps a running file)
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("📥 Download Events (JSON Lines)",
+                           "\n".join(json.dumps(event, default=str) for event in events),
+                           file_name="perf_events.jsonl", mime="application/json")
+    with col2:
+        if st.button("🧹 Clear"):
+            recorder.clear()
+            st.rerun(scope="fragment")
@@ -0,0 +1,39 @@
+import datetime
+
+import streamlit as st
+
+import export
+import queries
+import resources
+
+
+# Export Data
+def render():
+    conn = resources.get_conn()
+    user_id = st.session_state['user_id']
+    st.subheader("Export Data")
+    try:
+        table = st.selectbox("Data", list(export.TABLES), format_func=lambda name: name.replace("_", " ").title())
+        fmt = st.radio("Format", export.FORMATS, format_func=str.upper, horizontal=True)
+
+        filter_values = resources.get_read_cache().rows(conn, queries.EXPORT_FILTER_VALUES, (user_id,), ("task_counts",))
+        statuses = st.multiselect("Status", sorted({status for status, _ in filter_values if status}))
+        categories = st.multiselect("Category", sorted({category for _, category in filter_values if category}))
+        start_date = end_date = None
+        if st.checkbox("Filter by date"):
+            date_col1, date_col2 = st.columns(2)
+            with date_col1:
+                start_date = st.date_input("From", datetime.date.today() - datetime.timedelta(days=30))
+            with date_col2:
+                end_date = st.date_input("To", datetime.date.today())
+
+        # Deferred: the file is only built when the button is clicked, not on every rerun
+        st.download_button(
+            f"📥 Export {fmt.upper()}",
+            lambda: export.export_bytes(resources.get_conn(), table, user_id, fmt, start_date=start_date, end_date=end_date,
+                                          statuses=statuses, categories=categories),
+            file_name=export.file_name(table, fmt),
+            mime=export.MIME_TYPES[fmt],
+        )
+    except Exception as e:
+        st.error(f"Error exporting data: {str(e)}")
@@ -0,0 +1,10 @@
+import streamlit as st
+
+
+# Gamification
+def render():
+    st.subheader("Earn Points for Completing Tasks")
+    st.write(f"Total Points: {st.session_state['points']}")
+    if st.button("Complete Task"):
+        st.session_state['points'] += 10
+        st.success(f"You earned 10 points! Total points: {st.session_state['points']}")
@@ -0,0 +1,139 @@
+import datetime
+import sqlite3
+import time  # For time tracking
+
+import streamlit as st
+
+import jobs
+import queries
+import resources
+import writes
+
+
+# Elapsed time ticks in the browser; the server only hears about start and stop
+_TIMER_HTML = """
+<div id="tracker-timer" style="font-size: 1rem; color: #333333;"></div>
+<script>
+(() => {
+    const started = Date.now() - %d * 1000;
+    const pad = (n) => String(n).padStart(2, "0");
+    // One interval per page, stopped once the timer is no longer shown
+    clearInterval(window.trackerTimer);
+    function tick() {
+        const display = document.getElementById("tracker-timer");
+        if (!display) {
+            clearInterval(window.trackerTimer);
+            return;
+        }
+        const seconds = Math.floor((Date.now() - started) / 1000);
+        display.textContent = "⏱️ Elapsed Time: "
+            + pad(Math.floor(seconds / 3600)) + ":" + pad(Math.floor(seconds / 60) %% 60) + ":" + pad(seconds %% 60);
+    }
+    tick();
+    window.trackerTimer = setInterval(tick, 1000);
+})();
+</script>
+"""
+
+
+def _start_timer():
+    st.session_state['start_time'] = time.time()
+
+
+def _stop_timer(user_id, task_id):
+    end_time = time.time()
+    time_spent = int(end_time - st.session_state['start_time'])
+    try:
+        # Rollup tables are updated by the time_logs triggers in the same commit
+        resources.get_db().write(writes.log_time, user_id, [(task_id, st.session_state['start_time'], end_time)])
+        st.session_state['timer_message'] = ("success", f"✅ Time tracked: { (time_spent) } seconds")
+        st.session_state['start_time'] = None
+    except sqlite3.Error as e:
+        st.session_state['timer_message'] = ("error", f"❗ Error saving time log: {str(e)}")
+    except Exception as e:
+        st.session_state['timer_message'] = ("error", f"❗ An unexpected error occurred: {str(e)}")
+
+
+# Time tracking reruns on its own, without the rest of the panel
+@st.fragment
+def timer(tasks, user_id, rerun_app_on_stop=False):
+    tracked_task = st.selectbox("Select Task to Track Time", tasks, format_func=lambda task: task[0])
+    task_id = tracked_task[5]
+
+    # Initialize session state for timer
+    if 'start_time' not in st.session_state:
+        st.session_state['start_time'] = None
+    running = st.session_state['start_time'] is not None
+
+    # The buttons act in callbacks, so they are drawn in their new state on this same rerun
+    st.button("Start Timer", disabled=running, on_click=_start_timer)
+    if running:
+        st.html(_TIMER_HTML % int(time.time() - st.session_state['start_time']), unsafe_allow_javascript=True)
+    stopped = st.button("Stop Timer", disabled=not running, on_click=_stop_timer, args=(user_id, task_id))
+    if stopped and rerun_app_on_stop and st.session_state['start_time'] is None:
+        st.rerun()
+
+    message = st.session_state.pop('timer_message', None)
+    if message:
+        getattr(st, message[0])(message[1])
+
+
+def show_insights(result):
+    # Aggregates first, then the most relevant tasks up to the token budget
+    st.caption(f"Prompt: ~{result['prompt_tokens']} tokens, {result['detail_rows']} task rows")
+    st.write("### AI Insights:")
+    st.write(result["text"])
+
+
+# Polls the job until it finishes, showing the text streamed in so far
+@st.fragment(run_every=1)
+def insights_progress(job_id):
+    cache = resources.get_read_cache()
+    job = cache.get(("job", job_id), ("jobs",), lambda: jobs.get(resources.get_conn(), job_id))
+    if job.status not in jobs.PENDING:
+        st.rerun()
+    if job.result:
+        show_insights(job.result)
+    st.caption("⏳ Generating insights...")
+
+
+# AI Insights
+def render():
+    conn = resources.get_conn()
+    cache = resources.get_read_cache()
+    user_id = st.session_state['user_id']
+    st.subheader("AI-Powered Insights")
+    today = str(datetime.date.today())
+    requests, tokens, cost = cache.rows(conn, queries.LLM_USAGE, (user_id, today, today), ("llm_usage",))[0]
+    st.caption(f"🪙 Your AI usage today: {requests} requests, {tokens} tokens, ${cost:.4f}")
+    tasks = cache.rows(conn, queries.INSIGHTS_TASKS, (user_id,), ("tasks",))
+    # Timer Section
+    if tasks:
+        has_time_logs = cache.rows(conn, queries.HAS_TIME_LOGS, (user_id,), ("time_logs",))
+        # The first time log makes the insights below available, so that stop reruns everything
+        timer(tasks, user_id, rerun_app_on_stop=not has_time_logs)
+
+        # Helper function to format time in HH:MM:SS
+        def format_time(seconds):
+            hours, remainder = divmod(seconds, 3600)
+            minutes, seconds = divmod(remainder, 60)
+            return f"{hours:02}:{minutes:02}:{seconds:02}"
+
+        # Fetch data for insights
+
+        if tasks and has_time_logs:
+            # Generate insights using OpenAI, on a job thread; the last result stays until the next one
+            fresh_insights = st.checkbox("🔄 Regenerate (skip cache)", key="insights_skip_cache")
+            if st.button("Generate Insights"):
+                resources.get_job_runner().submit(user_id, "insights", {"user_id": user_id, "use_cache": not fresh_insights})
+
+            job = cache.get(("latest_job", user_id, "insights", None), ("jobs",),
+                            lambda: jobs.latest(conn, user_id, "insights"))
+            if job is not None and job.status in jobs.PENDING:
+                insights_progress(job.id)
+            elif job is not None and job.status == "failed":
+                st.error(f"Error generating insights: {job.error}")
+            elif job is not None:
+                show_insights(job.result)
+        else:
+            st.warning("No task or time tracking data available for insights.")
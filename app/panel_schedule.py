@@ -0,0 +1,149 @@
+import datetime
+import sqlite3
+
+import streamlit as st
+import pandas as pd
+
+import db
+import jobs
+import queries
+import recurrence
+import resources
+import scheduler
+import slot_engine
+import slots
+import writes
+
+
+def breakdown_frame(rows):
+    return pd.DataFrame(rows, columns=["Subtopic", "Minutes"])
+
+
+# Polls the job until it finishes, showing the rows streamed in so far
+@st.fragment(run_every=1)
+def breakdown_progress(job_id):
+    cache = resources.get_read_cache()
+    job = cache.get(("job", job_id), ("jobs",), lambda: jobs.get(resources.get_conn(), job_id))
+    if job.status not in jobs.PENDING:
+        st.rerun()
+    st.markdown("### 🧩 AI Task Breakdown")
+    st.caption("⏳ Generating... you can leave this page; the breakdown will be here when you come back.")
+    if job.result:
+        st.dataframe(breakdown_frame(job.result["rows"]))
+
+
+# Write job: the saved schedule replaces the breakdown it was planned from
+def save_schedule(conn, user_id, task_id, placements, job_id):
+    writes.save_schedule(conn, user_id, task_id, placements)
+    jobs.dismiss(conn, job_id)
+
+
+# Schedule Task
+def render():
+    conn = resources.get_conn()
+    database = resources.get_db()
+    cache = resources.get_read_cache()
+    user_id = st.session_state['user_id']
+    st.title("📅 AI-Powered Task Scheduler")
+
+    # Input: Task details
+    tasks = cache.rows(conn, queries.SCHEDULE_TASK_OPTIONS, (user_id,), ("tasks",))
+    task_options = {task[1]: task[0] for task in tasks}  # Create a mapping of task names to task IDs
+    selected_task_name = st.selectbox("Select Task", list(task_options.keys()))  # Display task names
+    selected_task_id = task_options[selected_task_name]  # Get the corresponding task ID
+
+    # Fetch task details for the selected task
+    result = cache.rows(conn, queries.SCHEDULE_TASK_DETAILS, (selected_task_id, user_id), ("tasks",))
+
+    # Extract the due_date if the result isn't empty
+    if result:
+        default_due = datetime.datetime.strptime(result[0][1], "%Y-%m-%d").date()
+        rule = result[0][6]
+        if rule in recurrence.RULES:
+            # A recurring task is planned for its next occurrence
+            resources.get_horizon().ensure()
+            [(next_date,)] = cache.rows(conn, queries.NEXT_OCCURRENCE, (selected_task_id, str(datetime.date.today())),
+                                        ("task_occurrences",))
+            if next_date:
+                default_due = datetime.date.fromisoformat(next_date)
+                st.caption(f"🔁 Repeats {rule.lower()}; next occurrence on {next_date}")
+        due_date = st.date_input("Select Due Date", value=default_due)
+        category = st.text_input("Category", value=result[0][5])
+
+    fresh_schedule = st.checkbox("🔄 Regenerate (skip cache)", key="schedule_skip_cache")
+    if st.button("Generate Schedule") and selected_task_name:
+        # The LLM only breaks the task down, on a job thread; placement into free time happens locally below
+        resources.get_job_runner().submit(user_id, "schedule_breakdown", {
+            "user_id": user_id, "task": selected_task_name, "category": category, "use_cache": not fresh_schedule,
+        }, ref=selected_task_id)
+
+    # The latest breakdown for this task, kept in the jobs table across reruns and reconnects
+    job = cache.get(("latest_job", user_id, "schedule_breakdown", selected_task_id), ("jobs",),
+                    lambda: jobs.latest(conn, user_id, "schedule_breakdown", selected_task_id))
+    if job is not None and job.status in jobs.PENDING:
+        breakdown_progress(job.id)
+    elif job is not None and job.status == "failed":
+        st.error(f"❗ Error generating schedule: {job.error}")
+    elif job is not None:
+        st.markdown("### 🧩 AI Task Breakdown")
+        st.dataframe(breakdown_frame(job.result["rows"]).assign(**{"Similar before": job.result["past_minutes"]}))
+        if job.result["invalid"]:
+            st.warning(f"Skipped {job.result['invalid']} subtopic(s) the AI returned in an invalid format.")
+        st.success("✅ Schedule generated!")
+
+    # Place the breakdown into free time before the due date; re-planned on every
+    # rerun from the stored breakdown, so new slots never need another LLM call
+    if job is not None and job.status == "done" and job.result["rows"]:
+        priority = next(task[6] for task in tasks if task[0] == selected_task_id)
+        subtopics = [tuple(row) for row in job.result["rows"]]
+        if any(job.result["past_minutes"]) and st.checkbox("📏 Use durations from similar past subtopics",
+                                                          key="schedule_past_minutes"):
+            subtopics = [(name, past or minutes)
+                         for (name, minutes), past in zip(subtopics, job.result["past_minutes"])]
+        now = datetime.datetime.now()
+        today, now_minute = now.date(), now.hour * 60 + now.minute
+
+        def free_from_now():
+            # Today's time that has already passed can't be scheduled
+            free = slots.free_intervals(conn, user_id, today, due_date)
+            if str(today) in free and now_minute:
+                remaining = free.pop(str(today)).subtract(slot_engine.IntervalSet([(0, now_minute)]))
+                if len(remaining):
+                    free[str(today)] = remaining
+            return free
+
+        free = cache.get(("free_intervals", user_id, today, now_minute, due_date), ("slot", "schedule"), free_from_now)
+        placements, unplaced = scheduler.schedule_tasks(
+            [(selected_task_id, db.PRIORITY_RANKS.get(priority, 0), due_date, subtopics)], free)
+
+        st.markdown("### 📌 Your AI-Generated Schedule")
+        df = pd.DataFrame(
+            [(f"🔹 {p.subtopic}", f"{p.end - p.start} minutes", p.date, slot_engine.format_slot(p.start, p.end))
+             for p in placements],
+            columns=["Subtopic", "Duration", "Date", "Time Slot"])
+        st.dataframe(df.style.set_properties(**{'background-color': '#f0f0f0', 'color': '#333333', 'border': '1px solid #ddd'}))
+        if unplaced:
+            st.warning("Not enough free time before the due date for: "
+                       + ", ".join(f"{name} ({minutes} min)" for _, name, minutes in unplaced)
+                       + ". Add more time slots and the schedule will be re-planned.")
+
+        # Save schedule to DB
+        if placements and st.button("💾 Save Schedule"):
+            try:
+                database.write(save_schedule, user_id, selected_task_id, placements, job.id)
+                st.success("📁 Schedule saved to database!")
+            except sqlite3.Error as e:
+                st.error(f"❗ Error saving schedule to database: {str(e)}")
+            except Exception as e:
+                st.error(f"❗ An unexpected error occurred: {str(e)}")
+
+    # Display saved schedule
+    st.markdown("### 🗂 Saved Schedules")
+    # Fetch saved schedules with task names by joining with the tasks table
+    saved_schedules = cache.rows(conn, queries.SAVED_SCHEDULES, (user_id,), ("schedule", "tasks"))
+
+    if saved_schedules:
+        saved_df = pd.DataFrame(saved_schedules, columns=["Date", "Time Slot", "Task", "Subtopics"])
+        st.dataframe(saved_df.style.set_properties(**{'background-color': '#e8f5e9', 'color': '#2e7d32', 'border': '1px solid #ddd'}))
+    else:
+        st.info("No saved schedules yet. Generate one above!")
@@ -0,0 +1,32 @@
+import datetime
+
+import streamlit as st
+
+import queries
+import resources
+import slot_engine
+import slots
+
+
+# Time Slots
+def render():
+    conn = resources.get_conn()
+    user_id = st.session_state['user_id']
+    st.subheader("Set Available Time Slots")
+    day = st.date_input("Select Date")
+    start_col, end_col = st.columns(2)
+    with start_col:
+        slot_start = st.time_input("Start Time", value=datetime.time(10, 0))
+    with end_col:
+        slot_end = st.time_input("End Time", value=datetime.time(11, 0))
+    if st.button("Save Slot"):
+        try:
+            resources.get_db().write(slots.add_slot, user_id, day, slot_start.hour * 60 + slot_start.minute, slot_end.hour * 60 + slot_end.minute)
+            st.success("Time slot saved!")
+        except Exception as e:
+            st.error(f"Error saving time slot: {str(e)}")
+
+    # A day can have several slots
+    day_slots = resources.get_read_cache().rows(conn, queries.SLOTS_ON_DATE, (user_id, str(day)), ("slot",))
+    if day_slots:
+        st.write("Slots on this day: " + ", ".join(slot_engine.format_slot(start, end) for start, end in day_slots))
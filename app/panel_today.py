@@ -0,0 +1,113 @@
+import datetime
+
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+
+import queries
+import resources
+import task_list
+
+
+def distribution_figures(summary):
+    """The "Tasks by Priority" pie and "Tasks by Category" bar for a task_list.summary()."""
+    priority_counts = pd.DataFrame(summary["by_priority"].items(), columns=["Priority", "Count"])
+    fig1 = px.pie(priority_counts, values="Count", names="Priority", title="Tasks by Priority")
+    category_counts = pd.DataFrame(summary["by_category"].items(), columns=["Category", "Count"])
+    fig2 = px.bar(category_counts, x="Category", y="Count", title="Tasks by Category", color="Category")
+    return fig1, fig2
+
+
+def summary_and_figures(conn, user_id):
+    summary = task_list.summary(conn, user_id)
+    return summary, distribution_figures(summary) if summary["total"] else None
+
+
+# Paging reruns just the task list, not the metrics and charts around it
+@st.fragment
+def task_page(user_id, total):
+    conn = resources.get_conn()  # Fragment reruns can run on another thread
+    cache = resources.get_read_cache()
+    try:
+        # Stack of page cursors; the last one is the page being shown
+        if 'task_page_cursors' not in st.session_state:
+            st.session_state['task_page_cursors'] = [task_list.FIRST_PAGE]
+        cursors = st.session_state['task_page_cursors']
+
+        def current_page():
+            cursor = cursors[-1]
+            return cache.get(("todays_tasks_page", user_id, cursor), ("tasks",),
+                             lambda: task_list.page(conn, user_id, cursor))
+
+        rows, next_cursor = current_page()
+        if not rows and len(cursors) > 1:
+            # The page emptied out (tasks completed elsewhere); start over
+            cursors[:] = [task_list.FIRST_PAGE]
+            rows, next_cursor = current_page()
+        task_df = pd.DataFrame(rows, columns=["Topic", "Status", "Progress", "Priority", "Category"])
+        st.dataframe(task_df, use_container_width=True)
+
+        page_count = -(-total // task_list.PAGE_SIZE)
+        prev_col, page_col, next_col = st.columns([1, 2, 1])
+        with prev_col:
+            st.button("⬅️ Previous", disabled=len(cursors) == 1,
+                      on_click=lambda: cursors.pop())
+        with page_col:
+            st.caption(f"Page {len(cursors)} of {page_count}")
+        with next_col:
+            st.button("Next ➡️", disabled=next_cursor is None,
+                      on_click=lambda: cursors.append(next_cursor))
+    except Exception as e:
+        st.error(f"Error fetching tasks: {str(e)}")
+
+
+# Today's Tasks
+def render():
+    conn = resources.get_conn()
+    cache = resources.get_read_cache()
+    user_id = st.session_state['user_id']
+    st.subheader("Your Tasks for Today")
+    try:
+        # Unchanged tasks mean no queries and no figure building on a rerun
+        summary, figures = cache.get(("todays_summary", user_id), ("task_counts",),
+                                     lambda: summary_and_figures(conn, user_id))
+        if summary["total"]:
+            # Summary Card
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Total Tasks", summary["total"])
+            with col2:
+                st.metric("Completed Tasks", summary["completed"])
+            with col3:
+                st.metric("Pending Tasks", summary["pending"])
+
+            # Task List in Tabular Format, one keyset page at a time
+            st.write("### Task List")
+            task_page(user_id, summary["total"])
+
+            # Visualizations
+            st.write("### Task Distribution")
+            fig1, fig2 = figures
+            pri_col1, cat_col2 = st.columns(2)
+            with pri_col1:
+                st.plotly_chart(fig1)
+
+            with cat_col2:
+                st.plotly_chart(fig2)
+
+        else:
+            st.write("No tasks for today.")
+
+        # Recurring tasks over the next week, read from the materialized occurrences
+        today = datetime.date.today()
+        resources.get_horizon().ensure()
+        week = cache.rows(conn, queries.OCCURRENCES_BETWEEN, (user_id, str(today), str(today + datetime.timedelta(days=6))),
+                          ("task_occurrences", "tasks"))
+        if week:
+            st.write("### 🔁 Recurring This Week")
+            week_df = pd.DataFrame([(date, topic, status, task_list.priority_label(priority), category)
+                                    for date, _, topic, status, priority, category in week],
+                                   columns=["Date", "Topic", "Status", "Priority", "Category"])
+            st.dataframe(week_df, use_container_width=True)
+    except Exception as e:
+        st.error(f"Error fetching tasks: {str(e)}")
@@ -0,0 +1,234 @@
+import functools
+import json
+import logging
+import logging.handlers
+import queue
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import queries
+
+# In-process timing for the dashboard: panel runs (main.py), SQL statements
+# (connections from database.Database) and LLM calls (llm_client.py and
+# llm_governor.py). Each measurement is an event dict
+#   {"ts", "kind", "name", "ms", ...fields}
+# kept in a ring buffer per kind (so a burst of SQL can't push out the panel
+# and LLM events) that the Diagnostics panel summarizes as p50/p95/p99 per
+# (kind, name), and optionally appended to a JSON-lines file for offline
+# analysis. Events are kept in memory only, so a restart starts over.
+
+# queries.py SQL -> its constant name, so panel queries show up by name
+_QUERY_NAMES = {" ".join(value.split()): name for name, value in vars(queries).items()
+                if name.isupper() and isinstance(value, str)}
+_WHITESPACE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=1024)
+def statement_name(sql):
+    """A short label for `sql`: its queries.py name, else its first 80 characters."""
+    sql = _WHITESPACE.sub(" ", sql).strip()
+    return _QUERY_NAMES.get(sql) or sql[:80]
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-p * len(sorted_values) // 100))
+    return sorted_values[int(rank) - 1]
+
+
+class Recorder:
+    def __init__(self, capacity=10000, log_path=None):
+        self.capacity = capacity  # Per kind
+        self._events = {}  # kind -> deque; appends are thread-safe and the oldest events drop off
+        self._local = threading.local()  # The calling thread's open span, if any
+        self._listener = None
+        self._log = None
+        if log_path:
+            # The file is written on the listener's thread, not the one being timed
+            log_queue = queue.SimpleQueue()
+            handler = logging.FileHandler(log_path, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._listener = logging.handlers.QueueListener(log_queue, handler)
+            self._listener.start()
+            self._log = logging.getLogger(f"perf.{id(self)}")
+            self._log.propagate = False
+            self._log.setLevel(logging.INFO)
+            self._log.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    def record(self, kind, name, seconds, **fields):
+        event = {"ts": time.time(), "kind": kind, "name": name, "ms": seconds * 1000, **fields}
+        buffer = self._events.get(kind)
+        if buffer is None:
+            buffer = self._events.setdefault(kind, deque(maxlen=self.capacity))
+        buffer.append(event)
+        if self._log is not None:
+            self._log.info(json.dumps(event, default=str))
+        span = getattr(self._local, "span", None)
+        if kind in ("sql", "llm") and span is not None:
+            # Attributed to the panel (or other span) running on this thread
+            span[kind] = span.get(kind, 0) + 1
+            span[f"{kind}_ms"] = span.get(f"{kind}_ms", 0.0) + seconds * 1000
+
+    @contextmanager
+    def timed(self, kind, name, **fields):
+        """Record the block's duration; the block may add fields to the yielded dict.
+
+        SQL statements and LLM calls the block makes on this thread are counted
+        in its "sql"/"sql_ms" and "llm"/"llm_ms" fields.
+        """
+        outer = getattr(self._local, "span", None)
+        span = self._local.span = dict(fields)
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span["error"] = type(e).__name__
+            raise
+        finally:
+            self._local.span = outer
+            self.record(kind, name, time.perf_counter() - start, **span)
+
+    def events(self, kind=None):
+        """The buffered events of one kind, or of every kind, oldest first."""
+        if kind is not None:
+            return list(self._events.get(kind, ()))
+        return sorted((e for buffer in list(self._events.values()) for e in list(buffer)), key=lambda e: e["ts"])
+
+    def summary(self, kind=None):
+        """One row per (kind, name): count, p50/p95/p99/max and total ms, errors, and summed fields."""
+        groups = {}
+        for event in self.events(kind):
+            groups.setdefault((event["kind"], event["name"]), []).append(event)
+        rows = []
+        for (event_kind, name), events in groups.items():
+            ms = sorted(e["ms"] for e in events)
+            row = {"kind": event_kind, "name": name, "count": len(ms),
+                   "p50": percentile(ms, 50), "p95": percentile(ms, 95), "p99": percentile(ms, 99),
+                   "max": ms[-1], "total": sum(ms), "errors": sum("error" in e for e in events)}
+            for field in ("rows", "sql", "sql_ms", "llm", "prompt_tokens", "completion_tokens", "retries"):
+                values = [e[field] for e in events if e.get(field) is not None]
+                if values:
+                    row[field] = sum(values)
+            caches = [e["cache"] for e in events if "cache" in e]
+            if caches:
+                row["cache_hit_rate"] = sum(cache != "miss" for cache in caches) / len(caches)
+            rows.append(row)
+        rows.sort(key=lambda row: row["total"], reverse=True)
+        return rows
+
+    def clear(self):
+        for buffer in list(self._events.values()):
+            buffer.clear()
+
+    def close(self):
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Times a statement from execute() until its rows are used up, the cursor
+    is closed, reused or dropped, and records it with the rows it returned.
+    A statement that raises is recorded at once with an "error" field."""
+
+    _statement = None  # [sql, seconds so far, rows]
+
+    def _finish(self):
+        statement, self._statement = self._statement, None
+        recorder = self.connection.recorder  # None while db.connect() sets the pragmas
+        if statement is not None and recorder is not None:
+            sql, seconds, rows = statement
+            if rows == 0 and self.rowcount > 0:
+                rows = self.rowcount  # INSERT/UPDATE/DELETE
+            recorder.record("sql", statement_name(sql), seconds, rows=rows)
+
+    def _failed(self, sql, start, error):
+        recorder = self.connection.recorder
+        if recorder is not None:
+            recorder.record("sql", statement_name(sql), time.perf_counter() - start, error=type(error).__name__)
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        start = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        except Exception as e:
+            self._failed(sql, start, e)
+            raise
+        self._statement = [sql, time.perf_counter() - start, 0]
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        start = time.perf_counter()
+        try:
+            super().executemany(sql, seq_of_parameters)
+        except Exception as e:
+            self._failed(sql, start, e)
+            raise
+        self._statement = [sql, time.perf_counter() - start, 0]
+        return self
+
+    def _fetched(self, start, rows, done):
+        statement = self._statement
+        if statement is not None:
+            statement[1] += time.perf_counter() - start
+            statement[2] += rows
+            if done:
+                self._finish()
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(start, 0 if row is None else 1, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(start, len(rows), not rows)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, len(rows), True)
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(start, 0, True)
+            raise
+        self._fetched(start, 1, False)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()
+
+
+class TimedConnection(sqlite3.Connection):
+    """A connection whose statements are recorded to `recorder` (set after connecting)."""
+
+    recorder = None
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
@@ -0,0 +1,159 @@
+# SQL for the dashboard panels. Kept in one place so migrations.check_query_plans
+# can EXPLAIN each one and catch index regressions. Every query is scoped to the
+# logged-in user (the first parameter) through indexes that lead with user_id.
+
+# Metrics and chart counts for "Today's Tasks": one row per (priority, category),
+# read from the trigger-maintained rollup so the cost doesn't grow with the task count
+TODAYS_SUMMARY = """
+    SELECT priority, category, tasks, completed
+    FROM task_counts
+    WHERE user_id = ? AND status = 'Pending'
+"""
+
+# One keyset page: rows strictly after the (priority_rank, id) cursor. Split in
+# two seeks (rest of the cursor's rank, then lower ranks) because SQLite only
+# seeks on the first column of a row-value comparison.
+TODAYS_TASKS_PAGE = """
+    SELECT * FROM (
+        SELECT priority_rank, id, topic, status, progress, priority, category
+        FROM tasks
+        WHERE user_id = ?1 AND status = 'Pending' AND priority_rank = ?2 AND id < ?3
+        ORDER BY id DESC
+        LIMIT ?4
+    )
+    UNION ALL
+    SELECT * FROM (
+        SELECT priority_rank, id, topic, status, progress, priority, category
+        FROM tasks
+        WHERE user_id = ?1 AND status = 'Pending' AND priority_rank < ?2
+        ORDER BY priority_rank DESC, id DESC
+        LIMIT ?4
+    )
+    LIMIT ?4
+"""
+
+SCHEDULE_TASK_OPTIONS = """
+    SELECT id, topic, due_date, category, status, progress, priority
+    FROM tasks
+    WHERE user_id = ? AND status = 'Pending'
+    ORDER BY priority_rank DESC
+"""
+
+SCHEDULE_TASK_DETAILS = """
+    SELECT topic, due_date, status, progress, priority, category, recurrence
+    FROM tasks
+    WHERE id = ? AND user_id = ? AND status = 'Pending'
+"""
+
+SLOTS_ON_DATE = """
+    SELECT start_minute, end_minute
+    FROM slot
+    WHERE user_id = ? AND date = ?
+    ORDER BY start_minute
+"""
+
+# Availability and booked time for a date range, both via the (user_id, date, ...) indexes
+FREE_BUSY = """
+    SELECT date, start_minute, end_minute, 0 FROM slot
+    WHERE user_id = ? AND date BETWEEN ? AND ?
+    UNION ALL
+    SELECT date, start_minute, end_minute, 1 FROM schedule
+    WHERE user_id = ? AND date BETWEEN ? AND ? AND start_minute IS NOT NULL
+"""
+
+SAVED_SCHEDULES = """
+    SELECT s.date, s.slot, t.topic AS task, s.subtopics
+    FROM schedule s
+    JOIN tasks t ON s.task_id = t.id
+    WHERE s.user_id = ?
+    ORDER BY s.date, s.start_minute
+"""
+
+COMPLETED_TASKS = """
+    SELECT topic, subtopics, category
+    FROM tasks
+    WHERE user_id = ? AND status = 'Completed'
+"""
+
+TASK_TIME_DATA = """
+    SELECT topic, due_date, status, progress, category, COALESCE(total_seconds, 0)
+    FROM tasks
+    LEFT JOIN task_time_totals ON tasks.id = task_time_totals.task_id
+    WHERE user_id = ?
+"""
+
+INSIGHTS_TASKS = """
+    SELECT topic, due_date, status, priority, progress, id
+    FROM tasks
+    WHERE user_id = ?
+"""
+
+# Filter choices for the export panel, from the small task_counts rollup
+EXPORT_FILTER_VALUES = "SELECT DISTINCT status, category FROM task_counts WHERE user_id = ?"
+
+HAS_TIME_LOGS = "SELECT 1 FROM time_logs WHERE user_id = ? LIMIT 1"
+
+# Recurring tasks' occurrences in a date window (materialized by recurrence.Horizon)
+OCCURRENCES_BETWEEN = """
+    SELECT o.date, t.id, t.topic, t.status, t.priority, t.category
+    FROM task_occurrences o
+    JOIN tasks t ON t.id = o.task_id
+    WHERE o.user_id = ? AND o.date BETWEEN ? AND ?
+    ORDER BY o.date
+"""
+
+NEXT_OCCURRENCE = "SELECT MIN(date) FROM task_occurrences WHERE task_id = ? AND date >= ?"
+
+# Recurring tasks not yet expanded through a date. The rules are literals so
+# the partial index (WHERE recurrence IN ...) can be used.
+STALE_RECURRING_TASKS = """
+    SELECT t.id, t.user_id, t.due_date, t.recurrence, s.through
+    FROM tasks t
+    LEFT JOIN recurrence_state s ON s.task_id = t.id
+    WHERE t.recurrence IN ('Daily', 'Weekly', 'Monthly') AND (s.through IS NULL OR s.through < ?)
+"""
+
+# The newest job of a kind the user has not dismissed (see jobs.py)
+LATEST_JOB = """
+    SELECT id, status, result, error, updated_at FROM jobs
+    WHERE user_id = ? AND kind = ? AND ref IS ? AND dismissed = 0
+    ORDER BY id DESC LIMIT 1
+"""
+
+JOB = "SELECT id, status, result, error, updated_at FROM jobs WHERE id = ?"
+
+# One user's LLM usage over a range of days, all models
+LLM_USAGE = """
+    SELECT COALESCE(SUM(requests), 0), COALESCE(SUM(prompt_tokens + completion_tokens), 0), COALESCE(SUM(cost), 0)
+    FROM llm_usage WHERE user_id = ? AND day BETWEEN ? AND ?
+"""
+
+# name -> (sql, sample params, index the plan must use)
+PANEL_QUERIES = {
+    "todays_summary": (TODAYS_SUMMARY, (1,), "SEARCH task_counts USING INDEX sqlite_autoindex_task_counts_1"),
+    "todays_tasks_page": (TODAYS_TASKS_PAGE, (1, 3, 100, 25),
+                          ("idx_tasks_pending_page (user_id=? AND status=? AND priority_rank=? AND id<?)",
+                           "idx_tasks_pending_page (user_id=? AND status=? AND priority_rank<?)")),
+    "schedule_task_options": (SCHEDULE_TASK_OPTIONS, (1,), "idx_tasks_status_priority (user_id=? AND status=?)"),
+    "schedule_task_details": (SCHEDULE_TASK_DETAILS, (1, 1), "INTEGER PRIMARY KEY"),
+    "slots_on_date": (SLOTS_ON_DATE, (1, "2025-01-01"), "COVERING INDEX idx_slot_date (user_id=? AND date=?)"),
+    "free_busy": (FREE_BUSY, (1, "2025-01-01", "2025-01-31") * 2,
+                  ("COVERING INDEX idx_slot_date (user_id=?", "COVERING INDEX idx_schedule_date (user_id=?")),
+    "saved_schedules": (SAVED_SCHEDULES, (1,),
+                        ("idx_schedule_date (user_id=?)", "SEARCH t USING INTEGER PRIMARY KEY")),
+    # Reads subtopics, so no index covers it; either (user_id, status) index will do
+    "completed_tasks": (COMPLETED_TASKS, (1,), "(user_id=? AND status=?)"),
+    "task_time_data": (TASK_TIME_DATA, (1,),
+                       ("idx_tasks_status_priority (user_id=?)", "SEARCH task_time_totals USING INTEGER PRIMARY KEY")),
+    "insights_tasks": (INSIGHTS_TASKS, (1,), "idx_tasks_status_priority (user_id=?)"),
+    "has_time_logs": (HAS_TIME_LOGS, (1,), "idx_time_logs_user (user_id=?)"),
+    "occurrences_between": (OCCURRENCES_BETWEEN, (1, "2025-01-01", "2025-01-07"),
+                            ("idx_task_occurrences_date (user_id=? AND date>? AND date<?)",
+                             "SEARCH t USING INTEGER PRIMARY KEY")),
+    "next_occurrence": (NEXT_OCCURRENCE, (1, "2025-01-01"), "PRIMARY KEY (task_id=? AND date>?)"),
+    "stale_recurring_tasks": (STALE_RECURRING_TASKS, ("2025-01-01",),
+                              ("idx_tasks_recurring", "SEARCH s USING INTEGER PRIMARY KEY")),
+    "latest_job": (LATEST_JOB, (1, "insights", None), "idx_jobs_lookup (user_id=? AND kind=? AND ref=? AND dismissed=?)"),
+    "job": (JOB, (1,), "INTEGER PRIMARY KEY"),
+    "llm_usage": (LLM_USAGE, (1, "2025-01-01", "2025-01-31"), "PRIMARY KEY (user_id=? AND day>? AND day<?)"),
+}
@@ -1,92 +1,136 @@
+import functools
+import json
 import streamlit as st
-from langchain.chat_models import ChatOpenAI
-import db
-import os
-from dotenv import load_dotenv
+import llm_client
+import queries
+import quiz_worker
+import resources
 import re
-
-# Load environment variables (e.g., OpenAI API key)
-load_dotenv()
-conn = db.init_db()
-
-# Initialize OpenAI
-llm = ChatOpenAI(model_name="gpt-4", openai_api_key=os.getenv("OPENAI_API_KEY"))
+import semantic_index
+import structured
 
 # Fetch completed tasks from the database
-def fetch_completed_tasks():
-    tasks = conn.execute("""
-        SELECT topic, subtopics, category 
-        FROM tasks 
-        WHERE status = 'Completed'
-    """).fetchall()
+def fetch_completed_tasks(user_id):
+    tasks = resources.get_read_cache().rows(resources.get_conn(), queries.COMPLETED_TASKS, (user_id,), ("tasks",))
     return tasks
 
+# Strict schema for one quiz question (one JSON object per line)
+_OPTION_PREFIX = re.compile(r"^[A-E]\)\s*")
+
+
+def _check_question(item):
+    if item["type"] == "multiple-choice":
+        if not 2 <= len(item["options"]) <= 5:
+            return {"options": "multiple-choice questions need 2 to 5 options"}
+        letters = "ABCDE"[:len(item["options"])]
+        if item["answer"] not in letters:
+            return {"answer": "must be the letter of the correct option: " + ", ".join(letters)}
+    return {}
+
+
+QUIZ_SCHEMA = structured.Schema({
+    "question": structured.text_field,
+    "type": structured.one_of("multiple-choice", "open-ended"),
+    "options": structured.text_list,
+    "answer": structured.text_field,
+    "explanation": structured.optional_text,
+}, check=_check_question)
+
+
 # Generate quiz questions using OpenAI
-def generate_quiz(topic, subtopics, num_questions=5):
+def generate_quiz(topic, subtopics, num_questions=5, use_cache=True, user_id=None):
     prompt = f"""
     Generate {num_questions} quiz questions based on the following completed task:
     Topic: {topic}
     Subtasks: {subtopics if subtopics else "None"}
 
     Include a mix of multiple-choice and open-ended questions.
-    Format the output as follows:
-    1. Question: What is a variable in Python?
-       Type: multiple-choice
-       Options: A) A container for storing data, B) A function, C) A loop
-       Answer: A
-    2. Question: What is a loop in Python?
-       Type: open-ended
-       Answer: A loop is used to repeat a block of code.
+    Output exactly {num_questions} lines and nothing else. Each line is one JSON object with the keys
+    "question", "type" ("multiple-choice" or "open-ended"), "options" (a list of option texts,
+    empty for open-ended), "answer" (the option letter for multiple-choice, the expected answer
+    for open-ended) and "explanation". For example:
+    {{"question": "What is a variable in Python?", "type": "multiple-choice", "options": ["A container for storing data", "A function", "A loop"], "answer": "A", "explanation": "Variables name stored values."}}
+    {{"question": "What is a loop in Python?", "type": "open-ended", "options": [], "answer": "A loop is used to repeat a block of code.", "explanation": "for and while loops repeat code."}}
     """
-    response = llm.invoke(prompt)
-    return response.content
+    return llm_client.complete(prompt, use_cache=use_cache, user_id=user_id)
 
 # Parse the quiz content into a structured format
-def parse_quiz(quiz_content):
-    """Parse the raw quiz content into a structured list of questions."""
+def parse_quiz(quiz_content, repair=True, user_id=None):
+    """Validate the JSON Lines quiz in one pass and return the questions.
+
+    Invalid questions are sent back to the LLM once for repair (only their
+    failing fields are listed); questions that still fail are dropped.
+    """
+    parser = structured.JsonLinesParser(QUIZ_SCHEMA)
+    parser.parse(quiz_content)
+    repaired = structured.repair(parser, functools.partial(llm_client.complete, user_id=user_id)) if repair else 0
+    resources.get_db().submit(structured.record_parse, "quiz", parser, repaired)
+
     questions = []
-    current_question = None
-
-    # Regex patterns for different parts
-    question_pattern = re.compile(r"^\d+\.\s*Question:(.+)")
-    type_pattern = re.compile(r"^\s*Type:\s*(.+)")
-    options_pattern = re.compile(r"^\s*Options:\s*(.+)")
-    answer_pattern = re.compile(r"^\s*Answer:\s*(.+)")
-
-    for line in quiz_content.split('\n'):
-        line = line.strip()
-
-        # Start a new question
-        if match := question_pattern.match(line):
-            if current_question:
-                questions.append(current_question)
-            current_question = {
-                "question": match.group(1).strip(),
-                "type": None,
-                "options": [],
-                "answer": None
-            }
-
-        # Capture the type
-        elif match := type_pattern.match(line):
-            if current_question:
-                current_question["type"] = match.group(1).strip()
-
-        # Capture options (handles embedded commas correctly)
-        elif match := options_pattern.match(line):
-            if current_question:
-                raw_options = match.group(1).strip()
-                current_question["options"] = re.findall(r"[A-C]\) [^A-C]+?(?=(, [A-C]\)|$))", raw_options)
-
-        # Capture the answer
-        elif match := answer_pattern.match(line):
-            if current_question:
-                current_question["answer"] = match.group(1).strip()
-
-    # Add the last question
-    if current_question:
-        questions.append(current_question)
+    for item in parser.items:
+        question = {
+            "question": item["question"],
+            "type": item["type"],
+            "options": [],
+            "answer": item["answer"],
+            "explanation": item["explanation"] or "No explanation provided.",
+        }
+        if item["type"] == "multiple-choice":
+            # Options are shown and answered as "A) ..." so the answer compares directly
+            question["options"] = [f"{letter}) {_OPTION_PREFIX.sub('', text)}"
+                                   for letter, text in zip("ABCDE", item["options"])]
+            question["answer"] = question["options"]["ABCDE".index(item["answer"])]
+        questions.append(question)
+    return questions
 
+
+# Near-identical quizzes and questions (cosine similarity of their embeddings)
+REUSE_SCORE = 0.95
+DUPLICATE_SCORE = 0.9
+
+
+def find_similar_quiz(topic, subtopics, num_questions):
+    """Questions of an already generated quiz for a near-identical task, or None."""
+    index = resources.get_semantic_index()
+    for match in index.search("quiz", [semantic_index.quiz_text(topic, subtopics)], k=3, min_score=REUSE_SCORE)[0]:
+        questions = json.loads(match.payload)
+        if len(questions) >= num_questions:
+            return questions[:num_questions]
+    return None
+
+
+def dedupe_questions(questions, skip_asked=False):
+    """Drop questions near-identical to an earlier one in the list.
+
+    With skip_asked, also drop those near-identical to questions generated before.
+    """
+    if not questions:
+        return questions
+    index = resources.get_semantic_index()
+    texts = [question["question"] for question in questions]
+    drop = semantic_index.near_duplicates(index.embed(texts), DUPLICATE_SCORE)
+    if skip_asked:
+        asked = index.search("question", texts, k=1, min_score=DUPLICATE_SCORE)
+        drop.update(i for i, matches in enumerate(asked) if matches)
+    return [question for i, question in enumerate(questions) if i not in drop]
+
+
+def build_quiz(topic, subtopics, num_questions=5, fresh=False, user_id=None):
+    """Questions for a task, paying for a new generation only when needed.
+
+    A quiz for a near-identical task is reused unless `fresh`; otherwise the
+    new questions are deduplicated (a fresh quiz also skips questions asked
+    before) and indexed for later reuse.
+    """
+    if not fresh:
+        reused = find_similar_quiz(topic, subtopics, num_questions)
+        if reused:
+            return reused
+    content = generate_quiz(topic, subtopics, num_questions, use_cache=not fresh, user_id=user_id)
+    questions = dedupe_questions(parse_quiz(content, user_id=user_id),
+                                 skip_asked=fresh)
+    if questions:
+        resources.get_db().write(semantic_index.add_quiz, topic, subtopics, questions)
     return questions
 
 
@@ -145,7 +189,7 @@ def ai_quiz_generation():
     st.write("Generate quizzes from your completed tasks!")
 
     # Fetch completed tasks
-    tasks = fetch_completed_tasks()
+    tasks = fetch_completed_tasks(st.session_state['user_id'])
 
     if tasks:
         # Let the user select a task
@@ -154,12 +198,19 @@ def ai_quiz_generation():
 
         # Let the user specify the number of questions
         num_questions = st.number_input("🎯 Number of questions", min_value=1, max_value=10, value=5)
+        fresh = st.checkbox("🔄 Generate new questions (skip cache)", key="quiz_skip_cache")
 
         # Generate quiz
         if st.button("🚀 Generate Quiz"):
             try:
-                quiz_content = generate_quiz(selected_task, subtopics, num_questions)
-                st.session_state['quiz'] = parse_quiz(quiz_content)
+                # Use a quiz prepared in the background if there is one
+                prepared = None if fresh else quiz_worker.get_prepared_quiz(
+                    resources.get_conn(), selected_task, subtopics, num_questions)
+                if prepared:
+                    st.session_state['quiz'] = prepared
+                else:
+                    st.session_state['quiz'] = build_quiz(selected_task, subtopics, num_questions, fresh=fresh,
+                                                          user_id=st.session_state['user_id'])
                 st.session_state['user_answers'] = [""] * len(st.session_state['quiz'])
                 st.session_state['feedback'] = None
                 st.success("✅ Quiz generated successfully!")
@@ -0,0 +1,133 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Background quiz pre-generation. Tasks whose status changes to Completed
+# after the worker first started are queued in `quiz_queue` (see
+# migrations.py) and a bounded thread pool generates and parses their
+# quizzes, so "Generate Quiz" can usually answer from the table instantly.
+# Tasks completed before that, or saved as Completed, are left to the
+# on-demand path rather than paying for a generation each.
+
+MAX_ATTEMPTS = 3
+RETRY_BACKOFF = 60  # Seconds before the first retry; doubles with each failed attempt
+
+
+def get_prepared_quiz(conn, topic, subtopics, num_questions):
+    """Return a ready, parsed quiz for the task with at least `num_questions`, or None."""
+    row = conn.execute("""
+        SELECT quiz FROM quiz_queue
+        WHERE topic = ? AND subtopics IS ? AND status = 'ready' AND num_questions >= ?
+        ORDER BY updated_at DESC LIMIT 1
+    """, (topic, subtopics, num_questions)).fetchone()
+    if row is None:
+        return None
+    return json.loads(row[0])[:num_questions]
+
+
+class QuizPregenerator:
+    def __init__(self, database, max_workers=2, num_questions=5, poll_interval=30):
+        self.database = database  # database.Database; all queue updates go through its writer
+        self.max_workers = max_workers
+        self.num_questions = num_questions
+        self.poll_interval = poll_interval
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="quiz-pregen")
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.database.write(_start)
+        self._thread = threading.Thread(target=self._run, name="quiz-pregen-watch", daemon=True)
+        self._thread.start()
+
+    def wake(self):
+        """Check for newly completed tasks now instead of at the next poll."""
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.database.write(self.enqueue_completed)
+            self._dispatch()
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def enqueue_completed(self, conn):
+        """Queue tasks completed since the first start that have no quiz entry yet (a write job)."""
+        conn.execute("""
+            INSERT OR IGNORE INTO quiz_queue (task_id, topic, subtopics, num_questions, status, updated_at)
+            SELECT id, topic, subtopics, ?, 'queued', ? FROM tasks
+            WHERE completed_at >= (SELECT started_at FROM quiz_pregen_state) AND status = 'Completed'
+        """, (self.num_questions, time.time()))
+
+    def _dispatch(self):
+        # Claim queued jobs only while a pool slot is free (the concurrency limit)
+        while not self._stop.is_set() and self._slots.acquire(blocking=False):
+            row = self.database.write(_claim_next)
+            if row is None:
+                self._slots.release()
+                return
+            self._executor.submit(self._generate, *row)
+
+    def _generate(self, task_id, topic, subtopics, num_questions):
+        import quiz  # Imported here to avoid a circular import with quiz.py
+        try:
+            try:
+                questions = quiz.build_quiz(topic, subtopics, num_questions)
+                if not questions:
+                    raise ValueError("LLM response contained no questions")
+                self.database.write(_store_quiz, task_id, json.dumps(questions))
+            except Exception as e:
+                self.database.write(_record_failure, task_id, str(e))
+        finally:
+            self._slots.release()
+            self.wake()
+
+
+# Write jobs (run on the database's writer thread)
+
+def _start(conn):
+    # The watermark is only set the first time; later starts keep it
+    conn.execute("INSERT OR IGNORE INTO quiz_pregen_state (id, started_at) VALUES (1, ?)", (time.time(),))
+    # Jobs interrupted by a restart go back to the queue
+    conn.execute("UPDATE quiz_queue SET status = 'queued' WHERE status = 'running'")
+
+
+def _claim_next(conn):
+    """Mark the oldest queued job that is due running and return it, or None."""
+    row = conn.execute("""
+        SELECT task_id, topic, subtopics, num_questions FROM quiz_queue
+        WHERE status = 'queued' AND not_before <= ? ORDER BY updated_at LIMIT 1
+    """, (time.time(),)).fetchone()
+    if row is not None:
+        conn.execute("UPDATE quiz_queue SET status = 'running', updated_at = ? WHERE task_id = ?",
+                     (time.time(), row[0]))
+    return row
+
+
+def _store_quiz(conn, task_id, quiz_json):
+    conn.execute("""
+        UPDATE quiz_queue SET status = 'ready', quiz = ?, error = NULL, updated_at = ?
+        WHERE task_id = ?
+    """, (quiz_json, time.time(), task_id))
+
+
+def _record_failure(conn, task_id, error):
+    # Retried after a growing delay, so an outage does not use up every attempt at once
+    now = time.time()
+    conn.execute("""
+        UPDATE quiz_queue
+        SET attempts = attempts + 1, error = ?, updated_at = ?,
+            not_before = ? + ? * (1 << attempts),
+            status = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE 'queued' END
+        WHERE task_id = ?
+    """, (error, now, now, RETRY_BACKOFF, MAX_ATTEMPTS, task_id))
@@ -0,0 +1,62 @@
+import threading
+from collections import OrderedDict
+
+# In-process cache for what the dashboard panels build from the database:
+# query rows, DataFrames, Plotly figures. Each entry records the write
+# generations (database.Database.versions) of the tables it was built from.
+# A commit that changes one of those tables makes it stale; writes to other
+# tables leave it alone. A rerun where nothing changed is a dict lookup, with
+# no SQL and no figure building.
+
+
+class ReadCache:
+    def __init__(self, database, max_entries=512):
+        self.database = database
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (tables, versions, value), least recently used first
+        self._lock = threading.Lock()
+
+    def get(self, key, tables, build):
+        """Return the value cached for `key`, calling `build()` if any of `tables` changed since.
+
+        `key` must identify everything else the value depends on (user id,
+        page cursor, ...). Cached values are shared, so callers must not mutate them.
+        """
+        versions = self.database.versions(tables)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[:2] == (tables, versions):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+        # Built outside the lock; a write that lands meanwhile leaves the entry
+        # under the old versions, so the next call rebuilds it
+        value = build()
+        with self._lock:
+            self._entries[key] = (tables, versions, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def rows(self, conn, sql, params, tables):
+        """`conn.execute(sql, params).fetchall()`, cached until one of `tables` is written."""
+        return self.get((sql, tuple(params)), tables, lambda: conn.execute(sql, params).fetchall())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            hits, misses, entries = self.hits, self.misses, len(self._entries)
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+            "entries": entries,
+        }
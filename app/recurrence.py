@@ -0,0 +1,112 @@
+import calendar
+import datetime
+import threading
+
+import queries
+
+# Recurring tasks ("Daily", "Weekly", "Monthly" in tasks.recurrence) repeat from
+# their due date. occurrences() yields the dates in any window by jumping straight
+# to the window, so the cost depends on the window and not on how long a task
+# has been repeating. Only a rolling horizon (recently past through a few weeks
+# ahead) is materialized in task_occurrences, where the panels query it by date;
+# each task's recurrence_state row records how far it has been expanded, so the
+# horizon advances by adding just the new days.
+
+RULES = ("Daily", "Weekly", "Monthly")  # Also spelled out in queries.STALE_RECURRING_TASKS
+HORIZON_DAYS = 60  # Materialized ahead of today
+RETAIN_DAYS = 7  # Kept behind today
+
+_STEP_DAYS = {"Daily": 1, "Weekly": 7}
+
+
+def _add_months(anchor, months):
+    """anchor + `months`, clamped to the end of a shorter month (Jan 31 -> Feb 28)."""
+    month_index = anchor.month - 1 + months
+    year, month = anchor.year + month_index // 12, month_index % 12 + 1
+    return datetime.date(year, month, min(anchor.day, calendar.monthrange(year, month)[1]))
+
+
+def occurrences(anchor, rule, start, end):
+    """Yield the dates in [start, end] on which a task due on `anchor` recurs under `rule`."""
+    start = max(start, anchor)
+    if rule in _STEP_DAYS:
+        step = _STEP_DAYS[rule]
+        day = anchor + datetime.timedelta(days=-(-(start - anchor).days // step) * step)
+        while day <= end:
+            yield day
+            day += datetime.timedelta(days=step)
+    elif rule == "Monthly":
+        months = (start.year - anchor.year) * 12 + start.month - anchor.month
+        day = _add_months(anchor, months)
+        while day <= end:
+            if day >= start:
+                yield day
+            months += 1
+            day = _add_months(anchor, months)
+
+
+def _parse_date(value):
+    try:
+        return datetime.date.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+# Write job (runs on the database's writer thread)
+
+def advance(conn, through, keep_from):
+    """Materialize every recurring task's occurrences up to `through` and drop those before `keep_from`.
+
+    Only tasks expanded to an earlier date (or never) are touched, and only
+    their missing days are added. Returns the number of occurrences added.
+    """
+    through, keep_from = datetime.date.fromisoformat(through), datetime.date.fromisoformat(keep_from)
+    stale = conn.execute(queries.STALE_RECURRING_TASKS, (str(through),)).fetchall()
+    added = 0
+    for task_id, user_id, due_date, rule, expanded_through in stale:
+        anchor = _parse_date(due_date)
+        if anchor is None:
+            continue
+        start = keep_from
+        if expanded_through is not None:
+            start = max(start, datetime.date.fromisoformat(expanded_through) + datetime.timedelta(days=1))
+        rows = [(task_id, str(day), user_id) for day in occurrences(anchor, rule, start, through)]
+        conn.executemany("INSERT OR IGNORE INTO task_occurrences (task_id, date, user_id) VALUES (?, ?, ?)", rows)
+        conn.execute("DELETE FROM task_occurrences WHERE task_id = ? AND date < ?", (task_id, str(keep_from)))
+        conn.execute("INSERT OR REPLACE INTO recurrence_state (task_id, through) VALUES (?, ?)", (task_id, str(through)))
+        added += len(rows)
+    return added
+
+
+class Horizon:
+    """Keeps task_occurrences materialized through today + `days` (or further, on request).
+
+    ensure() is called before occurrences are read. It only queues a write when
+    the date moved on, a later window was requested or tasks changed since the
+    last call; otherwise it does nothing, not even a query.
+    """
+
+    def __init__(self, database, days=HORIZON_DAYS, retain_days=RETAIN_DAYS):
+        self.database = database
+        self.days = days
+        self.retain_days = retain_days
+        self._through = None
+        self._key = None  # (today, tasks generation) of the last advance
+        self._lock = threading.Lock()
+
+    def ensure(self, through=None):
+        """Make sure occurrences are materialized through `through` (a date)."""
+        today = datetime.date.today()
+        target = today + datetime.timedelta(days=self.days)
+        if through is not None:
+            target = max(target, through)
+        key = (today, self.database.versions(("tasks",)))
+        with self._lock:
+            if self._key == key and self._through >= target:
+                return
+            # The horizon never moves back within a day
+            if self._through is not None and self._key[0] == today:
+                target = max(target, self._through)
+        self.database.write(advance, str(target), str(today - datetime.timedelta(days=self.retain_days)))
+        with self._lock:
+            self._through, self._key = target, key
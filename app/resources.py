@@ -0,0 +1,209 @@
+import atexit
+import os
+import threading
+
+from dotenv import load_dotenv
+
+import database
+import jobs
+import llm_cache
+import llm_governor
+import perf
+import quiz_worker
+import read_cache
+
+# Load environment variables (e.g., OpenAI API key)
+load_dotenv()
+
+# Shared resources live at module level so they survive Streamlit reruns:
+# the script is re-executed on every interaction, imported modules are not.
+_lock = threading.Lock()
+_database = None
+_llms = {}
+_llm_cache = None
+_quiz_worker = None
+_read_cache = None
+_semantic_index = None
+_horizon = None
+_job_runner = None
+_governor = None
+_recorder = None
+
+
+def get_recorder():
+    """Return the shared perf.Recorder, or None when PERF=0.
+
+    PERF_BUFFER sets how many events it keeps of each kind; PERF_LOG names a file that
+    every event is also appended to as a line of JSON.
+    """
+    global _recorder
+    if _recorder is None and os.getenv("PERF", "1") != "0":
+        with _lock:
+            if _recorder is None:
+                _recorder = perf.Recorder(capacity=int(os.getenv("PERF_BUFFER", 10000)),
+                                          log_path=os.getenv("PERF_LOG"))
+    return _recorder
+
+
+def get_db():
+    """Return the process-wide database (schema setup runs once, on first use)."""
+    global _database
+    if _database is None:
+        recorder = get_recorder()
+        with _lock:
+            if _database is None:
+                _database = database.Database(recorder=recorder)
+    return _database
+
+
+def get_conn():
+    """Return the calling thread's read connection; writes go through get_db().write()."""
+    return get_db().reader()
+
+
+def get_llm(model_name="gpt-4"):
+    """Return the shared chat client for `model_name`, building it on first use."""
+    llm = _llms.get(model_name)
+    if llm is None:
+        with _lock:
+            llm = _llms.get(model_name)
+            if llm is None:
+                from langchain.chat_models import ChatOpenAI
+                # Retries are the governor's; OPENAI_BASE_URL can point at fake_llm.py
+                llm = ChatOpenAI(model_name=model_name, openai_api_key=os.getenv("OPENAI_API_KEY"),
+                                 openai_api_base=os.getenv("OPENAI_BASE_URL"), max_retries=0)
+                _llms[model_name] = llm
+    return llm
+
+
+def get_governor():
+    """Return the shared LLM governor; its limits come from the LLM_* environment variables."""
+    global _governor
+    if _governor is None:
+        shared_db = get_db()
+        recorder = get_recorder()
+        with _lock:
+            if _governor is None:
+                _governor = llm_governor.Governor(
+                    shared_db, get_llm, recorder=recorder,
+                    rpm=float(os.getenv("LLM_RPM", 500)),
+                    tpm=float(os.getenv("LLM_TPM", 150000)),
+                    user_tpm=float(os.getenv("LLM_USER_TPM", 40000)),
+                    max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", 8)),
+                    max_retries=int(os.getenv("LLM_MAX_RETRIES", 5)))
+    return _governor
+
+
+def get_llm_cache():
+    """Return the shared LLM response cache (TTL and size from the environment)."""
+    global _llm_cache
+    if _llm_cache is None:
+        shared_db = get_db()
+        with _lock:
+            if _llm_cache is None:
+                _llm_cache = llm_cache.LLMCache(
+                    shared_db,
+                    ttl=int(os.getenv("LLM_CACHE_TTL", 7 * 24 * 3600)),
+                    max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", 1000)),
+                )
+    return _llm_cache
+
+
+def get_read_cache():
+    """Return the shared cache for panel query results and figures."""
+    global _read_cache
+    if _read_cache is None:
+        shared_db = get_db()
+        with _lock:
+            if _read_cache is None:
+                _read_cache = read_cache.ReadCache(shared_db, max_entries=int(os.getenv("READ_CACHE_MAX_ENTRIES", 512)))
+    return _read_cache
+
+
+def get_semantic_index():
+    """Return the shared FAISS index over tasks, subtopics and quizzes.
+
+    Embeddings come from OpenAI when OPENAI_API_KEY is set and from the local
+    hashing stand-in otherwise (or when EMBEDDINGS=hashing), so it also works offline.
+    """
+    global _semantic_index
+    if _semantic_index is None:
+        shared_db = get_db()
+        with _lock:
+            if _semantic_index is None:
+                import embeddings
+                import semantic_index
+                if os.getenv("EMBEDDINGS", "openai" if os.getenv("OPENAI_API_KEY") else "hashing") == "openai":
+                    embedder = embeddings.OpenAIEmbedder(os.getenv("EMBEDDING_MODEL", "text-embedding-3-small"),
+                                                         api_key=os.getenv("OPENAI_API_KEY"))
+                else:
+                    embedder = embeddings.HashingEmbedder()
+                _semantic_index = semantic_index.SemanticIndex(
+                    shared_db, embeddings.CachedEmbedder(embedder, shared_db),
+                    os.getenv("SEMANTIC_INDEX_DIR", f"{shared_db.path}.faiss"))
+    return _semantic_index
+
+
+def get_horizon():
+    """Return the shared recurrence horizon (task_occurrences upkeep)."""
+    global _horizon
+    if _horizon is None:
+        shared_db = get_db()
+        with _lock:
+            if _horizon is None:
+                import recurrence
+                _horizon = recurrence.Horizon(shared_db, days=int(os.getenv("RECURRENCE_HORIZON_DAYS", 60)))
+    return _horizon
+
+
+def get_quiz_worker():
+    """Start the background quiz pre-generator once; None when QUIZ_PREGEN_WORKERS=0."""
+    global _quiz_worker
+    workers = int(os.getenv("QUIZ_PREGEN_WORKERS", 2))
+    if _quiz_worker is None and workers > 0:
+        shared_db = get_db()
+        with _lock:
+            if _quiz_worker is None:
+                _quiz_worker = quiz_worker.QuizPregenerator(shared_db, max_workers=workers)
+                _quiz_worker.start()
+    return _quiz_worker
+
+
+def get_job_runner():
+    """Start the background LLM job pool once (size from LLM_JOB_WORKERS)."""
+    global _job_runner
+    if _job_runner is None:
+        shared_db = get_db()
+        with _lock:
+            if _job_runner is None:
+                runner = jobs.JobRunner(shared_db, max_workers=int(os.getenv("LLM_JOB_WORKERS", 4)))
+                runner.start()
+                _job_runner = runner
+    return _job_runner
+
+
+def shutdown():
+    """Stop the background workers, flush and close the database and drop the LLM clients."""
+    global _database, _llm_cache, _quiz_worker, _read_cache, _semantic_index, _horizon, _job_runner, _governor, _recorder
+    if _quiz_worker is not None:
+        _quiz_worker.stop()
+        _quiz_worker = None
+    if _job_runner is not None:
+        _job_runner.stop()
+        _job_runner = None
+    with _lock:
+        _llm_cache = None
+        _read_cache = None
+        _semantic_index = None
+        _horizon = None
+        _governor = None
+        if _database is not None:
+            _database.close()
+            _database = None
+        if _recorder is not None:
+            _recorder.close()
+            _recorder = None
+        _llms.clear()
+
+
+atexit.register(shutdown)
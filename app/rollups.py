@@ -0,0 +1,90 @@
+import sys
+
+import db
+
+# Rollups. Triggers on time_logs and tasks (see migrations.py) keep these
+# tables current on every write; rebuild() recomputes them from the raw rows
+# after a backfill or bulk import.
+
+ROLLUP_TABLES = ("task_time_totals", "category_time_totals", "daily_time_totals", "hourly_time_totals",
+                 "task_counts")
+
+# Calendar day (local time) of a time_logs.start_time epoch value
+DAY_SQL = "date(CAST({col} AS REAL), 'unixepoch', 'localtime')"
+# Hour of day (0-23, local time) a session started in
+HOUR_SQL = "CAST(strftime('%H', CAST({col} AS REAL), 'unixepoch', 'localtime') AS INTEGER)"
+
+
+_RECOMPUTE_SQL = {
+    "task_time_totals": """
+        INSERT INTO task_time_totals (task_id, total_seconds, log_count)
+        SELECT task_id, SUM(time_spent), COUNT(*) FROM time_logs GROUP BY task_id
+    """,
+    "category_time_totals": """
+        INSERT INTO category_time_totals (user_id, category, total_seconds, log_count)
+        SELECT l.user_id, COALESCE(t.category, ''), SUM(l.time_spent), COUNT(*)
+        FROM time_logs l LEFT JOIN tasks t ON t.id = l.task_id
+        GROUP BY l.user_id, COALESCE(t.category, '')
+    """,
+    "daily_time_totals": f"""
+        INSERT INTO daily_time_totals (user_id, day, total_seconds, log_count)
+        SELECT user_id, {DAY_SQL.format(col='start_time')} AS day, SUM(time_spent), COUNT(*)
+        FROM time_logs GROUP BY user_id, day
+    """,
+    "hourly_time_totals": f"""
+        INSERT INTO hourly_time_totals (user_id, hour, total_seconds, log_count)
+        SELECT user_id, {HOUR_SQL.format(col='start_time')} AS hour, SUM(time_spent), COUNT(*)
+        FROM time_logs GROUP BY user_id, hour
+    """,
+    "task_counts": """
+        INSERT INTO task_counts (user_id, status, priority, category, tasks, completed)
+        SELECT user_id, COALESCE(status, ''), COALESCE(priority, ''), COALESCE(category, ''),
+               COUNT(*), TOTAL(progress = 100)
+        FROM tasks
+        GROUP BY 1, 2, 3, 4
+    """,
+}
+
+
+def recompute(conn, tables=ROLLUP_TABLES):
+    """Refill rollup tables from their source rows (runs in the caller's transaction)."""
+    for table in tables:
+        conn.execute(f"DELETE FROM {table}")
+        conn.execute(_RECOMPUTE_SQL[table])
+
+
+def rebuild(conn):
+    """Recompute every rollup table in one transaction."""
+    with conn:
+        recompute(conn)
+
+
+def category_totals(conn, user_id):
+    return conn.execute(
+        "SELECT category, total_seconds FROM category_time_totals WHERE user_id = ? ORDER BY category",
+        (user_id,),
+    ).fetchall()
+
+
+def hourly_totals(conn, user_id):
+    return conn.execute(
+        "SELECT hour, total_seconds, log_count FROM hourly_time_totals WHERE user_id = ? ORDER BY hour",
+        (user_id,),
+    ).fetchall()
+
+
+def daily_totals(conn, user_id, start_day, end_day):
+    return conn.execute(
+        "SELECT day, total_seconds FROM daily_time_totals WHERE user_id = ? AND day BETWEEN ? AND ? ORDER BY day",
+        (user_id, start_day, end_day),
+    ).fetchall()
+
+
+if __name__ == "__main__":
+    # Usage: python rollups.py rebuild [db_path]
+    if len(sys.argv) < 2 or sys.argv[1] != "rebuild":
+        sys.exit("usage: python rollups.py rebuild [db_path]")
+    conn = db.init_db(sys.argv[2] if len(sys.argv) > 2 else db.DB_PATH)
+    rebuild(conn)
+    for table in ROLLUP_TABLES:
+        print(table, conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0], "rows")
@@ -0,0 +1,129 @@
+import functools
+from collections import namedtuple
+
+import structured
+
+# Deterministic placement of subtopics into free time. The LLM only breaks a
+# task into (subtopic, duration) pairs; this module decides when each one runs,
+# so a schedule can be re-planned instantly without another completion.
+
+Placement = namedtuple("Placement", "task_id subtopic date start end")
+
+# One line of the LLM's task breakdown (JSON Lines, see structured.py)
+BREAKDOWN_SCHEMA = structured.Schema({
+    "subtopic": structured.text_field,
+    "duration_minutes": structured.int_range(5, 600),
+})
+
+BREAKDOWN_PROMPT = """
+Create a detailed breakdown of the {category} - '{task}' with subtopics.
+Assign an estimated duration to each subtopic, listed in the order they should be done.
+
+Output one line per subtopic and nothing else. Each line is a JSON object with the keys
+"subtopic" (the name of the subtopic) and "duration_minutes" (the estimated duration in
+whole minutes). For example:
+{{"subtopic": "Introduction", "duration_minutes": 30}}
+{{"subtopic": "Practice Problems", "duration_minutes": 60}}
+{{"subtopic": "Review", "duration_minutes": 30}}
+"""
+
+
+def generate_breakdown(params, progress):
+    """Job (see jobs.py): the LLM's breakdown of a task into (subtopic, minutes) rows.
+
+    Also returns what similar subtopics took when the user scheduled them
+    before, and how many lines the LLM got wrong even after repair.
+    """
+    import llm_client  # The LLM stack loads only when a job runs
+    import resources
+
+    parser = structured.JsonLinesParser(BREAKDOWN_SCHEMA)
+    prompt = BREAKDOWN_PROMPT.format(category=params["category"], task=params["task"])
+    for chunk in llm_client.stream(prompt, use_cache=params["use_cache"], user_id=params["user_id"]):
+        if parser.feed(chunk):
+            progress({"rows": [(i["subtopic"], i["duration_minutes"]) for i in parser.items]})
+    parser.close()
+    # Only the invalid lines go back to the LLM, once
+    repaired = structured.repair(parser, functools.partial(llm_client.complete, user_id=params["user_id"]))
+    resources.get_db().submit(structured.record_parse, "schedule", parser, repaired)
+    rows = [(i["subtopic"], i["duration_minutes"]) for i in parser.items]
+    past_minutes = resources.get_semantic_index().estimate_minutes([name for name, _ in rows], params["user_id"])
+    return {"rows": rows, "past_minutes": past_minutes, "invalid": len(parser.invalid)}
+
+
+def schedule_tasks(tasks, free, min_chunk=15, allow_split=True):
+    """Greedily pack subtopics into free time before each task's due date.
+
+    tasks: iterable of (task_id, priority_rank, due_date, [(subtopic, minutes), ...]).
+    free:  {date: IntervalSet} of free time; not modified.
+    Higher priority and earlier due dates go first. Within a task, subtopics
+    keep their order and each takes the earliest free time after the previous
+    one ends. With allow_split, a subtopic that fits nowhere whole is spread
+    over several intervals of at least `min_chunk` minutes. Returns
+    (placements, unplaced) where unplaced lists (task_id, subtopic, minutes).
+    """
+    days = sorted(free)
+    # Mutable copies: per day, a list of [start, end] free intervals
+    remaining = {day: [[start, end] for start, end in free[day]] for day in days}
+    placements, unplaced = [], []
+
+    for task_id, _, due_date, subtopics in sorted(tasks, key=lambda task: (-task[1], str(task[2]))):
+        usable = [day for day in days if day <= str(due_date)]
+        cursor = (None, 0)  # (day, minute) the next subtopic may start at
+        for subtopic, minutes in subtopics:
+            chunks = _find_whole(remaining, usable, cursor, minutes)
+            if chunks is None and allow_split:
+                chunks = _find_split(remaining, usable, cursor, minutes, min_chunk)
+            if chunks is None:
+                unplaced.append((task_id, subtopic, minutes))
+                continue
+            for day, start, size in chunks:
+                _take(remaining[day], start, size)
+                placements.append(Placement(task_id, subtopic, day, start, start + size))
+            day, start, size = chunks[-1]
+            cursor = (day, start + size)
+    placements.sort(key=lambda p: (p.date, p.start))
+    return placements, unplaced
+
+
+def _free_after(remaining, days, cursor):
+    """Yield (day, start, end) free intervals that begin at or after `cursor`."""
+    cursor_day, cursor_minute = cursor
+    for day in days:
+        if cursor_day is not None and day < cursor_day:
+            continue
+        for start, end in remaining[day]:
+            if day == cursor_day:
+                start = max(start, cursor_minute)
+            if start < end:
+                yield day, start, end
+
+
+def _find_whole(remaining, days, cursor, minutes):
+    for day, start, end in _free_after(remaining, days, cursor):
+        if end - start >= minutes:
+            return [(day, start, minutes)]
+    return None
+
+
+def _find_split(remaining, days, cursor, minutes, min_chunk):
+    # Only succeeds if the whole subtopic fits before the due date
+    chunks, left = [], minutes
+    for day, start, end in _free_after(remaining, days, cursor):
+        size = min(end - start, left)
+        if size >= min(min_chunk, left):
+            chunks.append((day, start, size))
+            left -= size
+            if not left:
+                return chunks
+    return None
+
+
+def _take(intervals, start, size):
+    """Remove [start, start + size) from the day's free intervals."""
+    for index, (free_start, free_end) in enumerate(intervals):
+        if free_start <= start and start + size <= free_end:
+            pieces = [[s, e] for s, e in ((free_start, start), (start + size, free_end)) if s < e]
+            intervals[index:index + 1] = pieces
+            return
+    raise ValueError("Time is not free")
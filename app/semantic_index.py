@@ -0,0 +1,164 @@
+import json
+import os
+import re
+import threading
+from collections import namedtuple
+
+import faiss
+import numpy as np
+
+# Nearest-neighbour search over semantic_items (task topics, scheduled
+# subtopics, generated quizzes and questions; see migrations.py). There is one
+# FAISS index per kind, stored on disk as <directory>/<embedder>.<kind>.faiss
+# and keyed by semantic_items.id. Triggers add items as tasks and schedules
+# are inserted. An index catches up on the items after the last id it holds
+# the next time it is searched once semantic_items has been written
+# (database.Database.versions), so only new texts are ever embedded.
+
+KINDS = ("task", "subtopic", "quiz", "question")
+
+Match = namedtuple("Match", "score id ref_id user_id text minutes payload")
+
+
+def quiz_text(topic, subtopics):
+    """The text a quiz is indexed and looked up by."""
+    return f"{topic}\n{subtopics}".strip() if subtopics else str(topic).strip()
+
+
+class SemanticIndex:
+    def __init__(self, database, embedder, directory):
+        self.database = database
+        self.embedder = embedder
+        self.directory = directory
+        self._indexes = {}  # kind -> faiss index (inner product over normalized vectors)
+        self._last_ids = {}  # kind -> highest semantic_items.id in the index
+        self._versions = {}  # kind -> semantic_items generation the index is current with
+        self._lock = threading.Lock()
+
+    def _path(self, kind):
+        return os.path.join(self.directory, f"{re.sub(r'[^A-Za-z0-9_-]', '_', self.embedder.name)}.{kind}.faiss")
+
+    def _load(self, kind):
+        """The index file for `kind` if it matches semantic_items, else None (rebuilt from scratch)."""
+        path = self._path(kind)
+        if not os.path.exists(path):
+            return None
+        index = faiss.read_index(path)
+        ids = faiss.vector_to_array(index.id_map)
+        last_id = int(ids.max()) if len(ids) else 0
+        count = self.database.reader().execute(
+            "SELECT COUNT(*) FROM semantic_items WHERE kind = ? AND id <= ?", (kind, last_id)).fetchone()[0]
+        if count != index.ntotal:
+            return None  # The database was replaced or rebuilt
+        self._last_ids[kind] = last_id
+        return index
+
+    def refresh(self, kind):
+        """Add the items of `kind` inserted since the last refresh; returns how many."""
+        with self._lock:
+            version = self.database.versions(("semantic_items",))
+            if kind not in self._indexes:
+                self._indexes[kind] = self._load(kind)
+                self._last_ids.setdefault(kind, 0)
+            elif self._versions.get(kind) == version:
+                return 0
+            rows = self.database.reader().execute(
+                "SELECT id, text FROM semantic_items WHERE kind = ? AND id > ? ORDER BY id",
+                (kind, self._last_ids[kind])).fetchall()
+            self._versions[kind] = version
+            if not rows:
+                return 0
+            vectors = self.embedder.embed([text for _, text in rows])
+            index = self._indexes[kind]
+            if index is None:
+                index = self._indexes[kind] = faiss.IndexIDMap2(faiss.IndexFlatIP(vectors.shape[1]))
+            index.add_with_ids(vectors, np.array([item_id for item_id, _ in rows], dtype=np.int64))
+            self._last_ids[kind] = rows[-1][0]
+            self._save(kind, index)
+            return len(rows)
+
+    def _save(self, kind, index):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(kind)
+        faiss.write_index(index, path + ".tmp")
+        os.replace(path + ".tmp", path)
+
+    def embed(self, texts):
+        return self.embedder.embed(texts)
+
+    def search(self, kind, texts, k=5, user_id=None, min_score=0.0):
+        """For each text, up to `k` Matches of `kind` with score >= min_score, best first.
+
+        Scores are cosine similarities. With `user_id`, only that user's items
+        (and shared ones) are returned; the index is over-fetched to make up
+        for filtered-out neighbours.
+        """
+        self.refresh(kind)
+        texts = list(texts)
+        index = self._indexes.get(kind)
+        if index is None or not index.ntotal or not texts:
+            return [[] for _ in texts]
+        fetch = min(index.ntotal, k * 8 if user_id is not None else k)
+        vectors = self.embed(texts)
+        with self._lock:
+            scores, ids = index.search(vectors, fetch)
+        wanted = {int(item_id) for row_scores, row_ids in zip(scores, ids)
+                  for score, item_id in zip(row_scores, row_ids) if item_id >= 0 and score >= min_score}
+        items = self._items(wanted)
+        results = []
+        for row_scores, row_ids in zip(scores, ids):
+            matches = []
+            for score, item_id in zip(row_scores, row_ids):
+                item = items.get(int(item_id))
+                if item is None or score < min_score or (user_id is not None and item[1] not in (user_id, None)):
+                    continue
+                matches.append(Match(float(score), int(item_id), *item))
+                if len(matches) == k:
+                    break
+            results.append(matches)
+        return results
+
+    def _items(self, ids, chunk=500):
+        ids = sorted(ids)
+        items = {}
+        conn = self.database.reader()
+        for start in range(0, len(ids), chunk):
+            part = ids[start:start + chunk]
+            for item_id, *item in conn.execute(
+                    f"SELECT id, ref_id, user_id, text, minutes, payload FROM semantic_items WHERE id IN ({', '.join('?' * len(part))})",
+                    part):
+                items[item_id] = tuple(item)
+        return items
+
+    def estimate_minutes(self, texts, user_id, k=5, min_score=0.7):
+        """Minutes the user scheduled for similar past subtopics, per text (None if nothing is close).
+
+        A score-weighted average over the nearest subtopics at or above `min_score`.
+        """
+        estimates = []
+        for matches in self.search("subtopic", texts, k, user_id, min_score):
+            matches = [match for match in matches if match.minutes]
+            weight = sum(match.score for match in matches)
+            estimates.append(round(sum(match.score * match.minutes for match in matches) / weight)
+                             if matches else None)
+        return estimates
+
+
+def near_duplicates(vectors, min_score):
+    """Indexes of rows whose cosine similarity to an earlier row is >= min_score."""
+    if len(vectors) < 2:
+        return set()
+    similarity = vectors @ vectors.T
+    return {row for row in range(1, len(vectors)) if similarity[row, :row].max() >= min_score}
+
+
+# Write job (runs on the database's writer thread)
+
+def add_quiz(conn, topic, subtopics, questions):
+    """Index a generated quiz and each of its questions."""
+    conn.execute("""
+        INSERT INTO semantic_items (kind, text, payload) VALUES ('quiz', ?, ?)
+        ON CONFLICT(kind, ref_id, text) DO UPDATE SET payload = excluded.payload
+    """, (quiz_text(topic, subtopics), json.dumps(questions)))
+    conn.executemany("INSERT OR IGNORE INTO semantic_items (kind, text, payload) VALUES ('question', ?, ?)",
+                     [(question["question"], json.dumps(question)) for question in questions])
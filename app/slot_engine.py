@@ -0,0 +1,158 @@
+import re
+from array import array
+from bisect import bisect_right
+
+# Slot engine: time ranges are [start, end) minute offsets held in two parallel
+# integer arrays, sorted by start. Parsing and formatting of "HH:MM" / "10:00 AM"
+# strings happens only at the edges (parse_slot / format_slot).
+
+_TIME = re.compile(r"^\s*(\d{1,2}):(\d{2})\s*([AaPp][Mm])?\s*$")
+
+
+def parse_time(text, end=False):
+    """Minutes since midnight for "14:30" or "2:30 PM".
+
+    "24:00" (1440, the end of the day) is only accepted as an `end` time.
+    """
+    match = _TIME.match(text)
+    if not match:
+        raise ValueError(f"Invalid time: {text!r}")
+    hours, minutes, meridiem = int(match.group(1)), int(match.group(2)), match.group(3)
+    if meridiem:
+        if not 1 <= hours <= 12:
+            raise ValueError(f"Invalid time: {text!r}")
+        hours = hours % 12 + (12 if meridiem.upper() == "PM" else 0)
+    elif end and (hours, minutes) == (24, 0):
+        return 24 * 60
+    if hours > 23 or minutes > 59:
+        raise ValueError(f"Invalid time: {text!r}")
+    return hours * 60 + minutes
+
+
+def format_time(minutes):
+    return f"{minutes // 60:02}:{minutes % 60:02}"
+
+
+def parse_slot(text):
+    """(start, end) minutes for "10:00 - 11:00" or "10:00 AM - 11:00 AM"."""
+    start, sep, end = text.partition("-")
+    if not sep:
+        raise ValueError(f"Invalid slot: {text!r}")
+    return parse_time(start), parse_time(end, end=True)
+
+
+def format_slot(start, end):
+    return f"{format_time(start)} - {format_time(end)}"
+
+
+def merge_intervals(intervals):
+    """Sort and merge overlapping or touching (start, end) pairs."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+class IntervalSet:
+    """Disjoint [start, end) intervals, sorted by start, stored as int arrays.
+
+    Intervals may touch (as back-to-back slots do) but never overlap, so the
+    ends are sorted as well and a conflict check is one binary search.
+    """
+
+    __slots__ = ("starts", "ends")
+
+    def __init__(self, intervals=()):
+        merged = merge_intervals(intervals)
+        self.starts = array("i", (start for start, _ in merged))
+        self.ends = array("i", (end for _, end in merged))
+
+    @classmethod
+    def from_sorted(cls, starts, ends):
+        """Wrap arrays that are already sorted and non-overlapping (no copy, no merge)."""
+        interval_set = cls.__new__(cls)
+        interval_set.starts = starts
+        interval_set.ends = ends
+        return interval_set
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self):
+        return zip(self.starts, self.ends)
+
+    def __eq__(self, other):
+        return isinstance(other, IntervalSet) and self.starts == other.starts and self.ends == other.ends
+
+    def __repr__(self):
+        return f"IntervalSet({list(self)})"
+
+    def conflicts(self, start, end):
+        """True if [start, end) overlaps any interval; O(log n)."""
+        i = bisect_right(self.ends, start)  # First interval ending after `start`
+        return i < len(self.starts) and self.starts[i] < end
+
+    def conflicts_many(self, candidates):
+        """Conflict flags for many (start, end) candidates in one sorted sweep.
+
+        O(m log m + n) for m candidates, instead of m binary searches.
+        """
+        flags = [False] * len(candidates)
+        starts, ends, n = self.starts, self.ends, len(self.starts)
+        j = 0
+        for index in sorted(range(len(candidates)), key=lambda k: candidates[k][0]):
+            start, end = candidates[index]
+            while j < n and ends[j] <= start:
+                j += 1
+            flags[index] = j < n and starts[j] < end
+        return flags
+
+    def add(self, start, end):
+        """Insert [start, end), merging with the intervals it overlaps or touches."""
+        lo = bisect_right(self.ends, start - 1)  # First interval that could touch
+        hi = lo
+        while hi < len(self.starts) and self.starts[hi] <= end:
+            start = min(start, self.starts[hi])
+            end = max(end, self.ends[hi])
+            hi += 1
+        self.starts[lo:hi] = array("i", [start])
+        self.ends[lo:hi] = array("i", [end])
+
+    def union(self, other):
+        return IntervalSet(list(self) + list(other))
+
+    def subtract(self, other):
+        """Parts of these intervals not covered by `other` (e.g. free = available - busy)."""
+        starts, ends = array("i"), array("i")
+        busy_starts, busy_ends, n = other.starts, other.ends, len(other.starts)
+        j = 0
+        for start, end in self:
+            while j < n and busy_ends[j] <= start:
+                j += 1
+            k = j
+            while k < n and busy_starts[k] < end:
+                if busy_starts[k] > start:
+                    starts.append(start)
+                    ends.append(busy_starts[k])
+                start = max(start, busy_ends[k])
+                if busy_ends[k] >= end:
+                    break
+                k += 1
+            if start < end:
+                starts.append(start)
+                ends.append(end)
+        return IntervalSet.from_sorted(starts, ends)
+
+    def total_minutes(self):
+        return sum(self.ends) - sum(self.starts)
+
+
+def create_slots(start, end, duration):
+    """Back-to-back `duration`-minute slots between two minute offsets."""
+    starts = array("i", range(start, end - duration + 1, duration))
+    ends = array("i", (s + duration for s in starts))
+    return IntervalSet.from_sorted(starts, ends)
@@ -0,0 +1,49 @@
+from collections import defaultdict
+
+import queries
+from slot_engine import IntervalSet, format_slot, parse_slot
+
+# Availability (`slot` rows) and booked time (`schedule` rows) as minute
+# intervals per date. See slot_engine for the interval operations.
+
+
+def add_slot(conn, user_id, day, start_minute, end_minute):
+    """Write job (see database.Database) adding one availability slot."""
+    if end_minute <= start_minute:
+        raise ValueError("Slot must end after it starts")
+    conn.execute("INSERT INTO slot (user_id, date, start_minute, end_minute) VALUES (?, ?, ?, ?)",
+                 (user_id, str(day), start_minute, end_minute))
+
+
+def slot_minutes(text):
+    """(start, end) minutes for a free-text slot, or (None, None) if it can't be parsed."""
+    try:
+        return parse_slot(text)
+    except (ValueError, AttributeError):
+        return None, None
+
+
+def free_busy(conn, user_id, start_date, end_date):
+    """A user's available and busy IntervalSets per date between two dates (inclusive).
+
+    One indexed query returns both the slot and schedule rows for the range.
+    Returns {date: (available, busy)}.
+    """
+    available, busy = defaultdict(list), defaultdict(list)
+    for day, start, end, is_busy in conn.execute(queries.FREE_BUSY, (user_id, str(start_date), str(end_date)) * 2):
+        (busy if is_busy else available)[day].append((start, end))
+    return {day: (IntervalSet(available[day]), IntervalSet(busy[day]))
+            for day in sorted(set(available) | set(busy))}
+
+
+def free_intervals(conn, user_id, start_date, end_date):
+    """{date: IntervalSet} of available time not already taken by the schedule."""
+    return {day: (avail.subtract(taken) if len(taken) else avail)
+            for day, (avail, taken) in free_busy(conn, user_id, start_date, end_date).items()
+            if len(avail)}
+
+
+def describe(intervals_by_date):
+    """Human-readable lines such as '2025-03-15: 10:00 - 11:00, 14:00 - 15:30'."""
+    return [f"{day}: " + ", ".join(format_slot(start, end) for start, end in intervals)
+            for day, intervals in intervals_by_date.items()]
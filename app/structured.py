@@ -0,0 +1,204 @@
+import json
+
+# Structured LLM output. Prompts ask for JSON Lines (one JSON object per line),
+# which can be validated line by line as a response streams in. Items that fail
+# validation are sent back once for repair, listing only the bad fields, and
+# every parse is counted in the `parse_stats` table.
+
+class Schema:
+    """Field validators plus an optional whole-item check.
+
+    A field validator takes the raw value and returns (value, error); error is
+    None when the value is valid. `check` receives the cleaned item and returns
+    a {field: error} dict for cross-field rules.
+    """
+
+    def __init__(self, fields, check=None):
+        self.fields = fields
+        self.check = check
+
+    def validate(self, obj):
+        """Return (item, errors) for one decoded object in a single pass."""
+        if not isinstance(obj, dict):
+            return None, {"_": "expected a JSON object"}
+        item, errors = {}, {}
+        for name, validator in self.fields.items():
+            value, error = validator(obj.get(name))
+            if error:
+                errors[name] = error
+            else:
+                item[name] = value
+        if not errors and self.check:
+            errors = self.check(item)
+        return item, errors
+
+
+def text_field(value):
+    if isinstance(value, str) and value.strip():
+        return value.strip(), None
+    return None, "must be a non-empty string"
+
+
+def optional_text(value):
+    if value is None or value == "":
+        return None, None
+    return text_field(value)
+
+
+def one_of(*choices):
+    def validator(value):
+        if value in choices:
+            return value, None
+        return None, "must be one of " + ", ".join(choices)
+    return validator
+
+
+def text_list(value):
+    if value is None:
+        return [], None
+    if isinstance(value, list) and all(isinstance(v, str) and v.strip() for v in value):
+        return [v.strip() for v in value], None
+    return None, "must be a list of non-empty strings"
+
+
+def int_range(low, high):
+    def validator(value):
+        if isinstance(value, (int, float)) and not isinstance(value, bool) and low <= value <= high:
+            return int(value), None
+        return None, f"must be a number from {low} to {high}"
+    return validator
+
+
+def _decode(line):
+    line = line.strip()
+    # Ignore blank lines and markdown code fences around the JSON
+    if not line or line.startswith("```"):
+        return None, None
+    try:
+        return json.loads(line), None
+    except json.JSONDecodeError as e:
+        return line, {"_": f"invalid JSON ({e.msg})"}
+
+
+class JsonLinesParser:
+    """Validates JSON Lines output, either all at once or chunk by chunk while streaming."""
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.invalid = []  # (index, raw object, errors)
+        self._slots = []  # One entry per object line: the valid item or None
+        self._buffer = ""
+
+    @property
+    def items(self):
+        """Valid items in response order."""
+        return [item for item in self._slots if item is not None]
+
+    def _line(self, line):
+        obj, errors = _decode(line)
+        if obj is None and errors is None:
+            return None
+        index = len(self._slots)
+        item = None
+        if errors is None:
+            item, errors = self.schema.validate(obj)
+        if errors:
+            item = None
+            self.invalid.append((index, obj, errors))
+        self._slots.append(item)
+        return item
+
+    def feed(self, chunk):
+        """Add streamed text; return the valid items completed by it."""
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.split("\n")
+        return [item for item in map(self._line, lines) if item is not None]
+
+    def close(self):
+        rest, self._buffer = self._buffer, ""
+        item = self._line(rest)
+        return [item] if item is not None else []
+
+    def parse(self, text):
+        self.feed(text)
+        self.close()
+        return self.items
+
+    def replace(self, index, item):
+        """Put a repaired item back at its original position."""
+        self._slots[index] = item
+        self.invalid = [entry for entry in self.invalid if entry[0] != index]
+
+
+def repair_prompt(invalid):
+    lines = "\n".join(json.dumps({"index": index, "item": obj, "errors": errors}) for index, obj, errors in invalid)
+    return f"""
+    Some JSON objects you returned are invalid. Each line below has the object and the
+    fields that failed validation. Fix only those fields and keep everything else.
+    Return one corrected JSON object per line, with the same fields as before plus "index",
+    and no other text.
+
+    {lines}
+    """
+
+
+def repair(parser, complete):
+    """Send the parser's invalid items back once; returns how many were fixed.
+
+    `complete` is a prompt -> text callable. Only the invalid items (and their
+    failing fields) are sent, and fixed items keep their original position.
+    """
+    if not parser.invalid:
+        return 0
+    pending = {index for index, _, _ in parser.invalid}
+    fixed = 0
+    for line in complete(repair_prompt(parser.invalid)).split("\n"):
+        obj, errors = _decode(line)
+        # The index must be an exact int: 1.0 and True compare equal to 1
+        if errors or not isinstance(obj, dict) or type(obj.get("index")) is not int or obj["index"] not in pending:
+            continue
+        item, errors = parser.schema.validate(obj)
+        if not errors:
+            parser.replace(obj["index"], item)
+            pending.discard(obj["index"])
+            fixed += 1
+    return fixed
+
+
+def record_parse(conn, kind, parser, repaired=0):
+    """Add one parsed response to the persistent parse-failure counters.
+
+    An item counts as invalid if it failed validation the first time, even if
+    it was repaired; a response counts as failed if anything is still invalid
+    after repair or it produced no items at all. This is a write job for
+    database.Database.
+    """
+    items = parser.items
+    invalid = len(parser.invalid) + repaired
+    failed = 1 if parser.invalid or not items else 0
+    conn.execute("""
+        INSERT INTO parse_stats (kind, responses, items, invalid_items, repaired_items, failed_responses)
+        VALUES (?, 1, ?, ?, ?, ?)
+        ON CONFLICT(kind) DO UPDATE SET
+            responses = responses + 1,
+            items = items + excluded.items,
+            invalid_items = invalid_items + excluded.invalid_items,
+            repaired_items = repaired_items + excluded.repaired_items,
+            failed_responses = failed_responses + excluded.failed_responses
+    """, (kind, len(items) + len(parser.invalid), invalid, repaired, failed))
+
+
+def parse_stats(conn):
+    """{kind: counters} including the item-level parse-failure rate."""
+    stats = {}
+    for kind, responses, items, invalid, repaired, failed in conn.execute(
+            "SELECT kind, responses, items, invalid_items, repaired_items, failed_responses FROM parse_stats"):
+        stats[kind] = {
+            "responses": responses,
+            "items": items,
+            "invalid_items": invalid,
+            "repaired_items": repaired,
+            "failed_responses": failed,
+            "failure_rate": invalid / items if items else 0.0,
+        }
+    return stats
@@ -0,0 +1,48 @@
+from collections import Counter
+
+import queries
+
+# "Today's Tasks" data: the metrics and chart counts come from the task_counts
+# rollup in one query, and the list is read a page at a time with a
+# (priority_rank, id) keyset cursor, so the panel does about the same amount of
+# work for 50 pending tasks or 50,000.
+
+PAGE_SIZE = 25
+# Sorts before every real (priority_rank, id): ranks are 0-3 and ids are rowids
+FIRST_PAGE = (4, 2 ** 63 - 1)
+
+PRIORITY_LABELS = {"High": "🔴 High", "Medium": "🟠 Medium", "Low": "🟢 Low"}
+
+
+def priority_label(priority):
+    return PRIORITY_LABELS.get(priority, priority)
+
+
+def summary(conn, user_id):
+    """A user's pending-task totals plus counts by priority and by category."""
+    by_priority, by_category = Counter(), Counter()
+    total = completed = 0
+    for priority, category, count, done in conn.execute(queries.TODAYS_SUMMARY, (user_id,)):
+        total += count
+        completed += done
+        by_priority[priority_label(priority)] += count
+        by_category[category] += count
+    return {
+        "total": total,
+        "completed": completed,
+        "pending": total - completed,
+        "by_priority": dict(by_priority),
+        "by_category": dict(by_category),
+    }
+
+
+def page(conn, user_id, cursor=FIRST_PAGE, limit=PAGE_SIZE):
+    """Return (rows, next_cursor) for the user's page after `cursor`.
+
+    rows are (topic, status, progress, priority label, category); next_cursor
+    is None on the last page.
+    """
+    rows = conn.execute(queries.TODAYS_TASKS_PAGE, (user_id, *cursor, limit + 1)).fetchall()
+    next_cursor = tuple(rows[limit - 1][:2]) if len(rows) > limit else None
+    return [(topic, status, progress, priority_label(priority), category)
+            for _, _, topic, status, progress, priority, category in rows[:limit]], next_cursor
@@ -1,31 +1,21 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from langchain.chat_models import ChatOpenAI
-import sqlite3
-import os
-from dotenv import load_dotenv  # For environment variables
-import db
+import llm_client
+import queries
+import resources
+import rollups
 
-# Load environment variables (e.g., OpenAI API key)
-load_dotenv()
+# What the task data and the figures are built from
+TASK_DATA_TABLES = ("tasks", "task_time_totals", "category_time_totals")
 
- 
-# Initialize OpenAI
-llm = ChatOpenAI(model_name="gpt-4", openai_api_key=os.getenv("OPENAI_API_KEY"))
-
-conn = db.init_db() 
 # Fetch task data from the database
-def fetch_task_data():
-    tasks =  conn.execute("""
-        SELECT topic, due_date, status, progress, category, time_spent 
-        FROM tasks 
-        LEFT JOIN time_logs ON tasks.id = time_logs.task_id
-    """).fetchall()
+def fetch_task_data(user_id):
+    tasks = resources.get_read_cache().rows(resources.get_conn(), queries.TASK_TIME_DATA, (user_id,), TASK_DATA_TABLES)
     return pd.DataFrame(tasks, columns=["Topic", "Due Date", "Status", "Progress", "Category", "Time Spent"])
 
 # Generate AI-powered visualization suggestions
-def get_visualization_suggestion(df):
+def get_visualization_suggestion(df, use_cache=True, user_id=None):
     prompt = f"""
     Analyze the following task data and suggest the best way to visualize the user's progress:
     - Total tasks: {len(df)}
@@ -35,33 +25,42 @@ def get_visualization_suggestion(df):
 
     Suggest the type of visualization (e.g., line chart, pie chart, bar chart) and the metrics to include.
     """
-    response = llm.invoke(prompt)
-    return response.content
+    return llm_client.complete(prompt, use_cache=use_cache, user_id=user_id)
+
+# Build the AI suggestion and the figures for the task data
+def build_visualizations(df, user_id):
+    suggestion = get_visualization_suggestion(df, user_id=user_id)
+
+    df = df.assign(**{"Due Date": pd.to_datetime(df["Due Date"])}).sort_values(by="Due Date")
+    fig1 = px.line(df, x="Due Date", y="Progress", title="Progress Over Time")
+
+    completed = len(df[df['Status'] == 'Completed'])
+    pending = len(df) - completed
+    fig2 = px.pie(values=[completed, pending], names=["Completed", "Pending"], title="Task Completion")
+
+    time_per_category = pd.DataFrame(rollups.category_totals(resources.get_conn(), user_id), columns=["Category", "Time Spent"])
+    fig3 = px.bar(time_per_category, x="Category", y="Time Spent", title="Time Spent per Category")
+    return suggestion, fig1, fig2, fig3
 
 # Generate visualizations
-def generate_visualizations(df):
+def generate_visualizations(df, user_id):
     st.subheader("AI-Powered Progress Visualizations")
 
+    # Rebuilt (and the AI asked again) only after the task or time data changes
+    suggestion, fig1, fig2, fig3 = resources.get_read_cache().get(
+        ("progress_visualizations", user_id), TASK_DATA_TABLES, lambda: build_visualizations(df, user_id))
+
     # Get AI suggestion for visualization
-    suggestion = get_visualization_suggestion(df)
     st.write(f"**AI Suggestion:** {suggestion}")
 
     # Example visualizations
     st.write("### Progress Over Time")
-    df['Due Date'] = pd.to_datetime(df['Due Date'])
-    df = df.sort_values(by="Due Date")
-    fig1 = px.line(df, x="Due Date", y="Progress", title="Progress Over Time")
     st.plotly_chart(fig1)
 
     st.write("### Task Completion")
-    completed = len(df[df['Status'] == 'Completed'])
-    pending = len(df) - completed
-    fig2 = px.pie(values=[completed, pending], names=["Completed", "Pending"], title="Task Completion")
     st.plotly_chart(fig2)
 
     st.write("### Time Spent per Category")
-    time_per_category = df.groupby("Category")['Time Spent'].sum().reset_index()
-    fig3 = px.bar(time_per_category, x="Category", y="Time Spent", title="Time Spent per Category")
     st.plotly_chart(fig3)
 
 # Main function
@@ -69,10 +68,11 @@ def ai_progress_visualization( ):
     st.title("AI-Powered Progress Visualization")
     
     # Fetch task data
-    df = fetch_task_data()
+    user_id = st.session_state['user_id']
+    df = fetch_task_data(user_id)
     
     if not df.empty:
         # Generate and display visualizations
-        generate_visualizations(df)
+        generate_visualizations(df, user_id)
     else:
         st.warning("No task data available for visualization.")
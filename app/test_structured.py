@@ -0,0 +1,163 @@
+import json
+
+import pytest
+
+import db
+import scheduler
+import structured
+
+# Run from app/: python -m pytest -q
+
+SCHEMA = scheduler.BREAKDOWN_SCHEMA
+
+
+def line(subtopic, minutes, **extra):
+    return json.dumps({"subtopic": subtopic, "duration_minutes": minutes, **extra})
+
+
+def parser_with_invalid():
+    """A parser holding valid items at 0 and 2 and invalid ones at 1 and 3."""
+    parser = structured.JsonLinesParser(SCHEMA)
+    parser.parse("\n".join([line("Intro", 30), line("Loops", 0), line("Functions", 45), line("", 20)]))
+    return parser
+
+
+def replying(*lines):
+    prompts = []
+
+    def complete(prompt):
+        prompts.append(prompt)
+        return "\n".join(lines)
+    complete.prompts = prompts
+    return complete
+
+
+# Validators
+
+def test_int_range_accepts_numbers_in_range_only():
+    validate = structured.int_range(5, 600)
+    assert validate(30) == (30, None)
+    assert validate(45.0) == (45, None)
+    for value in (4, 601, True, "30", None):
+        assert validate(value)[1] is not None
+
+
+def test_text_fields():
+    assert structured.text_field("  Loops ") == ("Loops", None)
+    assert structured.text_field("   ")[1] is not None
+    assert structured.text_field(3)[1] is not None
+    assert structured.optional_text("") == (None, None)
+    assert structured.optional_text(None) == (None, None)
+    assert structured.text_list(None) == ([], None)
+    assert structured.text_list([" a", "b "]) == (["a", "b"], None)
+    assert structured.text_list(["a", ""])[1] is not None
+    assert structured.one_of("x", "y")("z")[1] is not None
+
+
+def test_schema_reports_every_bad_field_and_runs_check_only_when_fields_pass():
+    checked = []
+    schema = structured.Schema({"a": structured.text_field, "b": structured.int_range(1, 2)},
+                               check=lambda item: checked.append(item) or {"b": "too small"})
+    item, errors = schema.validate({"a": "", "b": 9})
+    assert set(errors) == {"a", "b"} and not checked
+    item, errors = schema.validate({"a": "x", "b": 1})
+    assert errors == {"b": "too small"} and checked == [{"a": "x", "b": 1}]
+    assert schema.validate([1, 2])[1] == {"_": "expected a JSON object"}
+
+
+# Parsing
+
+def test_parse_skips_blank_lines_and_code_fences():
+    text = "```json\n" + line("Intro", 30) + "\n\n" + line("Loops", 60) + "\n```"
+    parser = structured.JsonLinesParser(SCHEMA)
+    assert parser.parse(text) == [{"subtopic": "Intro", "duration_minutes": 30},
+                                  {"subtopic": "Loops", "duration_minutes": 60}]
+    assert parser.invalid == []
+
+
+def test_truncated_last_line_is_invalid_json():
+    text = line("Intro", 30) + "\n" + line("Loops", 60)[:-12]
+    parser = structured.JsonLinesParser(SCHEMA)
+    assert [item["subtopic"] for item in parser.parse(text)] == ["Intro"]
+    [(index, raw, errors)] = parser.invalid
+    assert index == 1 and raw == line("Loops", 60)[:-12]
+    assert errors["_"].startswith("invalid JSON")
+
+
+def test_streamed_chunks_match_a_single_parse():
+    text = "\n".join([line("Intro", 30), line("Loops", 0), line("Functions", 45)])
+    parser = structured.JsonLinesParser(SCHEMA)
+    streamed = []
+    for start in range(0, len(text), 7):
+        streamed += parser.feed(text[start:start + 7])
+    streamed += parser.close()
+    whole = structured.JsonLinesParser(SCHEMA)
+    assert streamed == parser.items == whole.parse(text)
+    assert [entry[0] for entry in parser.invalid] == [entry[0] for entry in whole.invalid] == [1]
+
+
+def test_feed_holds_back_an_unfinished_line():
+    parser = structured.JsonLinesParser(SCHEMA)
+    assert parser.feed(line("Intro", 30)) == []
+    assert parser.feed("\n") == [{"subtopic": "Intro", "duration_minutes": 30}]
+    assert parser.close() == []
+
+
+# Repair
+
+def test_repair_puts_fixed_items_back_in_place():
+    parser = parser_with_invalid()
+    complete = replying(line("Loops", 60, index=1), line("Classes", 20, index=3))
+    assert structured.repair(parser, complete) == 2
+    assert [item["subtopic"] for item in parser.items] == ["Intro", "Loops", "Functions", "Classes"]
+    assert parser.invalid == []
+    # Only the invalid items are sent back
+    assert '"index": 1' in complete.prompts[0] and '"index": 0' not in complete.prompts[0]
+
+
+@pytest.mark.parametrize("index", [1.0, True, "1", None, [1]])
+def test_repair_ignores_an_index_that_is_not_an_exact_int(index):
+    parser = parser_with_invalid()
+    assert structured.repair(parser, replying(line("Loops", 60, index=index))) == 0
+    assert [entry[0] for entry in parser.invalid] == [1, 3]
+    assert len(parser.items) == 2
+
+
+@pytest.mark.parametrize("index", [-1, 2, 4, 99])
+def test_repair_ignores_an_index_that_is_not_pending(index):
+    parser = parser_with_invalid()
+    assert structured.repair(parser, replying(line("Loops", 60, index=index))) == 0
+    assert [item["subtopic"] for item in parser.items] == ["Intro", "Functions"]
+
+
+def test_partial_repair_reply_keeps_the_rest_invalid():
+    parser = parser_with_invalid()
+    reply = replying("Here you go:", line("Loops", 60, index=1), line("", 20, index=3), '{"index": 3, "subt')
+    assert structured.repair(parser, reply) == 1
+    assert [item["subtopic"] for item in parser.items] == ["Intro", "Loops", "Functions"]
+    assert [entry[0] for entry in parser.invalid] == [3]
+
+
+def test_repair_uses_the_first_valid_fix_for_an_index():
+    parser = parser_with_invalid()
+    assert structured.repair(parser, replying(line("Loops", 60, index=1), line("Other", 90, index=1))) == 1
+    assert parser.items[1] == {"subtopic": "Loops", "duration_minutes": 60}
+
+
+def test_repair_does_not_call_the_llm_when_nothing_is_invalid():
+    parser = structured.JsonLinesParser(SCHEMA)
+    parser.parse(line("Intro", 30))
+    complete = replying()
+    assert structured.repair(parser, complete) == 0
+    assert complete.prompts == []
+
+
+def test_record_parse_counts_repaired_items_as_invalid(tmp_path):
+    conn = db.init_db(str(tmp_path / "stats.db"))
+    parser = parser_with_invalid()
+    repaired = structured.repair(parser, replying(line("Loops", 60, index=1)))
+    structured.record_parse(conn, "schedule", parser, repaired)
+    stats = structured.parse_stats(conn)["schedule"]
+    assert (stats["responses"], stats["items"], stats["invalid_items"], stats["repaired_items"],
+            stats["failed_responses"]) == (1, 4, 2, 1, 1)
+    conn.close()
@@ -40,20 +40,22 @@ def is_slot_available(existing_slots, new_slot):
 
 
 
-# Example usage
-start_time = "09:00"
-end_time = "18:00"
-duration = 30
-recurring_days = ["Monday", "Wednesday", "Friday"]
-
-slots = create_time_slots(start_time, end_time, duration, recurring_days)
-
-# Example: Add a new slot and check for conflicts
-new_slot = "10:30 - 11:00"
-if is_slot_available(slots, new_slot):
-    slots.append(new_slot)
-    print("New slot added!")
-else:
-    print("Time slot conflict detected!")
-
-print("Generated Time Slots:", slots)
+# Example usage (only when run directly, not on import)
+if __name__ == "__main__":
+    start_time = "09:00"
+    end_time = "18:00"
+    duration = 30
+    recurring_days = ["Monday", "Wednesday", "Friday"]
+
+    print("Weekly Time Slots:", create_time_slots(start_time, end_time, duration, recurring_days))
+    slots = create_time_slots(start_time, end_time, duration)
+
+    # Example: Add a new slot and check for conflicts
+    new_slot = "10:30 - 11:00"
+    if is_slot_available(slots, new_slot):
+        slots.append(new_slot)
+        print("New slot added!")
+    else:
+        print("Time slot conflict detected!")
+
+    print("Generated Time Slots:", slots)
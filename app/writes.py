@@ -0,0 +1,57 @@
+import slot_engine
+
+# Write path. These functions are write jobs for database.Database: they run
+# on the writer thread inside its transaction and never commit themselves.
+# Multi-row saves use one executemany, so N rows cost one statement and share
+# the batch's single commit. Foreign keys are enforced (see db.PRAGMAS), so a
+# bad task id undoes the whole job.
+
+_SQL = {
+    "schedule": """
+        INSERT INTO schedule (user_id, date, slot, task_id, subtopics, start_minute, end_minute)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """,
+    "time_logs": """
+        INSERT INTO time_logs (user_id, task_id, start_time, end_time, time_spent)
+        VALUES (?, ?, ?, ?, ?)
+    """,
+    "tasks": """
+        INSERT INTO tasks (user_id, topic, subtopics, due_date, status, priority, progress, category, recurrence)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """,
+}
+
+
+def insert_many(conn, table, rows):
+    """Insert `rows` into `table` with one executemany; returns the row count."""
+    rows = list(rows)
+    if rows:
+        conn.executemany(_SQL[table], rows)
+    return len(rows)
+
+
+def add_user(conn, username, password_hash):
+    conn.execute("INSERT INTO users (username, password) VALUES (?, ?)", (username, password_hash))
+
+
+def add_task(conn, user_id, topic, due_date, status, priority, category, recurrence):
+    conn.execute(_SQL["tasks"], (user_id, topic, "", due_date, status, priority, 0, category, recurrence))
+
+
+def save_schedule(conn, user_id, task_id, placements):
+    """Save scheduler.Placement rows for one of the user's tasks."""
+    return insert_many(conn, "schedule", (
+        (user_id, p.date, slot_engine.format_slot(p.start, p.end), task_id, p.subtopic, p.start, p.end)
+        for p in placements
+    ))
+
+
+def log_time(conn, user_id, entries):
+    """Save (task_id, start_time, end_time) timer sessions.
+
+    Times are epoch seconds; the rollup triggers update in the same
+    transaction.
+    """
+    return insert_many(conn, "time_logs", (
+        (user_id, task_id, start, end, int(end - start)) for task_id, start, end in entries
+    ))